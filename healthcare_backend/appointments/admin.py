@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Appointment, AppointmentFeedback
+from .models import Appointment, AppointmentFeedback, WorkingHours, AvailabilityException
 
 class AppointmentAdmin(admin.ModelAdmin):
     list_display = ('id', 'patient', 'physiotherapist', 'date', 'start_time', 'end_time', 'status')
@@ -12,5 +12,17 @@ class AppointmentFeedbackAdmin(admin.ModelAdmin):
     list_filter = ('rating',)
     search_fields = ('appointment__patient__username', 'comments')
 
+class WorkingHoursAdmin(admin.ModelAdmin):
+    list_display = ('physiotherapist', 'day_of_week', 'start_time', 'end_time')
+    list_filter = ('day_of_week',)
+    search_fields = ('physiotherapist__user__username',)
+
+class AvailabilityExceptionAdmin(admin.ModelAdmin):
+    list_display = ('physiotherapist', 'date', 'start_time', 'end_time', 'is_available')
+    list_filter = ('is_available', 'date')
+    search_fields = ('physiotherapist__user__username', 'reason')
+
 admin.site.register(Appointment, AppointmentAdmin)
 admin.site.register(AppointmentFeedback, AppointmentFeedbackAdmin)
+admin.site.register(WorkingHours, WorkingHoursAdmin)
+admin.site.register(AvailabilityException, AvailabilityExceptionAdmin)
\ No newline at end of file
@@ -1,10 +1,15 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .viewsets import AppointmentViewSet, AppointmentFeedbackViewSet
+from .viewsets import (
+    AppointmentViewSet, AppointmentFeedbackViewSet,
+    WorkingHoursViewSet, AvailabilityExceptionViewSet
+)
 
 router = DefaultRouter()
 router.register(r'appointments', AppointmentViewSet, basename='appointments')
 router.register(r'appointment-feedback', AppointmentFeedbackViewSet, basename='appointment-feedback')
+router.register(r'working-hours', WorkingHoursViewSet, basename='working-hours')
+router.register(r'availability-exceptions', AvailabilityExceptionViewSet, basename='availability-exceptions')
 
 urlpatterns = [
     path('', include(router.urls)),
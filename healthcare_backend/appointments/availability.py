@@ -0,0 +1,157 @@
+"""
+Free-slot search over physiotherapists' working hours.
+
+Working hours, exceptions and appointments for every candidate therapist
+are fetched with one query each, then turned into sorted lists of
+(start, end) minute intervals per therapist and day. Free time is the
+working intervals minus the booked ones, computed with a linear sweep, so
+the number of queries does not depend on the number of therapists, days
+or slots.
+"""
+from collections import defaultdict
+from datetime import time, timedelta
+from django.utils import timezone
+from .models import Appointment, AvailabilityException, WorkingHours
+
+# Appointments in these states no longer block their time slot
+NON_BLOCKING_STATUSES = ['cancelled']
+
+END_OF_DAY = 23 * 60 + 59
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def to_time(minutes):
+    return time(minutes // 60, minutes % 60)
+
+
+def merge_intervals(intervals):
+    """Sort intervals and merge the ones that overlap or touch"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(free, busy):
+    """Remove sorted, merged ``busy`` intervals from sorted, merged ``free`` ones"""
+    result = []
+    i = 0
+    for start, end in free:
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][0] > start:
+                result.append((start, busy[j][0]))
+            start = max(start, busy[j][1])
+            j += 1
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def find_conflicts(physiotherapist, date, start_time, end_time, exclude_pk=None):
+    """Appointments of a physiotherapist that overlap the given time"""
+    conflicts = Appointment.objects.filter(
+        physiotherapist=physiotherapist,
+        date=date,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+    ).exclude(status__in=NON_BLOCKING_STATUSES)
+    if exclude_pk is not None:
+        conflicts = conflicts.exclude(pk=exclude_pk)
+    return conflicts
+
+
+def find_free_slots(profiles, start_date, end_date, duration, step=None, limit=None, now=None):
+    """
+    Open slots of ``duration`` minutes between ``start_date`` and
+    ``end_date`` (inclusive) for the given PhysiotherapistProfile queryset,
+    ordered by date, start time and therapist. Slot starts advance by
+    ``step`` minutes inside each free interval (``duration`` by default).
+    """
+    step = step or duration
+    now = timezone.localtime(now or timezone.now())
+    now_minutes = to_minutes(now)
+
+    therapists = list(profiles.order_by('pk').values_list(
+        'pk', 'user_id', 'user__first_name', 'user__last_name', 'user__username'
+    ))
+    if not therapists:
+        return []
+    profile_ids = profiles.order_by().values('pk')
+    user_ids = profiles.order_by().values('user_id')
+
+    weekly = defaultdict(lambda: defaultdict(list))
+    for profile_id, day_of_week, start, end in WorkingHours.objects.filter(
+        physiotherapist_id__in=profile_ids
+    ).values_list('physiotherapist_id', 'day_of_week', 'start_time', 'end_time'):
+        weekly[profile_id][day_of_week].append((to_minutes(start), to_minutes(end)))
+
+    extra_hours = defaultdict(list)
+    time_off = defaultdict(list)
+    for profile_id, date, start, end, is_available in AvailabilityException.objects.filter(
+        physiotherapist_id__in=profile_ids, date__range=(start_date, end_date)
+    ).values_list('physiotherapist_id', 'date', 'start_time', 'end_time', 'is_available'):
+        interval = (
+            to_minutes(start) if start else 0,
+            to_minutes(end) if end else END_OF_DAY,
+        )
+        (extra_hours if is_available else time_off)[profile_id, date].append(interval)
+
+    booked = defaultdict(list)
+    for user_id, date, start, end in Appointment.objects.filter(
+        physiotherapist_id__in=user_ids,
+        date__range=(start_date, end_date),
+    ).exclude(status__in=NON_BLOCKING_STATUSES).values_list(
+        'physiotherapist_id', 'date', 'start_time', 'end_time'
+    ):
+        booked[user_id, date].append((to_minutes(start), to_minutes(end)))
+
+    slots = []
+    date = max(start_date, now.date())
+    while date <= end_date:
+        day_slots = []
+        earliest = now_minutes if date == now.date() else 0
+        for profile_id, user_id, first_name, last_name, username in therapists:
+            working = weekly[profile_id][date.weekday()] + extra_hours.get((profile_id, date), [])
+            if not working:
+                continue
+            free = merge_intervals(working)
+            off = time_off.get((profile_id, date))
+            if off:
+                free = subtract_intervals(free, merge_intervals(off))
+            busy = booked.get((user_id, date))
+            if busy:
+                free = subtract_intervals(free, merge_intervals(busy))
+
+            name = f'{first_name} {last_name}'.strip() or username
+            for start, end in free:
+                slot_start = start
+                while slot_start < earliest:
+                    slot_start += step
+                while slot_start + duration <= end:
+                    day_slots.append((slot_start, profile_id, user_id, name))
+                    slot_start += step
+
+        day_slots.sort()
+        for start, profile_id, user_id, name in day_slots:
+            slots.append({
+                'physiotherapist': user_id,
+                'physiotherapist_profile': profile_id,
+                'physiotherapist_name': name,
+                'date': date,
+                'start_time': to_time(start),
+                'end_time': to_time(start + duration),
+            })
+            if limit is not None and len(slots) >= limit:
+                return slots
+        date += timedelta(days=1)
+    return slots
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0001_initial'),
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=False)),
+                ('reason', models.CharField(blank=True, max_length=255, null=True)),
+                ('physiotherapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_exceptions', to='authentication.physiotherapistprofile')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day_of_week', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('physiotherapist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='authentication.physiotherapistprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'Working Hours',
+                'ordering': ['physiotherapist', 'day_of_week', 'start_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0002_availability'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['physiotherapist', 'date', 'start_time'], name='appointments_physio_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'date', 'start_time'], name='appointments_patient_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('status__in', ['scheduled', 'confirmed'])), fields=['date', 'start_time'], name='appointments_upcoming_idx'),
+        ),
+    ]
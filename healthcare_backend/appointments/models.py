@@ -27,6 +27,16 @@ class Appointment(models.Model):
     
     class Meta:
         ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['physiotherapist', 'date', 'start_time'], name='appointments_physio_day_idx'),
+            models.Index(fields=['patient', 'date', 'start_time'], name='appointments_patient_day_idx'),
+            # SQLite only matches this condition against literal statuses, so it
+            # serves PostgreSQL, where Django interpolates parameters client-side
+            models.Index(
+                fields=['date', 'start_time'], name='appointments_upcoming_idx',
+                condition=models.Q(status__in=['scheduled', 'confirmed']),
+            ),
+        ]
 
 class AppointmentFeedback(models.Model):
     RATING_CHOICES = (
@@ -44,3 +54,46 @@ class AppointmentFeedback(models.Model):
     
     def __str__(self):
         return f"Feedback for appointment on {self.appointment.date}"
+
+class WorkingHours(models.Model):
+    DAYS_OF_WEEK = (
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    )
+    
+    physiotherapist = models.ForeignKey('authentication.PhysiotherapistProfile', on_delete=models.CASCADE, related_name='working_hours')
+    day_of_week = models.PositiveSmallIntegerField(choices=DAYS_OF_WEEK)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    
+    def __str__(self):
+        return f"{self.physiotherapist.user.username}: {self.get_day_of_week_display()} {self.start_time}-{self.end_time}"
+    
+    class Meta:
+        verbose_name_plural = "Working Hours"
+        ordering = ['physiotherapist', 'day_of_week', 'start_time']
+
+class AvailabilityException(models.Model):
+    """
+    A one-off change to a physiotherapist's weekly working hours: time off
+    when is_available is False, extra hours when it is True. Leaving the
+    times empty covers the whole day.
+    """
+    physiotherapist = models.ForeignKey('authentication.PhysiotherapistProfile', on_delete=models.CASCADE, related_name='availability_exceptions')
+    date = models.DateField()
+    start_time = models.TimeField(blank=True, null=True)
+    end_time = models.TimeField(blank=True, null=True)
+    is_available = models.BooleanField(default=False)
+    reason = models.CharField(max_length=255, blank=True, null=True)
+    
+    def __str__(self):
+        kind = 'Extra hours' if self.is_available else 'Time off'
+        return f"{kind} for {self.physiotherapist.user.username} on {self.date}"
+    
+    class Meta:
+        ordering = ['date', 'start_time']
@@ -1,6 +1,13 @@
 from rest_framework import serializers
-from .models import Appointment, AppointmentFeedback
-from authentication.serializers import UserSerializer
+from .availability import find_conflicts
+from .models import Appointment, AppointmentFeedback, WorkingHours, AvailabilityException
+from authentication.serializers import SpecializationFilterSerializer, UserSerializer
+
+def validate_appointment_time(physiotherapist, date, start_time, end_time, exclude_pk=None):
+    if end_time <= start_time:
+        raise serializers.ValidationError("End time must be after start time")
+    if find_conflicts(physiotherapist, date, start_time, end_time, exclude_pk=exclude_pk).exists():
+        raise serializers.ValidationError("The physiotherapist already has an appointment at this time")
 
 class AppointmentSerializer(serializers.ModelSerializer):
     patient = UserSerializer(read_only=True)
@@ -17,6 +24,12 @@ class AppointmentCreateSerializer(serializers.ModelSerializer):
         model = Appointment
         fields = ['physiotherapist', 'date', 'start_time', 'end_time', 'reason', 'notes']
     
+    def validate(self, data):
+        validate_appointment_time(
+            data['physiotherapist'], data['date'], data['start_time'], data['end_time']
+        )
+        return data
+    
     def create(self, validated_data):
         # Set the patient to the current user
         validated_data['patient'] = self.context['request'].user
@@ -26,9 +39,66 @@ class AppointmentUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['date', 'start_time', 'end_time', 'status', 'reason', 'notes']
+    
+    def validate(self, data):
+        if self.instance and {'date', 'start_time', 'end_time'} & data.keys():
+            validate_appointment_time(
+                self.instance.physiotherapist_id,
+                data.get('date', self.instance.date),
+                data.get('start_time', self.instance.start_time),
+                data.get('end_time', self.instance.end_time),
+                exclude_pk=self.instance.pk,
+            )
+        return data
 
 class AppointmentFeedbackSerializer(serializers.ModelSerializer):
     class Meta:
         model = AppointmentFeedback
         fields = ['id', 'appointment', 'rating', 'comments', 'created_at']
-        read_only_fields = ['created_at']
\ No newline at end of file
+        read_only_fields = ['created_at']
+
+class WorkingHoursSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WorkingHours
+        fields = ['id', 'physiotherapist', 'day_of_week', 'start_time', 'end_time']
+        read_only_fields = ['physiotherapist']
+    
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if end_time <= start_time:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
+class AvailabilityExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AvailabilityException
+        fields = ['id', 'physiotherapist', 'date', 'start_time', 'end_time', 'is_available', 'reason']
+        read_only_fields = ['physiotherapist']
+    
+    def validate(self, data):
+        # Partial updates keep the times they do not change
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError("Give both start and end time, or neither for the whole day")
+        if start_time is not None and end_time <= start_time:
+            raise serializers.ValidationError("End time must be after start time")
+        return data
+
+class SlotSearchSerializer(SpecializationFilterSerializer):
+    """Query parameters of the free-slot search"""
+    MAX_RANGE_DAYS = 90
+    
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    duration = serializers.IntegerField(min_value=5, max_value=480, default=60)
+    step = serializers.IntegerField(min_value=5, max_value=480, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=1000, default=100)
+    
+    def validate(self, data):
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must not be before start date")
+        if (data['end_date'] - data['start_date']).days >= self.MAX_RANGE_DAYS:
+            raise serializers.ValidationError(f"Search at most {self.MAX_RANGE_DAYS} days at a time")
+        return data
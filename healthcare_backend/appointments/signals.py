@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from healthcare_backend import search
+from notifications.fanout import notify_appointment_change
+from .models import Appointment
+
+search.register(Appointment, ['reason', 'notes'], weights=[2, 1])
+
+
+@receiver(post_save, sender=Appointment)
+def notify_on_appointment_change(sender, instance, created, **kwargs):
+    transaction.on_commit(lambda: notify_appointment_change(instance, created=created))
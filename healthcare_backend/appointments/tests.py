@@ -1,3 +1,229 @@
+from datetime import date, datetime, time, timedelta
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentication.models import PhysiotherapistProfile
+from .availability import find_free_slots, merge_intervals, subtract_intervals
+from .models import Appointment, AvailabilityException, WorkingHours
 
-# Create your tests here.
+User = get_user_model()
+
+# A Monday well in the future so "now" never trims the search
+MONDAY = date(2031, 1, 6)
+NOW = timezone.make_aware(datetime(2030, 1, 1, 8, 0))
+
+
+class IntervalTests(TestCase):
+    def test_merge_intervals(self):
+        self.assertEqual(
+            merge_intervals([(600, 660), (540, 600), (700, 720), (710, 730)]),
+            [(540, 660), (700, 730)],
+        )
+
+    def test_subtract_intervals(self):
+        self.assertEqual(
+            subtract_intervals([(540, 720), (780, 1020)], [(600, 660), (700, 800), (1000, 1100)]),
+            [(540, 600), (660, 700), (800, 1000)],
+        )
+
+
+class AvailabilityTestMixin:
+    def create_therapist(self, specializations='Sports'):
+        count = User.objects.count()
+        user = User.objects.create_user(
+            username=f'therapist{count}', password='password123', user_type='physiotherapist'
+        )
+        profile = PhysiotherapistProfile.objects.create(
+            user=user, license_number=f'LIC{count}', specializations=specializations
+        )
+        return profile
+
+    def add_hours(self, profile, day_of_week=0, start=time(9), end=time(12)):
+        return WorkingHours.objects.create(
+            physiotherapist=profile, day_of_week=day_of_week, start_time=start, end_time=end
+        )
+
+    def book(self, profile, day, start, end, status='scheduled'):
+        return Appointment.objects.create(
+            patient=self.patient, physiotherapist=profile.user, date=day,
+            start_time=start, end_time=end, reason='Back pain', status=status,
+        )
+
+
+class FreeSlotSearchTests(AvailabilityTestMixin, TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='password123')
+
+    def slot_times(self, slots):
+        return [(slot['date'], slot['start_time']) for slot in slots]
+
+    def test_slots_skip_booked_time(self):
+        profile = self.create_therapist()
+        self.add_hours(profile)
+        self.book(profile, MONDAY, time(10), time(10, 30))
+        self.book(profile, MONDAY, time(11), time(12), status='cancelled')
+
+        slots = find_free_slots(
+            PhysiotherapistProfile.objects.all(), MONDAY, MONDAY, 60, step=30, now=NOW
+        )
+        self.assertEqual(
+            [slot['start_time'] for slot in slots],
+            [time(9), time(10, 30), time(11)],
+        )
+        self.assertEqual(slots[0]['physiotherapist'], profile.user_id)
+        self.assertEqual(slots[0]['end_time'], time(10))
+
+    def test_exceptions_remove_and_add_hours(self):
+        profile = self.create_therapist()
+        self.add_hours(profile)
+        AvailabilityException.objects.create(
+            physiotherapist=profile, date=MONDAY, start_time=time(9), end_time=time(11)
+        )
+        AvailabilityException.objects.create(physiotherapist=profile, date=MONDAY + timedelta(days=7))
+        AvailabilityException.objects.create(
+            physiotherapist=profile, date=MONDAY + timedelta(days=1),
+            start_time=time(14), end_time=time(15), is_available=True,
+        )
+
+        slots = find_free_slots(
+            PhysiotherapistProfile.objects.all(), MONDAY, MONDAY + timedelta(days=7), 60, now=NOW
+        )
+        self.assertEqual(self.slot_times(slots), [
+            (MONDAY, time(11)),
+            (MONDAY + timedelta(days=1), time(14)),
+        ])
+
+    def test_past_times_are_not_offered(self):
+        profile = self.create_therapist()
+        self.add_hours(profile, day_of_week=MONDAY.weekday())
+        now = timezone.make_aware(datetime.combine(MONDAY, time(10, 15)))
+
+        slots = find_free_slots(PhysiotherapistProfile.objects.all(), MONDAY, MONDAY, 30, now=now)
+        self.assertEqual([slot['start_time'] for slot in slots], [time(10, 30), time(11), time(11, 30)])
+
+    def test_slots_are_ordered_across_therapists_and_limited(self):
+        first, second = self.create_therapist(), self.create_therapist()
+        self.add_hours(first, start=time(10))
+        self.add_hours(second, start=time(9))
+
+        slots = find_free_slots(
+            PhysiotherapistProfile.objects.all(), MONDAY, MONDAY, 60, limit=3, now=NOW
+        )
+        self.assertEqual(
+            [(slot['start_time'], slot['physiotherapist_profile']) for slot in slots],
+            [(time(9), second.pk), (time(10), first.pk), (time(10), second.pk)],
+        )
+
+    def test_query_count_does_not_grow_with_therapists(self):
+        def search_queries():
+            with CaptureQueriesContext(connection) as queries:
+                find_free_slots(
+                    PhysiotherapistProfile.objects.all(), MONDAY, MONDAY + timedelta(days=30), 30, now=NOW
+                )
+            return len(queries)
+
+        profile = self.create_therapist()
+        self.add_hours(profile)
+        self.book(profile, MONDAY, time(9), time(10))
+        baseline = search_queries()
+
+        for _ in range(5):
+            profile = self.create_therapist()
+            for day in range(5):
+                self.add_hours(profile, day_of_week=day)
+            self.book(profile, MONDAY, time(9), time(10))
+        self.assertEqual(search_queries(), baseline)
+        self.assertEqual(baseline, 4)
+
+
+class AvailabilityAPITests(AvailabilityTestMixin, TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='password123')
+        self.profile = self.create_therapist(specializations='Sports, Orthopedics')
+        self.add_hours(self.profile, day_of_week=MONDAY.weekday())
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.patient)
+
+    def test_available_slots_filters_by_specialization(self):
+        other = self.create_therapist(specializations='Neurology')
+        self.add_hours(other, day_of_week=MONDAY.weekday())
+
+        response = self.client.get('/api/appointments/available_slots/', {
+            'specialization': 'sports', 'start_date': MONDAY, 'end_date': MONDAY, 'duration': 60,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertTrue(all(slot['physiotherapist'] == self.profile.user_id for slot in response.data))
+
+    def test_available_slots_rejects_long_ranges(self):
+        response = self.client.get('/api/appointments/available_slots/', {
+            'start_date': MONDAY, 'end_date': MONDAY + timedelta(days=120), 'duration': 60,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_overlapping_booking_is_rejected(self):
+        self.book(self.profile, MONDAY, time(10), time(11))
+        payload = {
+            'physiotherapist': self.profile.user_id, 'date': MONDAY,
+            'start_time': '10:30', 'end_time': '11:30', 'reason': 'Knee pain',
+        }
+        response = self.client.post('/api/appointments/', payload)
+        self.assertEqual(response.status_code, 400)
+
+        payload.update(start_time='11:00', end_time='12:00')
+        response = self.client.post('/api/appointments/', payload)
+        self.assertEqual(response.status_code, 201)
+
+    def test_rescheduling_onto_a_booked_slot_is_rejected(self):
+        self.book(self.profile, MONDAY, time(10), time(11))
+        appointment = self.book(self.profile, MONDAY, time(11), time(12))
+
+        response = self.client.patch(
+            f'/api/appointments/{appointment.pk}/', {'start_time': '10:30'}
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.patch(
+            f'/api/appointments/{appointment.pk}/', {'end_time': '11:30'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_physiotherapist_manages_own_working_hours(self):
+        self.client.force_authenticate(user=self.profile.user)
+        response = self.client.post('/api/working-hours/', {
+            'day_of_week': 2, 'start_time': '13:00', 'end_time': '17:00',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['physiotherapist'], self.profile.pk)
+
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post('/api/working-hours/', {
+            'day_of_week': 2, 'start_time': '13:00', 'end_time': '17:00',
+        })
+        self.assertEqual(response.status_code, 403)
+
+    def test_working_hours_partial_update(self):
+        hours = WorkingHours.objects.get(physiotherapist=self.profile)
+        self.client.force_authenticate(user=self.profile.user)
+
+        response = self.client.patch(f'/api/working-hours/{hours.pk}/', {'day_of_week': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['day_of_week'], 1)
+
+        response = self.client.patch(f'/api/working-hours/{hours.pk}/', {'end_time': '08:00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_availability_exception_partial_update(self):
+        exception = AvailabilityException.objects.create(
+            physiotherapist=self.profile, date=MONDAY, start_time=time(9), end_time=time(10)
+        )
+        self.client.force_authenticate(user=self.profile.user)
+
+        response = self.client.patch(f'/api/availability-exceptions/{exception.pk}/', {'end_time': '11:00'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['end_time'], '11:00:00')
+
+        response = self.client.patch(f'/api/availability-exceptions/{exception.pk}/', {'start_time': '12:00'})
+        self.assertEqual(response.status_code, 400)
@@ -3,6 +3,7 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from healthcare_backend.prefetch import apply_prefetch_plan
 from .models import Appointment, AppointmentFeedback
 from .serializers import (
     AppointmentSerializer, AppointmentCreateSerializer,
@@ -32,6 +33,7 @@ class AppointmentListCreateView(APIView):
         if date_filter:
             appointments = appointments.filter(date=date_filter)
             
+        appointments = apply_prefetch_plan(appointments, AppointmentSerializer)
         serializer = AppointmentSerializer(appointments, many=True)
         return Response(serializer.data)
     
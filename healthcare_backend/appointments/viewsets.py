@@ -3,20 +3,28 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
+from healthcare_backend.prefetch import PrefetchPlanMixin
+from healthcare_backend.projections import FastListMixin, project
+from healthcare_backend.search import FullTextSearchFilter
 from django.db import models
-from .models import Appointment, AppointmentFeedback
+from authentication.models import PhysiotherapistProfile
+from authentication.specializations import filter_by_specializations
+from .availability import find_free_slots
+from .models import Appointment, AppointmentFeedback, WorkingHours, AvailabilityException
 from .serializers import (
     AppointmentSerializer, AppointmentCreateSerializer,
-    AppointmentUpdateSerializer, AppointmentFeedbackSerializer
+    AppointmentUpdateSerializer, AppointmentFeedbackSerializer,
+    WorkingHoursSerializer, AvailabilityExceptionSerializer, SlotSearchSerializer
 )
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(FastListMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing appointments.
     Provides CRUD operations for appointments with proper permissions.
+    Lists are rendered from values rows by the serializer's projection.
     """
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['status', 'date', 'physiotherapist', 'patient']
     search_fields = ['reason', 'notes']
     ordering_fields = ['date', 'start_time', 'created_at']
@@ -149,9 +157,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             date__gte=timezone.now().date(),
             status__in=['scheduled', 'confirmed']
         ).order_by('date', 'start_time')
-        
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(self.render_list(project(queryset, self.get_serializer_class())))
     
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def past(self, request):
@@ -163,11 +169,96 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         queryset = self.get_queryset().filter(
             date__lt=timezone.now().date()
         ).order_by('-date', '-start_time')
+        return Response(self.render_list(project(queryset, self.get_serializer_class())))
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def available_slots(self, request):
+        """
+        Search open slots across available physiotherapists.
+        Query params: start_date, end_date, duration (minutes), and
+        optionally specialization (comma-separated), specialization_match
+        (any or all), step (minutes) and limit.
+        """
+        params = SlotSearchSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = params.validated_data
         
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        profiles = PhysiotherapistProfile.objects.filter(is_available=True, user__is_active=True)
+        if data.get('specialization'):
+            profiles = filter_by_specializations(
+                profiles, data['specialization'], data['specialization_match']
+            )
+        
+        slots = find_free_slots(
+            profiles, data['start_date'], data['end_date'], data['duration'],
+            step=data.get('step'), limit=data['limit'],
+        )
+        return Response(slots)
+
+class AvailabilityViewSetMixin:
+    """
+    Physiotherapists manage their own availability and admins manage
+    everyone's; other users can only read it to plan a booking.
+    """
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend]
+    
+    def get_queryset(self):
+        user = self.request.user
+        queryset = self.queryset.select_related('physiotherapist__user')
+        if user.user_type == 'physiotherapist':
+            return queryset.filter(physiotherapist__user=user)
+        return queryset
+    
+    def check_can_manage(self):
+        user = self.request.user
+        if not (user.is_superuser or user.user_type in ['admin', 'physiotherapist']):
+            return Response(
+                {'error': 'Only physiotherapists can manage their availability'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return None
+    
+    def create(self, request, *args, **kwargs):
+        if request.user.user_type != 'physiotherapist':
+            return Response(
+                {'error': 'Only physiotherapists can add availability'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not hasattr(request.user, 'physiotherapist_profile'):
+            return Response(
+                {'error': 'Physiotherapist profile not found'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return super().create(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        serializer.save(physiotherapist=self.request.user.physiotherapist_profile)
+    
+    def update(self, request, *args, **kwargs):
+        return self.check_can_manage() or super().update(request, *args, **kwargs)
+    
+    def destroy(self, request, *args, **kwargs):
+        return self.check_can_manage() or super().destroy(request, *args, **kwargs)
+
+class WorkingHoursViewSet(AvailabilityViewSetMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for a physiotherapist's weekly working hours.
+    """
+    queryset = WorkingHours.objects.all()
+    serializer_class = WorkingHoursSerializer
+    filterset_fields = ['physiotherapist', 'day_of_week']
+
+class AvailabilityExceptionViewSet(AvailabilityViewSetMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
+    """
+    ViewSet for one-off time off or extra hours.
+    """
+    queryset = AvailabilityException.objects.all()
+    serializer_class = AvailabilityExceptionSerializer
+    filterset_fields = ['physiotherapist', 'date', 'is_available']
 
-class AppointmentFeedbackViewSet(viewsets.ModelViewSet):
+class AppointmentFeedbackViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing appointment feedback.
     """
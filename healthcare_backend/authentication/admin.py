@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, PatientProfile, PhysiotherapistProfile
+from .models import User, PatientProfile, PhysiotherapistProfile, Specialization
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'user_type', 'is_verified', 'is_staff')
@@ -21,6 +21,11 @@ class PhysiotherapistProfileAdmin(admin.ModelAdmin):
     list_filter = ('is_available',)
     search_fields = ('user__username', 'user__email', 'license_number', 'specializations')
 
+class SpecializationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(PatientProfile, PatientProfileAdmin)
 admin.site.register(PhysiotherapistProfile, PhysiotherapistProfileAdmin)
+admin.site.register(Specialization, SpecializationAdmin)
@@ -0,0 +1,30 @@
+from django.contrib.auth.backends import ModelBackend
+from .hashing import hash_password, verify_password
+from .models import User
+
+
+class PooledHashingModelBackend(ModelBackend):
+    """
+    ModelBackend whose aauthenticate() verifies passwords on the hashing
+    pool. Django's own runs the hasher on the event loop, which stalls
+    every other request the loop is serving.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await User._default_manager.aget_by_natural_key(username)
+        except User.DoesNotExist:
+            # Hash anyway so that unknown usernames take as long as wrong passwords
+            await hash_password(password)
+            return None
+        valid, must_update = await verify_password(password, user.password)
+        if not valid or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = await hash_password(password)
+            await user.asave(update_fields=['password'])
+        return user
@@ -0,0 +1,56 @@
+"""
+Password hashing off the request path.
+
+PBKDF2 takes hundreds of milliseconds of CPU by design. The sync login,
+registration and password change views hashed inside the request, so
+under ASGI every concurrent login got a thread of its own and a login
+wave took every core away from the other requests. The async views hash
+on a pool of PASSWORD_HASHING_WORKERS threads instead (half the cores by
+default). Hashing releases the GIL, so the pool runs in parallel, but
+logins beyond its size queue for a worker instead of crowding out
+requests that are not logins.
+
+The functions here only hash. The database work stays with the caller.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_workers():
+    return getattr(settings, 'PASSWORD_HASHING_WORKERS', max(1, (os.cpu_count() or 2) // 2))
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_workers(), thread_name_prefix='password-hashing')
+        return _executor
+
+
+def _verify(password, encoded):
+    upgrade = []
+    # The setter only records that the hash needs upgrading, the caller
+    # saves the new one from its own thread
+    valid = check_password(password, encoded, setter=upgrade.append)
+    return valid, bool(upgrade)
+
+
+async def hash_password(password):
+    """make_password() on the hashing pool"""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), make_password, password)
+
+
+async def verify_password(password, encoded):
+    """
+    check_password() on the hashing pool; return whether the password
+    matches and whether its hash should be upgraded to the preferred hasher
+    """
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), _verify, password, encoded)
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from authentication.models import PhysiotherapistProfile
+from authentication.specializations import sync_specializations
+from healthcare_backend.response_cache import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Relink physiotherapist profiles to the specializations in their text, e.g. after '
+        'profiles were written with bulk_create() or QuerySet.update()'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of profiles relinked per transaction',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        batch_size = options['batch_size']
+        profiles = PhysiotherapistProfile.objects.using(using).only('pk', 'specializations').order_by('pk')
+        changed = 0
+        batch = []
+        for profile in profiles.iterator(chunk_size=batch_size):
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                changed += sync_specializations(batch, using)
+                batch = []
+        changed += sync_specializations(batch, using)
+        if changed:
+            bump_version(PhysiotherapistProfile)
+        self.stdout.write(self.style.SUCCESS(f'Relinked specializations of {changed} profile(s)'))
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def parse_specializations(apps, schema_editor):
+    """Tag every profile with the specializations in its comma-separated field"""
+    db = schema_editor.connection.alias
+    PhysiotherapistProfile = apps.get_model('authentication', 'PhysiotherapistProfile')
+    Specialization = apps.get_model('authentication', 'Specialization')
+    PhysiotherapistSpecialization = apps.get_model('authentication', 'PhysiotherapistSpecialization')
+
+    tags = {}
+    links = []
+    profiles = PhysiotherapistProfile.objects.using(db).values_list('id', 'specializations')
+    for profile_id, text in profiles.iterator():
+        slugs = set()
+        for name in (text or '').split(','):
+            name = ' '.join(name.split())
+            slug = slugify(name)
+            if slug and slug not in slugs:
+                slugs.add(slug)
+                tags.setdefault(slug, name)
+                links.append((profile_id, slug))
+
+    Specialization.objects.using(db).bulk_create(
+        [Specialization(slug=slug, name=name) for slug, name in tags.items()], batch_size=1000
+    )
+    ids = dict(Specialization.objects.using(db).values_list('slug', 'id'))
+    PhysiotherapistSpecialization.objects.using(db).bulk_create([
+        PhysiotherapistSpecialization(profile_id=profile_id, specialization_id=ids[slug])
+        for profile_id, slug in links
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Specialization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('slug', models.SlugField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PhysiotherapistSpecialization',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='specialization_links', to='authentication.physiotherapistprofile')),
+                ('specialization', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='profile_links', to='authentication.specialization')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='physiotherapistprofile',
+            name='specialization_tags',
+            field=models.ManyToManyField(blank=True, related_name='physiotherapists', through='authentication.PhysiotherapistSpecialization', to='authentication.specialization'),
+        ),
+        migrations.AddConstraint(
+            model_name='physiotherapistspecialization',
+            constraint=models.UniqueConstraint(fields=('specialization', 'profile'), name='authentication_specialization_profile_uniq'),
+        ),
+        migrations.RunPython(parse_specializations, migrations.RunPython.noop),
+    ]
@@ -40,6 +40,41 @@ class PhysiotherapistProfile(models.Model):
     certifications = models.TextField(blank=True, null=True)
     consultation_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     is_available = models.BooleanField(default=True)
+    # Parsed from specializations on save, see authentication.specializations
+    specialization_tags = models.ManyToManyField(
+        'Specialization', through='PhysiotherapistSpecialization',
+        related_name='physiotherapists', blank=True,
+    )
     
     def __str__(self):
         return f"Physiotherapist Profile - {self.user.username}"
+
+class Specialization(models.Model):
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+class PhysiotherapistSpecialization(models.Model):
+    profile = models.ForeignKey(
+        PhysiotherapistProfile, on_delete=models.CASCADE, related_name='specialization_links'
+    )
+    # Indexed by the unique constraint, which also covers finding the
+    # profiles with a specialization
+    specialization = models.ForeignKey(
+        Specialization, on_delete=models.CASCADE, related_name='profile_links', db_index=False
+    )
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['specialization', 'profile'], name='authentication_specialization_profile_uniq'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.profile.user.username} - {self.specialization.name}"
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from .models import PatientProfile, PhysiotherapistProfile
+from .specializations import MATCH_CHOICES, MAX_FILTER_SPECIALIZATIONS, parse_filter
 
 User = get_user_model()
 
@@ -45,10 +47,14 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         return data
     
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            password=validated_data['password'],
+        # RegisterView hashes the password on the hashing pool and passes
+        # the hash in with save(password_hash=...)
+        password_hash = validated_data.get('password_hash') or make_password(validated_data['password'])
+        # What create_user() does, without hashing the password again
+        user = User.objects.create(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data['email']),
+            password=password_hash,
             first_name=validated_data.get('first_name', ''),
             last_name=validated_data.get('last_name', ''),
             user_type=validated_data.get('user_type', 'patient'),
@@ -88,4 +94,19 @@ class PasswordChangeSerializer(serializers.Serializer):
     def validate(self, data):
         if data['new_password'] != data['confirm_password']:
             raise serializers.ValidationError("New passwords do not match")
-        return data
\ No newline at end of file
+        return data
+
+class SpecializationFilterSerializer(serializers.Serializer):
+    """
+    Query parameters filtering physiotherapists by specialization: a
+    comma-separated list, matched by any (the default) or all of them
+    """
+    specialization = serializers.CharField(required=False)
+    specialization_match = serializers.ChoiceField(choices=MATCH_CHOICES, default='any')
+    
+    def validate_specialization(self, value):
+        if len(parse_filter(value)) > MAX_FILTER_SPECIALIZATIONS:
+            raise serializers.ValidationError(
+                f"Filter by at most {MAX_FILTER_SPECIALIZATIONS} specializations at a time"
+            )
+        return value
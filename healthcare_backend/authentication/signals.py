@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from healthcare_backend import search
+from .models import PhysiotherapistProfile, User
+from .specializations import sync_specializations
+from .tokens import invalidate_token, invalidate_user_tokens
+
+search.register(User, ['username', 'email', 'first_name', 'last_name'])
+search.register(
+    PhysiotherapistProfile, ['user__first_name', 'user__last_name', 'specializations', 'education'],
+    weights=[3, 3, 5, 1],
+)
+
+
+@receiver(post_save, sender=PhysiotherapistProfile)
+def sync_specialization_tags(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and 'specializations' not in update_fields:
+        return
+    sync_specializations([instance], using)
+
+
+@receiver(post_delete, sender=Token)
+def uncache_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def uncache_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    # Logging in only moves last_login, which nothing reads off request.user
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_user_tokens(instance.pk)
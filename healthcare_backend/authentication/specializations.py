@@ -0,0 +1,90 @@
+"""
+Specialization tags of physiotherapist profiles.
+
+PhysiotherapistProfile.specializations stays the comma-separated text that
+profiles are edited with; each save parses it into Specialization rows
+linked through PhysiotherapistSpecialization, so filtering by
+specialization is an indexed lookup on the tag's slug rather than a
+substring scan of the text:
+
+    filter_by_specializations(profiles, 'sports injuries, neurology', match='all')
+
+Writes that bypass signals, such as bulk_create(), need
+``manage.py rebuild_specialization_tags`` afterwards.
+"""
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.text import slugify
+from .models import PhysiotherapistSpecialization, Specialization
+
+MATCH_CHOICES = ['any', 'all']
+
+# Bounds the number of joins an all-of filter can ask for
+MAX_FILTER_SPECIALIZATIONS = 10
+
+
+def parse_specializations(text):
+    """Map the slug of each specialization in ``text`` to its name, first spelling wins"""
+    tags = {}
+    for name in (text or '').split(','):
+        name = ' '.join(name.split())
+        slug = slugify(name)
+        if slug:
+            tags.setdefault(slug, name)
+    return tags
+
+
+def sync_specializations(profiles, using=DEFAULT_DB_ALIAS):
+    """Relink ``profiles`` to the specializations in their text; return how many changed"""
+    wanted = {
+        profile.pk: set(parse_specializations(profile.specializations)) for profile in profiles
+    }
+    current = {pk: set() for pk in wanted}
+    links = PhysiotherapistSpecialization.objects.using(using).filter(profile_id__in=wanted)
+    for profile_id, slug in links.values_list('profile_id', 'specialization__slug'):
+        current[profile_id].add(slug)
+    changed = [pk for pk in wanted if wanted[pk] != current[pk]]
+    if not changed:
+        return 0
+
+    names = {}
+    for profile in profiles:
+        if profile.pk in changed:
+            for slug, name in parse_specializations(profile.specializations).items():
+                names.setdefault(slug, name)
+    with transaction.atomic(using=using):
+        Specialization.objects.using(using).bulk_create(
+            [Specialization(slug=slug, name=name) for slug, name in names.items()],
+            ignore_conflicts=True,
+        )
+        ids = dict(Specialization.objects.using(using).filter(slug__in=names).values_list('slug', 'id'))
+        PhysiotherapistSpecialization.objects.using(using).filter(profile_id__in=changed).delete()
+        PhysiotherapistSpecialization.objects.using(using).bulk_create([
+            PhysiotherapistSpecialization(profile_id=pk, specialization_id=ids[slug])
+            for pk in changed for slug in wanted[pk]
+        ])
+    return len(changed)
+
+
+def parse_filter(value):
+    """Slugs of the comma-separated specializations asked for, without duplicates"""
+    return list(parse_specializations(value))
+
+
+def filter_by_specializations(queryset, value, match='any'):
+    """
+    Keep the profiles with any, or all, of the comma-separated
+    specializations in ``value``, compared by slug.
+    """
+    slugs = parse_filter(value)
+    if not slugs:
+        return queryset
+    links = PhysiotherapistSpecialization.objects.using(queryset.db)
+    # Subqueries rather than joins, so profiles with several of the
+    # specializations come back once without DISTINCT
+    if match == 'all':
+        for slug in slugs:
+            queryset = queryset.filter(
+                pk__in=links.filter(specialization__slug=slug).values('profile_id')
+            )
+        return queryset
+    return queryset.filter(pk__in=links.filter(specialization__slug__in=slugs).values('profile_id'))
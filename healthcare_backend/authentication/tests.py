@@ -1,3 +1,228 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from authentication.models import (
+    PatientProfile, PhysiotherapistProfile, PhysiotherapistSpecialization, Specialization, User,
+)
+from authentication import hashing
+from authentication.specializations import filter_by_specializations
+from authentication.tokens import INVALIDATED, local_cache, token_cache_key
 
-# Create your tests here.
+
+class SpecializationTagTests(TestCase):
+    def setUp(self):
+        self.sports = self.create_therapist('sports', 'Sports Injuries, Orthopedics')
+        self.neuro = self.create_therapist('neuro', 'Neurology,  orthopedics ,')
+        self.pediatric = self.create_therapist('pediatric', 'Pediatric Sports')
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='patient', password='pw'))
+
+    def create_therapist(self, username, specializations):
+        user = User.objects.create_user(username=username, password='pw', user_type='physiotherapist')
+        return PhysiotherapistProfile.objects.create(
+            user=user, license_number=f'LIC-{username}', specializations=specializations
+        )
+
+    def tags(self, profile):
+        return set(profile.specialization_tags.values_list('slug', flat=True))
+
+    def listed(self, **params):
+        response = self.client.get('/api/auth/physiotherapists/', params)
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data['results']}
+
+    def test_saving_a_profile_links_its_specializations(self):
+        self.assertEqual(self.tags(self.sports), {'sports-injuries', 'orthopedics'})
+        self.assertEqual(self.tags(self.neuro), {'neurology', 'orthopedics'})
+        self.assertEqual(Specialization.objects.get(slug='orthopedics').name, 'Orthopedics')
+
+        self.sports.specializations = 'Orthopedics, Chronic Pain'
+        self.sports.save()
+        self.assertEqual(self.tags(self.sports), {'orthopedics', 'chronic-pain'})
+
+        self.sports.is_available = False
+        with self.assertNumQueries(1):
+            self.sports.save(update_fields=['is_available'])
+
+    def test_filter_matches_whole_specializations(self):
+        self.assertEqual(self.listed(specialization='sports injuries'), {self.sports.pk})
+        # icontains used to match 'Pediatric Sports' and 'Sports Injuries'
+        self.assertEqual(self.listed(specialization='sports'), set())
+        self.assertEqual(self.listed(specialization='ORTHOPEDICS'), {self.sports.pk, self.neuro.pk})
+
+    def test_filter_by_any_or_all_specializations(self):
+        self.assertEqual(
+            self.listed(specialization='neurology, pediatric sports'), {self.neuro.pk, self.pediatric.pk}
+        )
+        self.assertEqual(
+            self.listed(specialization='orthopedics,neurology', specialization_match='all'), {self.neuro.pk}
+        )
+        response = self.client.get('/api/auth/physiotherapists/', {'specialization_match': 'some'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filter_uses_the_tag_indexes(self):
+        queryset = filter_by_specializations(
+            PhysiotherapistProfile.objects.all(), 'orthopedics, neurology', 'all'
+        )
+        self.assertEqual(list(queryset), [self.neuro])
+        plan = queryset.explain()
+        self.assertRegex(plan, r'physiotherapistspecialization\w* \(specialization_id=\?\)')
+        self.assertNotRegex(plan, r'SCAN authentication_physiotherapistspecialization\b')
+
+    def test_rebuild_command_links_bulk_created_profiles(self):
+        user = User.objects.create_user(username='bulk', password='pw', user_type='physiotherapist')
+        [profile] = PhysiotherapistProfile.objects.bulk_create([
+            PhysiotherapistProfile(user=user, license_number='LIC-bulk', specializations='Geriatrics')
+        ])
+        self.assertFalse(PhysiotherapistSpecialization.objects.filter(profile=profile).exists())
+
+        out = StringIO()
+        call_command('rebuild_specialization_tags', stdout=out)
+        self.assertIn('1 profile(s)', out.getvalue())
+        self.assertEqual(self.tags(profile), {'geriatrics'})
+
+
+# LocMemCache is shared by everything in the test process
+@override_settings(SHARED_CACHE_ALIAS='default')
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user(username='patient', password='password123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/profile/')
+        return response, len(queries)
+
+    def test_repeated_requests_skip_the_token_lookup(self):
+        response, first = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        response, second = self.get_profile()
+        self.assertEqual(response.data['username'], 'patient')
+        self.assertEqual(second, first - 1)
+
+        # The shared cache holds only the user id, which is loaded by primary
+        # key when the local tier is cold
+        self.assertEqual(cache.get(token_cache_key(self.token.key)), self.user.pk)
+        local_cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.data['username'], 'patient')
+        self.assertEqual(len(queries), first)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in queries))
+
+    @override_settings(SHARED_CACHE_ALIAS=None)
+    def test_process_local_cache_is_not_shared(self):
+        response, first = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(cache.get(token_cache_key(self.token.key)))
+        self.assertEqual(self.get_profile()[1], first - 1)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile()[0].status_code, 403)
+
+    def test_logout_revokes_the_cached_token(self):
+        self.get_profile()
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+        # 403 rather than 401, as SessionAuthentication comes first
+        self.assertEqual(self.get_profile()[0].status_code, 403)
+
+    def test_password_change_refreshes_the_cached_user(self):
+        self.get_profile()
+        response = self.client.post('/api/auth/change-password/', {
+            'old_password': 'password123', 'new_password': 'n3w-Passw0rd', 'confirm_password': 'n3w-Passw0rd',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache.get(token_cache_key(self.token.key)), INVALIDATED)
+        self.assertIsNone(local_cache.get(token_cache_key(self.token.key)))
+
+    def test_deactivated_users_and_deleted_tokens_are_rejected(self):
+        self.get_profile()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_profile()[0].status_code, 403)
+
+        other = User.objects.create_user(username='other', password='password123')
+        token = Token.objects.create(user=other)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(self.get_profile()[0].status_code, 200)
+        # The admin's delete action deletes through a queryset
+        Token.objects.filter(user=other).delete()
+        self.assertEqual(self.get_profile()[0].status_code, 403)
+
+    def test_lookup_racing_an_invalidation_is_not_cached(self):
+        cache.set(token_cache_key(self.token.key), INVALIDATED)
+        response, first = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_profile()[1], first)
+
+
+class AsyncPasswordViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.hashing_threads = set()
+
+    def record_thread(self, function):
+        def wrapper(*args, **kwargs):
+            self.hashing_threads.add(threading.current_thread().name)
+            return function(*args, **kwargs)
+        return wrapper
+
+    def test_register_login_and_change_password_hash_on_the_pool(self):
+        with mock.patch.object(hashing, 'make_password', self.record_thread(make_password)), \
+                mock.patch.object(hashing, 'check_password', self.record_thread(check_password)):
+            response = self.client.post('/api/auth/register/', {
+                'username': 'Ada', 'email': 'ada@EXAMPLE.com', 'password': 'password123',
+                'confirm_password': 'password123',
+            })
+            self.assertEqual(response.status_code, 201)
+            user = User.objects.get(username='Ada')
+            self.assertEqual(user.email, 'ada@example.com')
+            self.assertTrue(PatientProfile.objects.filter(user=user).exists())
+
+            response = self.client.post('/api/auth/login/', {'username': 'Ada', 'password': 'password123'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['token'], Token.objects.get(user=user).key)
+
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {response.data["token"]}')
+            response = self.client.post('/api/auth/change-password/', {
+                'old_password': 'wrong', 'new_password': 'n3w-Passw0rd', 'confirm_password': 'n3w-Passw0rd',
+            })
+            self.assertEqual(response.status_code, 400)
+            response = self.client.post('/api/auth/change-password/', {
+                'old_password': 'password123', 'new_password': 'n3w-Passw0rd', 'confirm_password': 'n3w-Passw0rd',
+            })
+            self.assertEqual(response.status_code, 200)
+
+        user.refresh_from_db()
+        self.assertTrue(user.check_password('n3w-Passw0rd'))
+        self.assertTrue(self.hashing_threads)
+        self.assertTrue(all(name.startswith('password-hashing') for name in self.hashing_threads))
+
+    def test_login_rejects_bad_credentials_and_inactive_users(self):
+        User.objects.create_user(username='inactive', password='password123', is_active=False)
+        User.objects.create_user(username='patient', password='password123')
+        for username, password in [('patient', 'wrong'), ('nobody', 'password123'), ('inactive', 'password123')]:
+            response = self.client.post('/api/auth/login/', {'username': username, 'password': password})
+            self.assertEqual(response.status_code, 401, username)
+        self.assertFalse(Token.objects.exists())
+
+    def test_login_upgrades_outdated_hashes(self):
+        user = User.objects.create(username='patient', password=make_password('password123', hasher='pbkdf2_sha1'))
+        response = self.client.post('/api/auth/login/', {'username': 'patient', 'password': 'password123'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password('password123'))
@@ -0,0 +1,156 @@
+"""
+Token authentication without a query per request.
+
+DRF's TokenAuthentication looks the token and its user up in the
+database on every request, which for cheap endpoints such as
+notification polling is half of their database work.
+CachedTokenAuthentication caches lookups in two tiers:
+
+* a small in-process LRU of the token and user, whose entries live
+  TOKEN_LOCAL_CACHE_SECONDS
+* the shared cache (see healthcare_backend.caches), whose entries live
+  TOKEN_CACHE_SECONDS and hold only the user's id, so that no password
+  hash leaves the process; a hit there loads the user by primary key
+  instead of joining the token table. Without a shared cache this tier
+  is skipped.
+
+Entries are dropped from both tiers when the token is deleted (logout,
+the admin) and when its user is saved (password changes, deactivation,
+profile edits), see authentication.signals. Other processes can still
+serve a dropped entry from their LRU until it expires, which bounds how
+long a revoked token keeps working to TOKEN_LOCAL_CACHE_SECONDS. Writes
+that send no signals, such as QuerySet.update() on users, must call
+invalidate_user_tokens() themselves.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from healthcare_backend.caches import get_shared_cache
+
+
+def get_cache_seconds():
+    return getattr(settings, 'TOKEN_CACHE_SECONDS', 5 * 60)
+
+
+def get_local_cache_seconds():
+    return getattr(settings, 'TOKEN_LOCAL_CACHE_SECONDS', 5)
+
+
+def get_local_cache_size():
+    return getattr(settings, 'TOKEN_LOCAL_CACHE_SIZE', 1024)
+
+
+class LocalTTLCache:
+    """A thread-safe LRU mapping whose entries also expire after a while"""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, seconds, size):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + seconds)
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalTTLCache()
+
+# Left in the shared cache by an invalidation, for long enough to outlast
+# any lookup that started before it
+INVALIDATED = b''
+INVALIDATED_SECONDS = 30
+
+
+def token_cache_key(key):
+    # Hashed so that cache keys, which show up in cache tooling, do not
+    # give tokens away
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    cache_key = token_cache_key(key)
+
+    def drop():
+        local_cache.delete(cache_key)
+        shared = get_shared_cache()
+        if shared is not None:
+            shared.set(cache_key, INVALIDATED, INVALIDATED_SECONDS)
+
+    drop()
+    # Again once the change is visible to other connections, in case a
+    # lookup read the old rows in the meantime
+    transaction.on_commit(drop)
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that serves repeated tokens from cache"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        # The local tier holds the pickled pair, so every request unpickles
+        # its own user and token and nothing a view changes on them is shared
+        entry = local_cache.get(cache_key)
+        if entry is not None:
+            return pickle.loads(entry)
+
+        shared = get_shared_cache()
+        user_id = shared.get(cache_key) if shared is not None else None
+        if user_id:
+            credentials = self.get_user_credentials(key, user_id)
+        else:
+            credentials = super().authenticate_credentials(key)
+            # add() so that a lookup racing an invalidation cannot replace
+            # its marker with the user it read before it
+            if user_id is not None or (
+                shared is not None and not shared.add(cache_key, credentials[0].pk, get_cache_seconds())
+            ):
+                return credentials
+        local_cache.set(cache_key, pickle.dumps(credentials), get_local_cache_seconds(), get_local_cache_size())
+        return credentials
+
+    def get_user_credentials(self, key, user_id):
+        """The (user, token) pair of a token whose user id was cached"""
+        User = get_user_model()
+        try:
+            user = User._default_manager.get(pk=user_id)
+        except User.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return user, self.get_model()(key=key, user=user)
@@ -1,45 +1,56 @@
 from django.shortcuts import get_object_or_404
-from django.contrib.auth import authenticate, login, logout, get_user_model
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aauthenticate, alogin, logout, get_user_model
 from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from healthcare_backend.async_views import AsyncAPIView
+from healthcare_backend.prefetch import PrefetchPlanMixin
+from .hashing import hash_password, verify_password
 from .models import PatientProfile, PhysiotherapistProfile
 from .serializers import (
     UserSerializer, PatientProfileSerializer, PhysiotherapistProfileSerializer,
     UserRegistrationSerializer, PatientProfileUpdateSerializer,
-    PhysiotherapistProfileUpdateSerializer, PasswordChangeSerializer
+    PhysiotherapistProfileUpdateSerializer, PasswordChangeSerializer,
+    SpecializationFilterSerializer
 )
+from .specializations import filter_by_specializations
 
 User = get_user_model()
 
-class RegisterView(APIView):
+# Registration, login and password changes hash passwords on the bounded
+# pool of authentication.hashing, so a wave of them cannot take every
+# worker away from other requests
+
+class RegisterView(AsyncAPIView):
     permission_classes = [AllowAny]
     
-    def post(self, request):
+    async def post(self, request):
         serializer = UserRegistrationSerializer(data=request.data)
-        if serializer.is_valid():
-            user = serializer.save()
-            token, created = Token.objects.get_or_create(user=user)
+        if await sync_to_async(serializer.is_valid)():
+            password_hash = await hash_password(serializer.validated_data['password'])
+            user = await sync_to_async(serializer.save)(password_hash=password_hash)
+            token, created = await Token.objects.aget_or_create(user=user)
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class LoginView(APIView):
+class LoginView(AsyncAPIView):
     permission_classes = [AllowAny]
     
-    def post(self, request):
+    async def post(self, request):
         username = request.data.get('username')
         password = request.data.get('password')
         
-        user = authenticate(username=username, password=password)
+        user = await aauthenticate(username=username, password=password)
         
         if user:
-            login(request, user)
-            token, created = Token.objects.get_or_create(user=user)
+            await alogin(request, user)
+            token, created = await Token.objects.aget_or_create(user=user)
             return Response({
                 'user': UserSerializer(user).data,
                 'token': token.key
@@ -118,23 +129,24 @@ class PhysiotherapistProfileView(APIView):
         except PhysiotherapistProfile.DoesNotExist:
             return Response({'error': 'Physiotherapist profile not found'}, status=status.HTTP_404_NOT_FOUND)
 
-class ChangePasswordView(APIView):
+class ChangePasswordView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
     
-    def post(self, request):
+    async def post(self, request):
         serializer = PasswordChangeSerializer(data=request.data)
         if serializer.is_valid():
             user = request.user
-            if user.check_password(serializer.validated_data['old_password']):
-                user.set_password(serializer.validated_data['new_password'])
-                user.save()
+            valid, _ = await verify_password(serializer.validated_data['old_password'], user.password)
+            if valid:
+                user.password = await hash_password(serializer.validated_data['new_password'])
+                await user.asave(update_fields=['password'])
                 # Update session auth hash to keep user logged in
-                login(request, user)
+                await alogin(request, user)
                 return Response({'message': 'Password changed successfully'})
             return Response({'error': 'Incorrect old password'}, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class PhysiotherapistListView(generics.ListAPIView):
+class PhysiotherapistListView(PrefetchPlanMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = PhysiotherapistProfileSerializer
     
@@ -142,8 +154,12 @@ class PhysiotherapistListView(generics.ListAPIView):
         queryset = PhysiotherapistProfile.objects.filter(user__is_active=True, is_available=True)
         
         # Filter by specialization if provided
-        specialization = self.request.query_params.get('specialization', None)
+        params = SpecializationFilterSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        specialization = params.validated_data.get('specialization')
         if specialization:
-            queryset = queryset.filter(specializations__icontains=specialization)
+            queryset = filter_by_specializations(
+                queryset, specialization, params.validated_data['specialization_match']
+            )
             
         return queryset
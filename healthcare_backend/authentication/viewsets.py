@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
 from django.db import models
 from django_filters.rest_framework import DjangoFilterBackend
+from healthcare_backend.prefetch import PrefetchPlanMixin
+from healthcare_backend.search import FullTextSearchFilter
 from .models import PatientProfile, PhysiotherapistProfile
 from .serializers import (
     UserSerializer, PatientProfileSerializer, PhysiotherapistProfileSerializer
@@ -12,7 +14,7 @@ from .serializers import (
 
 User = get_user_model()
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing users.
     Provides CRUD operations for users with proper permissions.
@@ -20,7 +22,7 @@ class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['user_type', 'is_active', 'is_verified']
     search_fields = ['username', 'email', 'first_name', 'last_name']
     ordering_fields = ['username', 'email', 'created_at', 'last_login']
@@ -108,7 +110,7 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(physiotherapists, many=True)
         return Response(serializer.data)
 
-class PatientProfileViewSet(viewsets.ModelViewSet):
+class PatientProfileViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing patient profiles.
     """
@@ -147,14 +149,14 @@ class PatientProfileViewSet(viewsets.ModelViewSet):
             )
         return super().update(request, *args, **kwargs)
 
-class PhysiotherapistProfileViewSet(viewsets.ModelViewSet):
+class PhysiotherapistProfileViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing physiotherapist profiles.
     """
     queryset = PhysiotherapistProfile.objects.all()
     serializer_class = PhysiotherapistProfileSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['is_available', 'years_of_experience']
     search_fields = ['user__first_name', 'user__last_name', 'specializations', 'education']
     ordering_fields = ['consultation_fee', 'years_of_experience', 'user__first_name']
@@ -0,0 +1,80 @@
+"""
+Offline benchmarks for the Healthcare API.
+
+Each module is a script run from the ``healthcare_backend`` directory, e.g.
+``python -m benchmarks.websocket_load``. Benchmarks build a throwaway test
+database, so they never touch ``db.sqlite3`` or need a running server.
+"""
+import contextlib
+import os
+import statistics
+import time
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
+    django.setup()
+
+
+@contextlib.contextmanager
+def benchmark_database():
+    """Create a fresh test database for the duration of a benchmark"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def create_users(count, prefix, user_type='patient', with_tokens=False):
+    """Bulk-create users sharing one precomputed password hash"""
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authtoken.models import Token
+
+    User = get_user_model()
+    password = make_password('password123')
+    users = User.objects.bulk_create([
+        User(username=f'{prefix}{i}', email=f'{prefix}{i}@example.com',
+             password=password, user_type=user_type)
+        for i in range(count)
+    ], batch_size=1000)
+    if with_tokens:
+        Token.objects.bulk_create(
+            [Token(key=Token.generate_key(), user=user) for user in users], batch_size=1000
+        )
+    return users
+
+
+def percentile(samples, percent):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """p50/p95/p99 and mean of a list of timings in seconds, reported in ms"""
+    return {
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': statistics.fmean(samples) * 1000 if samples else 0.0,
+    }
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
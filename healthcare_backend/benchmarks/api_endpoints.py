@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+"""
+API benchmark: latency, queries and response size for every GET endpoint.
+
+Seeds a clinic, then walks the URL configuration and requests every
+router endpoint under /api/ and every legacy endpoint that answers GET,
+in-process through the DRF test client with token authentication.
+Endpoints that only accept writes, or whose URL needs an object the seed
+does not provide, are listed as skipped.
+
+Results can be saved as JSON and compared with an earlier run. The
+comparison flags endpoints whose p95 latency grew by more than the
+threshold, or that now run more queries. It exits with status 1 when it
+finds any.
+
+    python -m benchmarks.api_endpoints --save before.json
+    python -m benchmarks.api_endpoints --compare before.json --threshold 0.2
+"""
+import argparse
+import io
+import json
+import platform
+import sys
+from datetime import date, time, timedelta
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+# Endpoints requested as the seeded physiotherapist instead of the patient
+THERAPIST_ENDPOINTS = {'physiotherapist-profile', 'physio-dashboard'}
+
+
+def seed(scale):
+    """Seed a small clinic around one patient and one physiotherapist"""
+    from django.core.management import call_command
+    from appointments.models import Appointment, AppointmentFeedback, AvailabilityException, WorkingHours
+    from authentication.models import PatientProfile, PhysiotherapistProfile
+    from books.models import Book, BookBookmark, BookCategory, BookReview
+    from chat.models import Conversation, ConversationMembership, Message
+    from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem, ExerciseProgress
+    from notifications.models import Notification
+    from rest_framework.authtoken.models import Token
+
+    patients = create_users(50 * scale, 'benchpatient')
+    therapists = create_users(5 * scale, 'benchtherapist', user_type='physiotherapist')
+    patient, therapist = patients[0], therapists[0]
+    PatientProfile.objects.bulk_create([PatientProfile(user=user) for user in patients])
+    profiles = PhysiotherapistProfile.objects.bulk_create([
+        PhysiotherapistProfile(user=user, license_number=f'BENCH{i}', specializations='Sports, Orthopedics')
+        for i, user in enumerate(therapists)
+    ])
+    WorkingHours.objects.bulk_create([
+        WorkingHours(physiotherapist=profile, day_of_week=day, start_time=time(9), end_time=time(17))
+        for profile in profiles for day in range(5)
+    ])
+    time_off = AvailabilityException.objects.create(physiotherapist=profiles[0], date=date.today() + timedelta(days=7))
+
+    today = date.today()
+    appointments = Appointment.objects.bulk_create([
+        Appointment(
+            patient=patients[i % len(patients)], physiotherapist=therapists[i % len(therapists)],
+            date=today + timedelta(days=i % 60 - 30), start_time=time(9 + i % 8), end_time=time(10 + i % 8),
+            status='completed' if i % 60 < 30 else 'scheduled', reason='Lower back pain',
+        )
+        for i in range(500 * scale)
+    ], batch_size=1000)
+    AppointmentFeedback.objects.bulk_create([
+        AppointmentFeedback(appointment=appointment, rating=4, comments='Helpful session')
+        for appointment in appointments if appointment.status == 'completed'
+    ], batch_size=1000)
+
+    category = ExerciseCategory.objects.create(name='Mobility')
+    exercises = Exercise.objects.bulk_create([
+        Exercise(name=f'Exercise {i}', description='Slow and controlled', category=category, duration=10)
+        for i in range(50)
+    ])
+    plan = ExercisePlan.objects.create(
+        name='Knee rehab', description='Six week plan', patient=patient, physiotherapist=therapist,
+        start_date=today - timedelta(days=30), end_date=today + timedelta(days=30),
+    )
+    items = ExercisePlanItem.objects.bulk_create([
+        ExercisePlanItem(exercise_plan=plan, exercise=exercises[i], day_of_week=i % 7)
+        for i in range(14)
+    ])
+    ExerciseProgress.objects.bulk_create([
+        ExerciseProgress(
+            patient=patient, exercise_plan_item=items[i % len(items)], date_completed=today - timedelta(days=i % 30),
+            completed_repetitions=10, completed_sets=3, difficulty_rating=1 + i % 5, pain_level=i % 5,
+        )
+        for i in range(200 * scale)
+    ], batch_size=1000)
+
+    book_category = BookCategory.objects.create(name='Rehabilitation')
+    books = Book.objects.bulk_create([
+        Book(title=f'Book {i}', author=f'Author {i % 20}', description='A guide', category=book_category)
+        for i in range(100 * scale)
+    ], batch_size=1000)
+    BookReview.objects.bulk_create([
+        BookReview(book=books[i % len(books)], user=patients[i // len(books)], rating=1 + i % 5)
+        for i in range(min(len(books) * len(patients), 1000 * scale))
+    ], batch_size=1000)
+    BookBookmark.objects.bulk_create([BookBookmark(book=book, user=patient) for book in books[:20]])
+    call_command('rebuild_book_ratings', stdout=io.StringIO())
+
+    conversations = []
+    for other in therapists[:10]:
+        conversation = Conversation.objects.create()
+        messages = Message.objects.bulk_create([
+            Message(conversation=conversation, sender=patient if i % 2 else other, content=f'Message {i}')
+            for i in range(100 * scale)
+        ], batch_size=1000)
+        ConversationMembership.objects.bulk_create([
+            ConversationMembership(conversation=conversation, user=user, last_message=messages[-1])
+            for user in (patient, other)
+        ])
+        conversations.append(conversation)
+
+    Notification.objects.bulk_create([
+        Notification(recipient=patient, notification_type='system', title='Update', message=f'Notice {i}')
+        for i in range(200 * scale)
+    ], batch_size=1000)
+
+    progress = ExerciseProgress.objects.filter(patient=patient).first()
+    appointment = Appointment.objects.filter(patient=patient, feedback__isnull=False).first()
+    samples = {
+        'users': {'pk': patient.pk},
+        'patient-profiles': {'pk': patient.patient_profile.pk},
+        'physiotherapist-profiles': {'pk': profiles[0].pk},
+        'appointments': {'pk': appointment.pk},
+        'appointment-feedback': {'pk': appointment.feedback.pk},
+        'working-hours': {'pk': WorkingHours.objects.filter(physiotherapist=profiles[0]).first().pk},
+        'availability-exceptions': {'pk': time_off.pk},
+        'exercise-categories': {'pk': category.pk},
+        'exercises': {'pk': exercises[0].pk},
+        'exercise-plans': {'pk': plan.pk},
+        'exercise-plan-items': {'pk': items[0].pk},
+        'exercise-progress': {'pk': progress.pk},
+        'book-categories': {'pk': book_category.pk},
+        'books': {'pk': books[0].pk},
+        'book-reviews': {'pk': BookReview.objects.filter(user=patient).first().pk},
+        'book-bookmarks': {'pk': BookBookmark.objects.filter(user=patient).first().pk},
+        # Legacy endpoints, keyed by URL name
+        'appointment-detail': {'pk': appointment.pk},
+        'legacy-appointment-feedback': {'appointment_id': appointment.pk},
+        'exercise-detail': {'pk': exercises[0].pk},
+        'exercise-plan-detail': {'pk': plan.pk},
+        'exercise-plan-item-create': {'plan_id': plan.pk},
+        'exercise-plan-item-delete': {'plan_id': plan.pk, 'item_id': items[0].pk},
+        'conversation-detail': {'pk': conversations[0].pk},
+        'message-list-create': {'conversation_id': conversations[0].pk},
+        'attachment-upload': {'message_id': Message.objects.filter(conversation=conversations[0]).first().pk},
+        'notification-detail': {'pk': Notification.objects.filter(recipient=patient).first().pk},
+    }
+    params = {
+        'appointments-available-slots': {
+            'start_date': today + timedelta(days=1), 'end_date': today + timedelta(days=14), 'duration': 60,
+        },
+    }
+    tokens = {
+        'patient': Token.objects.create(user=patient).key,
+        'therapist': Token.objects.create(user=therapist).key,
+    }
+    return samples, params, tokens
+
+
+def walk_patterns(patterns, prefix=''):
+    """Yield (route prefix, pattern) for every URL pattern"""
+    from django.urls import URLResolver
+
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from walk_patterns(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix, pattern
+
+
+def sample_key(pattern):
+    """Router views are keyed by their basename, other views by URL name"""
+    basename = getattr(pattern.callback, 'initkwargs', {}).get('basename')
+    if basename:
+        return basename
+    if pattern.name == 'appointment-feedback':
+        # The legacy feedback view shares its URL name with a router basename
+        return 'legacy-appointment-feedback'
+    return pattern.name
+
+
+def accepts_get(callback):
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        return 'get' in actions
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    return view_class is not None and hasattr(view_class, 'get')
+
+
+def discover_endpoints(samples):
+    """Yield (name, url, skip_reason) for every /api/ endpoint"""
+    from django.urls import NoReverseMatch, get_resolver, reverse
+
+    seen = set()
+    for prefix, pattern in walk_patterns(get_resolver().url_patterns):
+        arguments = set(pattern.pattern.regex.groupindex)
+        if not prefix.startswith('api/') or not pattern.name or 'format' in arguments:
+            continue
+        kwargs = {name: value for name, value in samples.get(sample_key(pattern), {}).items() if name in arguments}
+        try:
+            url = reverse(pattern.name, kwargs=kwargs) if set(kwargs) == arguments else None
+        except NoReverseMatch:
+            url = None
+        key = (pattern.name, url)
+        if key in seen:
+            continue
+        seen.add(key)
+        if url is None:
+            yield pattern.name, prefix + str(pattern.pattern), 'no sample object for URL arguments'
+        elif not accepts_get(pattern.callback):
+            yield pattern.name, url, 'write-only endpoint'
+        else:
+            yield pattern.name, url, None
+
+
+def measure(client, url, params, warmup, iterations):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        client.get(url, params)
+    # The query log is a bounded deque that seeding may already have filled
+    reset_queries()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, params)
+    timings = []
+    for _ in range(iterations):
+        with Timer() as timer:
+            client.get(url, params)
+        timings.append(timer.elapsed)
+    return {
+        'url': url,
+        'status': response.status_code,
+        'queries': len(queries),
+        'bytes': len(response.content),
+        **{key: round(value, 3) for key, value in summarize(timings).items()},
+    }
+
+
+def run(args):
+    import logging
+    import django
+    from rest_framework.test import APIClient
+
+    # Budget overruns and 4xx responses are reported in the results, not as log noise
+    logging.getLogger('healthcare_backend.request_metrics').setLevel(logging.ERROR)
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+
+    samples, params, tokens = seed(args.scale)
+    clients = {}
+    for role, token in tokens.items():
+        clients[role] = APIClient()
+        clients[role].credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    results, skipped = {}, {}
+    for name, url, skip_reason in discover_endpoints(samples):
+        if args.filter and args.filter not in url and args.filter not in name:
+            continue
+        if skip_reason:
+            skipped[name] = {'url': url, 'reason': skip_reason}
+            continue
+        client = clients['therapist' if name in THERAPIST_ENDPOINTS else 'patient']
+        results[name] = measure(client, url, params.get(name, {}), args.warmup, args.iterations)
+
+    return {
+        'meta': {
+            'scale': args.scale,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'endpoints': results,
+        'skipped': skipped,
+    }
+
+
+def print_results(report):
+    print(f'{"endpoint":<42} {"status":>6} {"queries":>7} {"bytes":>9} '
+          f'{"p50":>8} {"p95":>8} {"p99":>8}')
+    for name, result in sorted(report['endpoints'].items()):
+        print(f'{name:<42} {result["status"]:>6} {result["queries"]:>7} {result["bytes"]:>9} '
+              f'{result["p50_ms"]:>6.1f}ms {result["p95_ms"]:>6.1f}ms {result["p99_ms"]:>6.1f}ms')
+    for name, skip in sorted(report['skipped'].items()):
+        print(f'skipped {name} ({skip["url"]}): {skip["reason"]}')
+
+
+def compare(report, baseline, threshold, min_ms):
+    """Return a list of human-readable regressions against a baseline report"""
+    regressions = []
+    for name, result in sorted(report['endpoints'].items()):
+        before = baseline['endpoints'].get(name)
+        if before is None:
+            continue
+        if result['queries'] > before['queries']:
+            regressions.append(f'{name}: {before["queries"]} -> {result["queries"]} queries')
+        growth = result['p95_ms'] - before['p95_ms']
+        if growth > min_ms and result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {before["p95_ms"]:.1f}ms -> {result["p95_ms"]:.1f}ms')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scale', type=int, default=1, help='Multiplier for the seeded row counts')
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--filter', help='Only run endpoints whose name or URL contains this')
+    parser.add_argument('--save', help='Write the results to this JSON file')
+    parser.add_argument('--compare', help='Compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed relative p95 growth')
+    parser.add_argument('--min-ms', type=float, default=2.0, help='Ignore p95 growth below this')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        report = run(args)
+
+    print_results(report)
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.threshold, args.min_ms)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print('No regressions')
+
+
+if __name__ == '__main__':
+    main()
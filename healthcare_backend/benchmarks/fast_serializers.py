@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Serialization benchmark: ModelSerializer against projections over values rows.
+
+Renders pages of appointments, messages and notifications, first by
+loading model instances with their prefetch plan and serializing them with
+AppointmentSerializer, MessageSerializer and NotificationSerializer, then
+by fetching values rows with project() and rendering them with
+render_rows(). Both times include the queries. Reports rows per second,
+and checks that both give the same JSON.
+
+    python -m benchmarks.fast_serializers --pages 20 200 2000 --repeat 5
+"""
+import argparse
+import random
+from datetime import date, time, timedelta
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+
+def seed(rows):
+    from appointments.models import Appointment
+    from chat.models import Attachment, Conversation, Message
+    from notifications.models import Notification
+
+    patient, = create_users(1, 'patient')
+    therapists = create_users(20, 'therapist', user_type='physiotherapist')
+    random.seed(0)
+    start = date.today() - timedelta(days=rows)
+    Appointment.objects.bulk_create([
+        Appointment(
+            patient=patient, physiotherapist=random.choice(therapists), date=start + timedelta(days=i),
+            start_time=time(9), end_time=time(10), status='scheduled', reason='Knee pain', notes='',
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    Notification.objects.bulk_create([
+        Notification(recipient=patient, notification_type='system', title='Reminder', message='Benchmark')
+        for _ in range(rows)
+    ], batch_size=1000)
+    conversation = Conversation.objects.create()
+    conversation.participants.set([patient, therapists[0]])
+    messages = Message.objects.bulk_create([
+        Message(conversation=conversation, sender=random.choice([patient, therapists[0]]), content=f'Message {i}')
+        for i in range(rows)
+    ], batch_size=1000)
+    Attachment.objects.bulk_create([
+        Attachment(message=message, file='chat_attachments/scan.pdf', file_name='scan.pdf', file_type='application/pdf')
+        for message in messages[::5]
+    ], batch_size=1000)
+
+
+def serialize(serializer_class, queryset, size):
+    from healthcare_backend.prefetch import apply_prefetch_plan
+
+    return serializer_class(list(apply_prefetch_plan(queryset, serializer_class)[:size]), many=True).data
+
+
+def project_rows(serializer_class, queryset, size):
+    from healthcare_backend.projections import project, render_rows
+
+    return render_rows(project(queryset, serializer_class)[:size], serializer_class)
+
+
+def rows_per_second(render, serializer_class, queryset, size, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            render(serializer_class, queryset, size)
+        timings.append(timer.elapsed)
+    return size / (summarize(timings)['p50_ms'] / 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[20, 200, 2000], help='Page sizes')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from rest_framework.renderers import JSONRenderer
+        from appointments.models import Appointment
+        from appointments.serializers import AppointmentSerializer
+        from chat.models import Message
+        from chat.serializers import MessageSerializer
+        from notifications.models import Notification
+        from notifications.serializers import NotificationSerializer
+
+        seed(max(args.pages))
+        cases = [
+            (AppointmentSerializer, Appointment.objects.all()),
+            (MessageSerializer, Message.objects.all()),
+            (NotificationSerializer, Notification.objects.all()),
+        ]
+        for serializer_class, queryset in cases:
+            print(serializer_class.__name__)
+            for size in args.pages:
+                render = JSONRenderer().render
+                assert render(serialize(serializer_class, queryset, size)) == render(
+                    project_rows(serializer_class, queryset, size)
+                ), 'outputs differ'
+                before = rows_per_second(serialize, serializer_class, queryset, size, args.repeat)
+                after = rows_per_second(project_rows, serializer_class, queryset, size, args.repeat)
+                print(f'  {size:5d} rows: serializer {before:9.0f} rows/s  '
+                      f'projection {after:9.0f} rows/s  {after / before:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+JSON rendering benchmark: encode time and peak memory of served lists.
+
+Serializes the lists the API serves once, then encodes them with DRF's
+JSONRenderer and with ORJSONRenderer:
+
+* exercise progress pages of PAGE_SIZE (20) rows
+* message history pages of 50 rows (the default) and 200 (the maximum)
+* whole notification lists, 100 and 5000 rows long, which are not
+  paginated; these are also encoded with ORJSONRenderer.render_stream(),
+  whose chunks are dropped as they are produced, as the streaming
+  response sends lists of JSON_STREAM_MIN_ITEMS (500) rows or more
+
+Peak memory is what tracemalloc sees allocated during the encode, on top
+of the serialized data.
+
+    python -m benchmarks.json_rendering --notifications 100 5000 --repeat 5
+"""
+import argparse
+import tracemalloc
+from datetime import date, timedelta
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+
+def seed(rows):
+    from chat.models import Conversation, Message
+    from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem, ExerciseProgress
+    from notifications.models import Notification
+
+    patient, therapist = create_users(1, 'patient') + create_users(1, 'therapist', user_type='physiotherapist')
+    category = ExerciseCategory.objects.create(name='Knee')
+    plan = ExercisePlan.objects.create(
+        name='Knee', description='Knee rehabilitation', patient=patient, physiotherapist=therapist,
+        start_date=date.today() - timedelta(days=rows), end_date=date.today(),
+    )
+    items = [
+        ExercisePlanItem.objects.create(
+            exercise_plan=plan, day_of_week=day,
+            exercise=Exercise.objects.create(name=f'Exercise {day}', description='Stretch', duration=10, category=category),
+        )
+        for day in range(7)
+    ]
+    ExerciseProgress.objects.bulk_create([
+        ExerciseProgress(
+            patient=patient, exercise_plan_item=items[i % 7], date_completed=plan.start_date + timedelta(days=i),
+            completed_sets=3, completed_repetitions=12, difficulty_rating=i % 5 + 1, pain_level=i % 10,
+            notes='Felt a little stiff in the morning, better after the second set',
+        )
+        for i in range(rows)
+    ], batch_size=1000)
+    conversation = Conversation.objects.create()
+    conversation.participants.set([patient, therapist])
+    Message.objects.bulk_create([
+        Message(conversation=conversation, sender=(patient, therapist)[i % 2], content=f'How is the knee today? ({i})')
+        for i in range(rows)
+    ], batch_size=1000)
+    Notification.objects.bulk_create([
+        Notification(recipient=patient, notification_type='system', title='Reminder', message=f'Session {i} is due')
+        for i in range(rows)
+    ], batch_size=1000)
+    return patient
+
+
+def measure(encode, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            encode(data)
+        timings.append(timer.elapsed)
+    tracemalloc.start()
+    encode(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return summarize(timings), peak
+
+
+def consume(chunks):
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--notifications', type=int, nargs='+', default=[100, 5000], help='Notification list lengths')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.conf import settings
+        from rest_framework.renderers import JSONRenderer
+        from chat.models import Message
+        from chat.pagination import MessageKeysetPagination
+        from chat.serializers import MessageSerializer
+        from exercises.models import ExerciseProgress
+        from exercises.serializers import ExerciseProgressSerializer
+        from healthcare_backend.prefetch import apply_prefetch_plan
+        from healthcare_backend.projections import project, render_rows
+        from healthcare_backend.renderers import ORJSONRenderer
+        from notifications.models import Notification
+        from notifications.serializers import NotificationSerializer
+
+        def page(queryset, serializer_class, size):
+            rows = render_rows(project(queryset, serializer_class)[:size], serializer_class)
+            return {'count': size, 'next': None, 'previous': None, 'results': rows}
+
+        def page_of_instances(queryset, serializer_class, size):
+            instances = apply_prefetch_plan(queryset, serializer_class)[:size]
+            return {'count': size, 'next': None, 'previous': None,
+                    'results': serializer_class(instances, many=True).data}
+
+        patient = seed(max([MessageKeysetPagination.max_page_size, *args.notifications]))
+        notifications = Notification.objects.filter(recipient=patient)
+        cases = [
+            (f'ExerciseProgress page, {settings.REST_FRAMEWORK["PAGE_SIZE"]} rows', False, page_of_instances(
+                ExerciseProgress.objects.all(), ExerciseProgressSerializer, settings.REST_FRAMEWORK['PAGE_SIZE'],
+            )),
+        ] + [
+            (f'Message page, {size} rows', False, page(Message.objects.all(), MessageSerializer, size))
+            for size in (MessageKeysetPagination.page_size, MessageKeysetPagination.max_page_size)
+        ] + [
+            (f'Notification list, {size} rows', True,
+             render_rows(project(notifications, NotificationSerializer)[:size], NotificationSerializer))
+            for size in args.notifications
+        ]
+        renderer = ORJSONRenderer()
+        for label, streams, data in cases:
+            encoders = {'JSONRenderer': JSONRenderer().render, 'ORJSONRenderer': renderer.render}
+            if streams:
+                assert b''.join(renderer.render_stream(data)) == JSONRenderer().render(data)
+                encoders['streamed'] = lambda data: consume(renderer.render_stream(data))
+            print(f'{label} ({len(renderer.render(data)) / 1024:.0f} KiB)')
+            for name, encode in encoders.items():
+                stats, peak = measure(encode, data, args.repeat)
+                print(f'  {name:<15}: p50 {stats["p50_ms"]:8.3f}ms  peak {peak / 1024:9.0f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+"""
+Login wave benchmark: login throughput and the latency of other requests.
+
+Drives the ASGI application in process, with concurrent clients logging
+in over and over while others poll /api/notifications/ with a token. It
+runs once against the previous synchronous LoginView, which hashes in
+the request's own thread, and once against the async LoginView, which
+hashes on the PASSWORD_HASHING_WORKERS pool. It reports logins per
+second and the latency of both kinds of request. A run without logins
+gives the polling baseline.
+
+    python -m benchmarks.login_load --logins 8 --pollers 2 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks import benchmark_database, create_users, setup_django, summarize
+
+# The benchmark module doubles as the URLconf, adding the synchronous
+# login view next to the project's URLs
+urlpatterns = []
+
+
+def install_urls():
+    from django.conf import settings
+    from django.contrib.auth import authenticate, login
+    from django.urls import include, path
+    from rest_framework.authtoken.models import Token
+    from rest_framework.permissions import AllowAny
+    from rest_framework.response import Response
+    from rest_framework.views import APIView
+
+    class SyncLoginView(APIView):
+        """LoginView as it was before hashing moved to the pool"""
+        permission_classes = [AllowAny]
+
+        def post(self, request):
+            user = authenticate(username=request.data.get('username'), password=request.data.get('password'))
+            if user:
+                login(request, user)
+                token, created = Token.objects.get_or_create(user=user)
+                return Response({'token': token.key})
+            return Response({'error': 'Invalid credentials'}, status=401)
+
+    urlpatterns[:] = [
+        path('sync-login/', SyncLoginView.as_view()),
+        path('', include(settings.ROOT_URLCONF)),
+    ]
+    settings.ROOT_URLCONF = __name__
+
+
+async def request(app, method, path, body=None, token=None):
+    headers = [(b'host', b'testserver')]
+    if body is not None:
+        body = json.dumps(body).encode()
+        headers += [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    if token:
+        headers.append((b'authorization', f'Token {token}'.encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': headers, 'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': body or b'', 'more_body': False}]
+    disconnected = asyncio.Event()
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return status
+
+
+async def client_loop(deadline, timings, call):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        status = await call()
+        assert status == 200, status
+        timings.append(time.perf_counter() - start)
+
+
+async def run_load(app, login_path, usernames, tokens, seconds):
+    deadline = time.perf_counter() + seconds
+    login_timings, poll_timings = [], []
+    clients = [
+        client_loop(deadline, login_timings, lambda username=username: request(
+            app, 'POST', login_path, {'username': username, 'password': 'password123'}
+        ))
+        for username in usernames
+    ] + [
+        client_loop(deadline, poll_timings, lambda token=token: request(
+            app, 'GET', '/api/notifications/', token=token
+        ))
+        for token in tokens
+    ]
+    await asyncio.gather(*clients)
+    return login_timings, poll_timings
+
+
+def report(label, timings, seconds):
+    if not timings:
+        return f'{label:<7}: none'
+    stats = summarize(timings)
+    return (f'{label:<7}: {len(timings) / seconds:6.1f}/s  p50 {stats["p50_ms"]:7.1f}ms  '
+            f'p95 {stats["p95_ms"]:7.1f}ms  p99 {stats["p99_ms"]:7.1f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--logins', type=int, default=8, help='Concurrent clients logging in')
+    parser.add_argument('--pollers', type=int, default=2, help='Concurrent clients polling notifications')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, help='PASSWORD_HASHING_WORKERS for the async run')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    if args.workers:
+        settings.PASSWORD_HASHING_WORKERS = args.workers
+    # An in-memory SQLite database locks whole tables between threads,
+    # so concurrent logins need a file
+    connection.settings_dict['TEST']['NAME'] = os.path.join(tempfile.mkdtemp(), 'login_load.sqlite3')
+    install_urls()
+
+    with benchmark_database():
+        import logging
+        from django.core.asgi import get_asgi_application
+        from authentication.hashing import get_workers
+        from notifications.models import Notification
+
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        users = create_users(args.logins, 'loginuser')
+        pollers = create_users(args.pollers, 'polluser', with_tokens=True)
+        Notification.objects.bulk_create([
+            Notification(recipient=user, notification_type='system', title='Reminder', message='Benchmark')
+            for user in pollers
+        ])
+        tokens = [user.auth_token.key for user in pollers]
+        usernames = [user.username for user in users]
+        app = get_asgi_application()
+
+        print(f'{args.logins} logging in, {args.pollers} polling, {os.cpu_count()} CPUs, '
+              f'{get_workers()} hashing workers')
+        runs = [('no logins', None, []), ('sync', '/sync-login/', usernames), ('async', '/api/auth/login/', usernames)]
+        for label, path, names in runs:
+            login_timings, poll_timings = asyncio.run(run_load(app, path, names, tokens, args.seconds))
+            print(label)
+            if names:
+                print('  ' + report('logins', login_timings, args.seconds))
+            print('  ' + report('polls', poll_timings, args.seconds))
+
+
+if __name__ == '__main__':
+    main()
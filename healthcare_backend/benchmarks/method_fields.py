@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Method field benchmark: per-row SerializerMethodFields against batch loading.
+
+Serializes lists of book categories, books and conversations twice: with
+the method fields as they were, computing each row's value with its own
+queries, and with the BatchMethodFields that load them for the whole
+list. Books are passed without the is_bookmarked annotation, as any view
+other than BookViewSet would. Reports queries and time per list.
+
+    python -m benchmarks.method_fields --rows 20 100 500 --repeat 5
+"""
+import argparse
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+
+def per_row_serializers():
+    """The serializers as they were before batch loading"""
+    from rest_framework import serializers
+    from books.models import BookBookmark
+    from books.serializers import BookCategorySerializer, BookListSerializer
+    from chat.serializers import ConversationSerializer, MessageSerializer
+
+    class PerRowCategorySerializer(BookCategorySerializer):
+        books_count = serializers.SerializerMethodField()
+
+        def get_books_count(self, obj):
+            return obj.books.count()
+
+    class PerRowBookListSerializer(BookListSerializer):
+        is_bookmarked = serializers.SerializerMethodField()
+
+        def get_is_bookmarked(self, obj):
+            return BookBookmark.objects.filter(book=obj, user=self.context['request'].user).exists()
+
+    class PerRowConversationSerializer(ConversationSerializer):
+        last_message = serializers.SerializerMethodField()
+        unread_count = serializers.SerializerMethodField()
+        last_read_message_id = serializers.SerializerMethodField()
+
+        def get_membership(self, obj):
+            if not hasattr(obj, '_request_membership'):
+                obj._request_membership = obj.memberships.filter(user=self.context['request'].user).first()
+            return obj._request_membership
+
+        def get_last_message(self, obj):
+            last_message = obj.messages.order_by('-created_at').first()
+            return MessageSerializer(last_message).data if last_message else None
+
+        def get_unread_count(self, obj):
+            membership = self.get_membership(obj)
+            return membership.count_unread() if membership else 0
+
+        def get_last_read_message_id(self, obj):
+            membership = self.get_membership(obj)
+            return membership.last_read_message_id if membership else 0
+
+    return PerRowCategorySerializer, PerRowBookListSerializer, PerRowConversationSerializer
+
+
+def seed(rows):
+    from books.models import Book, BookBookmark, BookCategory
+    from chat.models import Conversation, ConversationMembership, Message
+
+    reader, *others = create_users(rows + 1, f'reader{rows}-')
+    categories = BookCategory.objects.bulk_create([BookCategory(name=f'Category {rows}-{i}') for i in range(rows)])
+    books = Book.objects.bulk_create([
+        Book(title=f'Book {rows}-{i}', author='Author', description='Guide', category=category)
+        for i, category in enumerate(categories)
+        for _ in range(3)
+    ])
+    BookBookmark.objects.bulk_create([BookBookmark(book=book, user=reader) for book in books[::2]])
+
+    conversations = []
+    for other in others:
+        conversation = Conversation.objects.create()
+        conversation.participants.set([reader, other])
+        for sender in (other, other, reader):
+            message = Message.objects.create(conversation=conversation, sender=sender, content='Hello')
+            ConversationMembership.record_message(message)
+        conversations.append(conversation.pk)
+    conversations = list(Conversation.objects.filter(pk__in=conversations).prefetch_related('participants'))
+    return reader, categories, books[:rows], conversations
+
+
+def measure(serializer_class, rows, context, repeat):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    timings = []
+    for _ in range(repeat):
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries, Timer() as timer:
+            serializer_class(rows, many=True, context=dict(context)).data
+        timings.append(timer.elapsed)
+    return len(queries), summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[20, 100, 500], help='Rows per list')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.test import RequestFactory
+        from books.serializers import BookCategorySerializer, BookListSerializer
+        from chat.serializers import ConversationSerializer
+
+        per_row = per_row_serializers()
+        batched = (BookCategorySerializer, BookListSerializer, ConversationSerializer)
+        for rows in args.rows:
+            reader, categories, books, conversations = seed(rows)
+            request = RequestFactory().get('/')
+            request.user = reader
+            print(f'{rows} rows')
+            for name, objects, old, new in zip(
+                ('categories', 'books', 'conversations'), (categories, books, conversations), per_row, batched
+            ):
+                for label, serializer_class in (('per row', old), ('batched', new)):
+                    queries, stats = measure(serializer_class, objects, {'request': request}, args.repeat)
+                    print(f'  {name:<13} {label:<8}: {queries:5d} queries  '
+                          f'p50 {stats["p50_ms"]:8.2f}ms  mean {stats["mean_ms"]:8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
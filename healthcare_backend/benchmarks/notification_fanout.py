@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+Broadcast fan-out benchmark: time and peak memory to notify many patients.
+
+Seeds the given number of patients (a tenth of them opted out of system
+notifications) and runs a system broadcast through notifications.fanout.
+
+    python -m benchmarks.notification_fanout --patients 100000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--patients', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from notifications.fanout import broadcast
+        from notifications.models import Notification, NotificationPreference
+
+        patients = create_users(args.patients, 'fanoutpatient')
+        NotificationPreference.objects.bulk_create([
+            NotificationPreference(user=user, system_notifications=False)
+            for user in patients[::10]
+        ], batch_size=args.batch_size)
+        del patients
+
+        def run_broadcast():
+            return broadcast('Clinic update', 'New opening hours from Monday.',
+                             user_type='patient', batch_size=args.batch_size)
+
+        with Timer() as timer:
+            created = run_broadcast()
+        assert created == Notification.objects.count()
+
+        # Memory is measured on a second run because tracing slows it down
+        Notification.objects.all().delete()
+        tracemalloc.start()
+        run_broadcast()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f'notifications created: {created}')
+        print(f'elapsed:               {timer.elapsed:.2f}s ({created / timer.elapsed:,.0f} rows/s)')
+        print(f'peak traced memory:    {peak / 1024 / 1024:.1f} MiB')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+"""
+Full-text search benchmark: FTS index against SearchFilter's LIKE scans.
+
+Seeds books and appointments with generated text, builds the search
+indexes, then times the first page and the count of a few searches
+through the full-text backend and through the icontains lookups that
+SearchFilter would run.
+
+    python -m benchmarks.search --books 1000000 --appointments 1000000
+"""
+import argparse
+import functools
+import operator
+import random
+from datetime import date, time
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+WORDS = (
+    'knee shoulder ankle hip spine neck wrist elbow back posture gait balance strength '
+    'mobility stretching recovery surgery injury pain chronic acute sports runner '
+    'rehabilitation exercise therapy program routine training muscle tendon ligament '
+    'cartilage fracture sprain strain inflammation swelling flexibility endurance '
+    'stability coordination massage manual assessment treatment progress weekly daily'
+).split()
+RARE_WORDS = ['hydrotherapy', 'proprioception', 'kinesiology', 'plyometrics', 'osteopathy']
+
+SEARCHES = ['hydrotherapy', 'knee pain', 'rehab', 'stability coordination weekly']
+
+
+def sentence(rng, length):
+    words = rng.choices(WORDS, k=length)
+    if rng.random() < 0.001:
+        words[rng.randrange(length)] = rng.choice(RARE_WORDS)
+    return ' '.join(words).capitalize()
+
+
+def seed(book_count, appointment_count):
+    from appointments.models import Appointment
+    from books.models import Book, BookCategory
+
+    rng = random.Random(0)
+    category = BookCategory.objects.create(name='Benchmark')
+    for start in range(0, book_count, 10000):
+        Book.objects.bulk_create([
+            Book(title=sentence(rng, 4), author=sentence(rng, 2), description=sentence(rng, 60),
+                 publisher=sentence(rng, 2), category=category)
+            for _ in range(min(10000, book_count - start))
+        ])
+
+    patients = create_users(100, 'searchpatient')
+    therapists = create_users(10, 'searchtherapist', user_type='physiotherapist')
+    for start in range(0, appointment_count, 10000):
+        Appointment.objects.bulk_create([
+            Appointment(
+                patient=rng.choice(patients), physiotherapist=rng.choice(therapists),
+                date=date(2030, 1, 1), start_time=time(9), end_time=time(10),
+                reason=sentence(rng, 5), notes=sentence(rng, 30),
+            )
+            for _ in range(min(10000, appointment_count - start))
+        ])
+    return patients[0]
+
+
+def like_search(queryset, fields, terms):
+    from django.db.models import Q
+
+    for term in terms:
+        queryset = queryset.filter(functools.reduce(operator.or_, [
+            Q(**{f'{field}__icontains': term}) for field in fields
+        ]))
+    return queryset
+
+
+def time_search(queryset, repeat):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            count = queryset.count()
+            list(queryset[:20])
+        timings.append(timer.elapsed)
+    return count, summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--books', type=int, default=200000)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from io import StringIO
+        from django.core.management import call_command
+        from appointments.models import Appointment
+        from books.models import Book
+        from healthcare_backend.search import get_backend, get_index
+
+        with Timer() as timer:
+            patient = seed(args.books, args.appointments)
+        print(f'Seeded {args.books} books and {args.appointments} appointments in {timer.elapsed:.0f}s')
+        with Timer() as timer:
+            call_command('rebuild_search_index', 'books.Book', 'appointments.Appointment', stdout=StringIO())
+        print(f'Built the search indexes in {timer.elapsed:.0f}s')
+
+        backend = get_backend('default')
+        cases = {
+            'books': Book.objects.all(),
+            "one patient's appointments": Appointment.objects.filter(patient=patient),
+        }
+        for label, queryset in cases.items():
+            index = get_index(queryset.model)
+            print(f'\n{label}')
+            for search in SEARCHES:
+                terms = search.split()
+                full_text = backend.search(index, queryset, terms).order_by('-search_rank', 'pk')
+                like = like_search(queryset, index.fields, terms).order_by('pk')
+                fts_count, fts = time_search(full_text, args.repeat)
+                like_count, scan = time_search(like, args.repeat)
+                print(f'  {search!r:>32}: full-text {fts_count:>7} hits p50 {fts["p50_ms"]:>7.1f}ms   '
+                      f'LIKE {like_count:>7} hits p50 {scan["p50_ms"]:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
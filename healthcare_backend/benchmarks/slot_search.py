@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Free-slot search benchmark: many therapists over a long date range.
+
+Seeds therapists with weekday working hours, a few days off each and a
+booked appointment on most working days, then times find_free_slots for
+the whole range and for a specialization-filtered search, reporting the
+number of queries each search issued.
+
+    python -m benchmarks.slot_search --therapists 500 --days 90
+"""
+import argparse
+import random
+from datetime import time, timedelta
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+SPECIALIZATIONS = ['Sports', 'Orthopedics', 'Neurology', 'Pediatrics', 'Geriatrics']
+
+
+def seed(therapist_count, days, start_date):
+    from appointments.models import Appointment, AvailabilityException, WorkingHours
+    from authentication.models import PhysiotherapistProfile
+    from authentication.specializations import sync_specializations
+
+    rng = random.Random(0)
+    users = create_users(therapist_count, 'slottherapist', user_type='physiotherapist')
+    patient = create_users(1, 'slotpatient')[0]
+    profiles = PhysiotherapistProfile.objects.bulk_create([
+        PhysiotherapistProfile(
+            user=user, license_number=f'SLOT{i}',
+            specializations=', '.join(rng.sample(SPECIALIZATIONS, 2)),
+        )
+        for i, user in enumerate(users)
+    ], batch_size=1000)
+    sync_specializations(profiles)
+
+    hours, exceptions, appointments = [], [], []
+    for profile in profiles:
+        for day_of_week in range(5):
+            hours.append(WorkingHours(physiotherapist=profile, day_of_week=day_of_week,
+                                      start_time=time(9), end_time=time(12, 30)))
+            hours.append(WorkingHours(physiotherapist=profile, day_of_week=day_of_week,
+                                      start_time=time(13, 30), end_time=time(18)))
+        for _ in range(3):
+            exceptions.append(AvailabilityException(
+                physiotherapist=profile, date=start_date + timedelta(days=rng.randrange(days))
+            ))
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            if day.weekday() < 5 and rng.random() < 0.8:
+                hour = rng.choice([9, 10, 11, 14, 15, 16])
+                appointments.append(Appointment(
+                    patient=patient, physiotherapist_id=profile.user_id, date=day,
+                    start_time=time(hour), end_time=time(hour, 45), reason='Benchmark',
+                ))
+    WorkingHours.objects.bulk_create(hours, batch_size=1000)
+    AvailabilityException.objects.bulk_create(exceptions, batch_size=1000)
+    Appointment.objects.bulk_create(appointments, batch_size=1000)
+    return len(appointments)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--therapists', type=int, default=500)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--duration', type=int, default=60)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+        from appointments.availability import find_free_slots
+        from authentication.models import PhysiotherapistProfile
+        from authentication.specializations import filter_by_specializations
+
+        start_date = timezone.localdate() + timedelta(days=1)
+        end_date = start_date + timedelta(days=args.days - 1)
+        booked = seed(args.therapists, args.days, start_date)
+        print(f'{args.therapists} therapists, {args.days} days, {booked} appointments')
+
+        searches = {
+            'all therapists': PhysiotherapistProfile.objects.all(),
+            'one specialization': filter_by_specializations(
+                PhysiotherapistProfile.objects.all(), 'sports'
+            ),
+            'first 100 slots': PhysiotherapistProfile.objects.all(),
+        }
+        for label, profiles in searches.items():
+            limit = 100 if label == 'first 100 slots' else None
+            timings = []
+            for _ in range(args.repeat):
+                with CaptureQueriesContext(connection) as queries, Timer() as timer:
+                    slots = find_free_slots(profiles, start_date, end_date, args.duration, limit=limit)
+                timings.append(timer.elapsed)
+            stats = summarize(timings)
+            print(f'{label:>20}: {len(slots):>8} slots  {len(queries)} queries  '
+                  f'p50 {stats["p50_ms"]:.0f}ms  max {max(timings) * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
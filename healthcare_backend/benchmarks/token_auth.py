@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+Token authentication benchmark: notification polling by many clients.
+
+Seeds users with a token and a few unread notifications each, then polls
+/api/notifications/?is_read=false round-robin as those users, first with
+DRF's TokenAuthentication and then with CachedTokenAuthentication,
+reporting queries and latency per request. The first pass over the users
+is reported separately, since the cache is still cold there.
+
+    python -m benchmarks.token_auth --users 200 --rounds 5
+"""
+import argparse
+from unittest import mock
+
+from benchmarks import Timer, benchmark_database, create_users, setup_django, summarize
+
+URL = '/api/notifications/'
+
+AUTHENTICATION = {
+    'TokenAuthentication': 'rest_framework.authentication.TokenAuthentication',
+    'CachedTokenAuthentication': 'authentication.tokens.CachedTokenAuthentication',
+}
+
+
+def seed(user_count, notifications):
+    from rest_framework.authtoken.models import Token
+    from notifications.models import Notification
+
+    users = create_users(user_count, 'tokenuser', with_tokens=True)
+    Notification.objects.bulk_create([
+        Notification(recipient=user, notification_type='system', title='Reminder', message='Benchmark')
+        for user in users
+        for _ in range(notifications)
+    ], batch_size=1000)
+    return list(Token.objects.values_list('key', flat=True))
+
+
+def poll(client, keys):
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    reset_queries()
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for key in keys:
+            with Timer() as timer:
+                response = client.get(URL, {'is_read': 'false'}, HTTP_AUTHORIZATION=f'Token {key}')
+            assert response.status_code == 200, response.status_code
+            timings.append(timer.elapsed)
+    return len(queries) / len(keys), summarize(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--notifications', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=5, help='Passes over the users after the first')
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        from django.core.cache import cache
+        from django.test import override_settings
+        from django.utils.module_loading import import_string
+        from rest_framework.authentication import SessionAuthentication
+        from rest_framework.test import APIClient
+        from rest_framework.views import APIView
+        from authentication.tokens import local_cache
+
+        keys = seed(args.users, args.notifications)
+        client = APIClient()
+        print(f'{args.users} users, {args.notifications} notifications each')
+
+        for label, path in AUTHENTICATION.items():
+            cache.clear()
+            local_cache.clear()
+            # APIView reads its authentication classes from the settings when
+            # it is imported, so override_settings cannot swap them
+            classes = [SessionAuthentication, import_string(path)]
+            # This process's LocMemCache stands in for a shared cache
+            with mock.patch.object(APIView, 'authentication_classes', classes), \
+                    override_settings(SHARED_CACHE_ALIAS='default'):
+                passes = {'first pass': poll(client, keys), 'later passes': poll(client, keys * args.rounds)}
+            for name, (queries, stats) in passes.items():
+                print(f'{label:>26} {name:<12}: {queries:.1f} queries/request  '
+                      f'p50 {stats["p50_ms"]:.2f}ms  p95 {stats["p95_ms"]:.2f}ms  '
+                      f'mean {stats["mean_ms"]:.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
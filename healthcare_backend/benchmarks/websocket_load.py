@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+WebSocket load test: how many concurrent chat connections one worker holds.
+
+Opens authenticated connections to the ASGI application in steps, all in
+one process and one event loop (one worker). After each step it reports
+the resident memory per connection and the time to fan a new message out
+to every connected participant. Connections are in-memory ASGI transports,
+so the figures cover the worker's own cost (consumer task, subscription
+queue, fan-out) rather than kernel socket limits.
+
+    python -m benchmarks.websocket_load --connections 5000 --step 1000
+"""
+import argparse
+import asyncio
+import resource
+import sys
+import time
+
+from benchmarks import benchmark_database, create_users, setup_django, summarize
+
+
+def rss_kib():
+    """Current resident set size, falling back to the peak where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def run(connections, step, timeout):
+    from asgiref.sync import sync_to_async
+    from rest_framework.authtoken.models import Token
+    from chat.models import Conversation, ConversationMembership, Message
+    from chat.testing import WebSocketTestClient
+    from healthcare_backend.asgi import application
+
+    @sync_to_async
+    def seed():
+        therapist = create_users(1, 'loadtherapist', user_type='physiotherapist')[0]
+        patients = create_users(connections, 'loadpatient', with_tokens=True)
+        conversation = Conversation.objects.create()
+        ConversationMembership.objects.bulk_create([
+            ConversationMembership(conversation=conversation, user=user)
+            for user in [therapist, *patients]
+        ], batch_size=1000)
+        tokens = list(Token.objects.filter(user__in=patients).values_list('key', flat=True))
+        return therapist, conversation, tokens
+
+    @sync_to_async
+    def send_message(therapist, conversation):
+        return Message.objects.create(conversation=conversation, sender=therapist, content='Broadcast')
+
+    therapist, conversation, tokens = await seed()
+    clients = []
+    baseline = rss_kib()
+
+    print(f'{"connections":>11} {"connect/s":>10} {"KiB/conn":>9} '
+          f'{"fanout p50":>11} {"fanout p99":>11} {"fanout max":>11}')
+    while len(clients) < connections:
+        batch = tokens[len(clients):len(clients) + step]
+        start = time.perf_counter()
+        new_clients = [WebSocketTestClient(application, '/ws/chat/', token=token) for token in batch]
+        results = await asyncio.gather(*(client.connect(timeout) for client in new_clients))
+        connect_rate = len(batch) / (time.perf_counter() - start)
+        if not all(accepted for accepted, _ in results):
+            print('Some connections were rejected; stopping', file=sys.stderr)
+            break
+        clients.extend(new_clients)
+
+        sent_at = time.perf_counter()
+        await send_message(therapist, conversation)
+
+        async def receive_latency(client):
+            await client.receive(timeout)
+            return time.perf_counter() - sent_at
+
+        latencies = await asyncio.gather(*(receive_latency(client) for client in clients))
+        fanout = summarize(latencies)
+        per_connection = (rss_kib() - baseline) / len(clients)
+        print(f'{len(clients):>11} {connect_rate:>10.0f} {per_connection:>9.1f} '
+              f'{fanout["p50_ms"]:>9.1f}ms {fanout["p99_ms"]:>9.1f}ms {max(latencies) * 1000:>9.1f}ms')
+
+    await asyncio.gather(*(client.disconnect(timeout) for client in clients))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--connections', type=int, default=5000)
+    parser.add_argument('--step', type=int, default=1000)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    setup_django()
+    with benchmark_database():
+        asyncio.run(run(args.connections, args.step, args.timeout))
+
+
+if __name__ == '__main__':
+    main()
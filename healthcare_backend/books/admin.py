@@ -13,7 +13,10 @@ class BookAdmin(admin.ModelAdmin):
     list_filter = ['category', 'book_type', 'is_available', 'language']
     search_fields = ['title', 'author', 'isbn', 'description']
     ordering = ['title']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = [
+        'rating_sum', 'rating_count', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count', 'created_at', 'updated_at'
+    ]
 
 @admin.register(BookReview)
 class BookReviewAdmin(admin.ModelAdmin):
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from books.models import Book, BookReview
+from healthcare_backend.response_cache import bump_version
+
+AGGREGATE_FIELDS = ['rating_sum', 'rating_count'] + [
+    f'rating_{rating}_count' for rating, _ in BookReview.RATING_CHOICES
+]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the stored rating aggregates on Book from BookReview rows and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report books whose stored aggregates have drifted; exit with an error if any have',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of books written per bulk update',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = self.find_drift(options['batch_size'])
+
+            if options['check']:
+                if drifted:
+                    raise CommandError(f'{len(drifted)} book(s) have drifted rating aggregates')
+                self.stdout.write(self.style.SUCCESS('All book rating aggregates are consistent'))
+                return
+
+            Book.objects.bulk_update(drifted, AGGREGATE_FIELDS, batch_size=options['batch_size'])
+        if drifted:
+            bump_version(Book)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {len(drifted)} book(s)'))
+
+    def find_drift(self, batch_size):
+        """
+        Return the books whose stored aggregates differ from their reviews,
+        with the correct values already set on each instance.
+        """
+        expected = self.compute_aggregates()
+        empty = dict.fromkeys(AGGREGATE_FIELDS, 0)
+        drifted = []
+
+        books = Book.objects.only('pk', *AGGREGATE_FIELDS).order_by('pk')
+        for book in books.iterator(chunk_size=batch_size):
+            values = expected.get(book.pk, empty)
+            if all(getattr(book, field) == values[field] for field in AGGREGATE_FIELDS):
+                continue
+            self.stdout.write(
+                f'Drift on book {book.pk}: stored {book.rating_count} reviews '
+                f'(sum {book.rating_sum}), actual {values["rating_count"]} reviews '
+                f'(sum {values["rating_sum"]})'
+            )
+            for field in AGGREGATE_FIELDS:
+                setattr(book, field, values[field])
+            drifted.append(book)
+        return drifted
+
+    def compute_aggregates(self):
+        rows = BookReview.objects.order_by().values('book').annotate(
+            rating_sum=Sum('rating'),
+            rating_count=Count('id'),
+            **{
+                f'rating_{rating}_count': Count('id', filter=Q(rating=rating))
+                for rating, _ in BookReview.RATING_CHOICES
+            }
+        )
+        return {row.pop('book'): row for row in rows}
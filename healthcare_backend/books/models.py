@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 
 class BookCategory(models.Model):
@@ -36,12 +36,33 @@ class Book(models.Model):
     cover_image = models.ImageField(upload_to='book_covers/', blank=True, null=True)
     pdf_file = models.FileField(upload_to='book_pdfs/', blank=True, null=True)
     is_available = models.BooleanField(default=True)
+    # Rating aggregates maintained by books.signals on every BookReview write
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.title} by {self.author}"
     
+    @property
+    def average_rating(self):
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
+        return 0
+    
+    @property
+    def rating_histogram(self):
+        return {
+            str(rating): getattr(self, f'rating_{rating}_count')
+            for rating, _ in BookReview.RATING_CHOICES
+        }
+    
     class Meta:
         ordering = ['title']
 
@@ -64,6 +85,20 @@ class BookReview(models.Model):
     def __str__(self):
         return f"Review for {self.book.title} by {self.user.username}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored rating so updates can adjust the book aggregates.
+        # With either deferred, books.signals reads them before the write.
+        if not instance.get_deferred_fields() & {'book', 'rating'}:
+            instance._stored_rating = (instance.book_id, instance.rating)
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the review and its book's rating aggregates in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
     class Meta:
         unique_together = ['book', 'user']
         ordering = ['-created_at']
@@ -1,16 +1,23 @@
+from django.db.models import Count
 from rest_framework import serializers
+from healthcare_backend.batching import BatchListSerializer, BatchMethodField
 from .models import BookCategory, Book, BookReview, BookBookmark
 
 class BookCategorySerializer(serializers.ModelSerializer):
-    books_count = serializers.SerializerMethodField()
+    books_count = BatchMethodField()
     
     class Meta:
         model = BookCategory
         fields = ['id', 'name', 'description', 'books_count', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
+        list_serializer_class = BatchListSerializer
     
-    def get_books_count(self, obj):
-        return obj.books.count()
+    def load_books_count(self, keys):
+        counts = dict(
+            Book.objects.filter(category_id__in=keys)
+            .values_list('category').annotate(Count('id')).order_by()
+        )
+        return {key: counts.get(key, 0) for key in keys}
 
 class BookReviewSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
@@ -20,12 +27,37 @@ class BookReviewSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'user_name', 'rating', 'review_text', 'created_at', 'updated_at']
         read_only_fields = ['user', 'created_at', 'updated_at']
 
-class BookSerializer(serializers.ModelSerializer):
+class BookStatsMixin:
+    """
+    Rating, review count and bookmark flag for a book.
+    Ratings are read from the aggregates stored on Book. The bookmark flag
+    uses the value annotated by BookViewSet.get_queryset when present, and
+    is otherwise loaded for a whole list of books in one query.
+    """
+    
+    def get_average_rating(self, obj):
+        return obj.average_rating
+    
+    def get_reviews_count(self, obj):
+        return obj.rating_count
+    
+    def load_is_bookmarked(self, keys):
+        request = self.context.get('request')
+        if not request or not request.user.is_authenticated:
+            return {key: False for key in keys}
+        bookmarked = set(
+            BookBookmark.objects.filter(user=request.user, book_id__in=keys)
+            .values_list('book_id', flat=True)
+        )
+        return {key: key in bookmarked for key in keys}
+
+class BookSerializer(BookStatsMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     reviews = BookReviewSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
-    is_bookmarked = serializers.SerializerMethodField()
+    is_bookmarked = BatchMethodField(annotation='is_bookmarked')
+    rating_histogram = serializers.ReadOnlyField()
     
     class Meta:
         model = Book
@@ -33,31 +65,17 @@ class BookSerializer(serializers.ModelSerializer):
             'id', 'title', 'author', 'isbn', 'description', 'category', 'category_name',
             'book_type', 'publication_date', 'publisher', 'pages', 'language',
             'cover_image', 'pdf_file', 'is_available', 'reviews', 'average_rating',
-            'reviews_count', 'is_bookmarked', 'created_at', 'updated_at'
+            'reviews_count', 'rating_histogram', 'is_bookmarked', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
-    
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
-    
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-    
-    def get_is_bookmarked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return BookBookmark.objects.filter(book=obj, user=request.user).exists()
-        return False
+        list_serializer_class = BatchListSerializer
 
-class BookListSerializer(serializers.ModelSerializer):
+class BookListSerializer(BookStatsMixin, serializers.ModelSerializer):
     """Simplified serializer for book lists"""
     category_name = serializers.CharField(source='category.name', read_only=True)
     average_rating = serializers.SerializerMethodField()
     reviews_count = serializers.SerializerMethodField()
-    is_bookmarked = serializers.SerializerMethodField()
+    is_bookmarked = BatchMethodField(annotation='is_bookmarked')
     
     class Meta:
         model = Book
@@ -66,21 +84,7 @@ class BookListSerializer(serializers.ModelSerializer):
             'book_type', 'publication_date', 'publisher', 'cover_image',
             'is_available', 'average_rating', 'reviews_count', 'is_bookmarked'
         ]
-    
-    def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
-    
-    def get_reviews_count(self, obj):
-        return obj.reviews.count()
-    
-    def get_is_bookmarked(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return BookBookmark.objects.filter(book=obj, user=request.user).exists()
-        return False
+        list_serializer_class = BatchListSerializer
 
 class BookBookmarkSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
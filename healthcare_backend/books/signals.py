@@ -0,0 +1,61 @@
+from collections import Counter, defaultdict
+from django.db.models import F
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from healthcare_backend import search
+from healthcare_backend.response_cache import connect_version_signals
+from .models import Book, BookBookmark, BookCategory, BookReview
+
+connect_version_signals(BookCategory, Book, BookReview, BookBookmark)
+search.register(Book, ['title', 'author', 'description', 'publisher'], weights=[10, 5, 1, 2])
+
+
+def apply_rating_changes(changes):
+    """
+    Apply (book_id, rating, sign) changes to the stored rating aggregates.
+    Each book gets a single UPDATE built from F() expressions so concurrent
+    reviewers cannot overwrite each other's increments.
+    """
+    deltas = defaultdict(Counter)
+    for book_id, rating, sign in changes:
+        if book_id is None or rating is None:
+            continue
+        deltas[book_id]['rating_sum'] += sign * rating
+        deltas[book_id]['rating_count'] += sign
+        deltas[book_id][f'rating_{rating}_count'] += sign
+
+    for book_id, book_deltas in deltas.items():
+        updates = {
+            field: F(field) + delta
+            for field, delta in book_deltas.items() if delta
+        }
+        if updates:
+            Book.objects.filter(pk=book_id).update(**updates)
+
+
+@receiver(pre_save, sender=BookReview)
+@receiver(pre_delete, sender=BookReview)
+def remember_stored_rating(sender, instance, **kwargs):
+    # Instances not loaded through the ORM, or loaded with the rating
+    # deferred, do not know their stored rating
+    if instance.pk and not hasattr(instance, '_stored_rating'):
+        stored = BookReview.objects.filter(pk=instance.pk).values_list('book_id', 'rating').first()
+        instance._stored_rating = stored or (None, None)
+
+
+@receiver(post_save, sender=BookReview)
+def update_book_rating_on_save(sender, instance, created, **kwargs):
+    changes = [(instance.book_id, instance.rating, 1)]
+    if not created:
+        book_id, rating = getattr(instance, '_stored_rating', (None, None))
+        changes.append((book_id, rating, -1))
+    apply_rating_changes(changes)
+    instance._stored_rating = (instance.book_id, instance.rating)
+
+
+@receiver(post_delete, sender=BookReview)
+def update_book_rating_on_delete(sender, instance, **kwargs):
+    # Set by remember_stored_rating, as a deferred rating cannot be read
+    # once the row is gone
+    book_id, rating = getattr(instance, '_stored_rating', (None, None))
+    apply_rating_changes([(book_id, rating, -1)])
@@ -1,3 +1,163 @@
-from django.test import TestCase
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from .models import BookCategory, Book, BookReview, BookBookmark
+from .serializers import BookListSerializer
 
-# Create your tests here.
+User = get_user_model()
+
+
+class BookListQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='password123')
+        self.reviewers = [
+            User.objects.create_user(username=f'reviewer{i}', password='password123')
+            for i in range(3)
+        ]
+        self.category = BookCategory.objects.create(name='Rehabilitation')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_books(self, count):
+        for i in range(count):
+            book = Book.objects.create(
+                title=f'Book {Book.objects.count():03d}',
+                author='Author',
+                description='Description',
+                category=self.category,
+            )
+            for rating, reviewer in zip((3, 4, 5), self.reviewers):
+                BookReview.objects.create(book=book, user=reviewer, rating=rating)
+            if i % 2 == 0:
+                BookBookmark.objects.create(book=book, user=self.user)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_list_query_count_does_not_grow_with_page_size(self):
+        self.create_books(2)
+        small_page_queries, response = self.count_list_queries()
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.create_books(18)
+        full_page_queries, response = self.count_list_queries()
+        self.assertEqual(len(response.data['results']), 20)
+
+        self.assertEqual(small_page_queries, full_page_queries)
+        # One COUNT for the paginator and one SELECT for the page
+        self.assertEqual(full_page_queries, 2)
+
+    def test_list_returns_annotated_values(self):
+        self.create_books(2)
+        Book.objects.create(
+            title='Unreviewed', author='Author', description='Description',
+            category=self.category,
+        )
+        _, response = self.count_list_queries()
+        results = {book['title']: book for book in response.data['results']}
+
+        self.assertEqual(results['Book 000']['average_rating'], 4)
+        self.assertEqual(results['Book 000']['reviews_count'], 3)
+        self.assertTrue(results['Book 000']['is_bookmarked'])
+        self.assertFalse(results['Book 001']['is_bookmarked'])
+        self.assertEqual(results['Unreviewed']['average_rating'], 0)
+        self.assertEqual(results['Unreviewed']['reviews_count'], 0)
+        self.assertEqual(results['Book 000']['category_name'], 'Rehabilitation')
+
+    def test_anonymous_list_is_never_bookmarked(self):
+        self.create_books(2)
+        response = APIClient().get('/api/books/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any(book['is_bookmarked'] for book in response.data['results']))
+
+    def test_unannotated_books_load_bookmarks_in_one_query(self):
+        self.create_books(4)
+        request = RequestFactory().get('/api/books/')
+        request.user = self.user
+        books = list(Book.objects.select_related('category').order_by('title'))
+        with CaptureQueriesContext(connection) as context:
+            data = BookListSerializer(books, many=True, context={'request': request}).data
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual([book['is_bookmarked'] for book in data], [True, False, True, False])
+
+
+class BookRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reviewer', password='password123')
+        self.other = User.objects.create_user(username='other', password='password123')
+        self.category = BookCategory.objects.create(name='Rehabilitation')
+        self.book = Book.objects.create(
+            title='Knee Recovery', author='Author', description='Description',
+            category=self.category,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertAggregates(self, rating_sum, rating_count, histogram):
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.rating_sum, rating_sum)
+        self.assertEqual(self.book.rating_count, rating_count)
+        self.assertEqual(self.book.rating_histogram, histogram)
+
+    def test_review_action_updates_aggregates(self):
+        response = self.client.post(f'/api/books/{self.book.pk}/review/', {'rating': 4})
+        self.assertEqual(response.status_code, 201)
+        BookReview.objects.create(book=self.book, user=self.other, rating=2)
+
+        self.assertAggregates(6, 2, {'1': 0, '2': 1, '3': 0, '4': 1, '5': 0})
+        response = self.client.get(f'/api/books/{self.book.pk}/')
+        self.assertEqual(response.data['average_rating'], 3)
+        self.assertEqual(response.data['reviews_count'], 2)
+
+    def test_review_viewset_update_and_delete_adjust_aggregates(self):
+        review = BookReview.objects.create(book=self.book, user=self.user, rating=5)
+
+        response = self.client.patch(f'/api/reviews/{review.pk}/', {'rating': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertAggregates(1, 1, {'1': 1, '2': 0, '3': 0, '4': 0, '5': 0})
+
+        response = self.client.delete(f'/api/reviews/{review.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertAggregates(0, 0, {'1': 0, '2': 0, '3': 0, '4': 0, '5': 0})
+
+    def test_reviews_loaded_with_deferred_rating_adjust_aggregates(self):
+        review = BookReview.objects.create(book=self.book, user=self.user, rating=5)
+        BookReview.objects.create(book=self.book, user=self.other, rating=2)
+
+        deferred = BookReview.objects.only('id', 'review_text').get(pk=review.pk)
+        deferred.review_text = 'Helpful'
+        deferred.save()
+        self.assertAggregates(7, 2, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+
+        deferred = BookReview.objects.only('id').get(pk=review.pk)
+        deferred.rating = 3
+        deferred.save()
+        self.assertAggregates(5, 2, {'1': 0, '2': 1, '3': 1, '4': 0, '5': 0})
+
+        BookReview.objects.only('id').get(pk=review.pk).delete()
+        self.assertAggregates(2, 1, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 0})
+
+    def test_cascading_delete_adjusts_aggregates(self):
+        BookReview.objects.create(book=self.book, user=self.user, rating=3)
+        BookReview.objects.create(book=self.book, user=self.other, rating=5)
+        self.other.delete()
+        self.assertAggregates(3, 1, {'1': 0, '2': 0, '3': 1, '4': 0, '5': 0})
+
+    def test_rebuild_command_detects_and_repairs_drift(self):
+        BookReview.objects.create(book=self.book, user=self.user, rating=4)
+        Book.objects.filter(pk=self.book.pk).update(rating_sum=40, rating_count=7)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_book_ratings', '--check', stdout=StringIO())
+
+        call_command('rebuild_book_ratings', stdout=StringIO())
+        self.assertAggregates(4, 1, {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0})
+        call_command('rebuild_book_ratings', '--check', stdout=StringIO())
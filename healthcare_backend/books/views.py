@@ -1,20 +1,25 @@
 from django.shortcuts import get_object_or_404
+from django.db.models import Exists, OuterRef, Value, BooleanField
 from rest_framework import viewsets, status, permissions, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
+from healthcare_backend.prefetch import PrefetchPlanMixin
+from healthcare_backend.response_cache import CachedResponseMixin
+from healthcare_backend.search import FullTextSearchFilter
 from .models import BookCategory, Book, BookReview, BookBookmark
 from .serializers import (
     BookCategorySerializer, BookSerializer, BookListSerializer,
     BookReviewSerializer, BookBookmarkSerializer
 )
 
-class BookCategoryViewSet(viewsets.ModelViewSet):
+class BookCategoryViewSet(CachedResponseMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing book categories.
     Provides CRUD operations for book categories.
     """
+    cache_models = (BookCategory, Book)
     queryset = BookCategory.objects.all()
     serializer_class = BookCategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -23,18 +28,23 @@ class BookCategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(CachedResponseMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing books.
     Provides CRUD operations for books with filtering and search capabilities.
     """
+    # Reviews update the rating aggregates on Book with QuerySet.update(),
+    # so they are versioned separately. is_bookmarked differs per user.
+    cache_models = (Book, BookCategory, BookReview, BookBookmark)
+    cache_per_user = True
     queryset = Book.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category', 'book_type', 'language', 'is_available']
     search_fields = ['title', 'author', 'description', 'publisher']
     ordering_fields = ['title', 'author', 'publication_date', 'created_at']
     ordering = ['title']
+    query_budget = {'list': 4, 'retrieve': 4}
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -42,7 +52,21 @@ class BookViewSet(viewsets.ModelViewSet):
         return BookSerializer
     
     def get_queryset(self):
-        queryset = Book.objects.all()
+        # Ratings come from the stored aggregates on Book and the bookmark flag
+        # from a subquery, so a page of books costs a fixed number of queries
+        queryset = Book.objects.select_related('category')
+        
+        user = self.request.user
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_bookmarked=Exists(
+                    BookBookmark.objects.filter(book=OuterRef('pk'), user=user)
+                )
+            )
+        else:
+            queryset = queryset.annotate(
+                is_bookmarked=Value(False, output_field=BooleanField())
+            )
         
         # Filter by author if provided
         author = self.request.query_params.get('author', None)
@@ -114,7 +138,7 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer = BookReviewSerializer(reviews, many=True)
         return Response(serializer.data)
 
-class BookReviewViewSet(viewsets.ModelViewSet):
+class BookReviewViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing book reviews.
     Users can only manage their own reviews.
@@ -132,7 +156,7 @@ class BookReviewViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError("You have already reviewed this book")
         serializer.save(user=self.request.user)
 
-class BookBookmarkViewSet(viewsets.ReadOnlyModelViewSet):
+class BookBookmarkViewSet(PrefetchPlanMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing user's bookmarked books.
     """
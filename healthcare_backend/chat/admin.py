@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Conversation, Message, Attachment
+from .models import Conversation, ConversationMembership, Message, Attachment
+
+class ConversationMembershipInline(admin.TabularInline):
+    model = ConversationMembership
+    extra = 0
+    readonly_fields = ('last_message', 'last_activity_at', 'unread_count', 'last_read_message_id')
 
 class MessageInline(admin.TabularInline):
     model = Message
@@ -14,15 +19,15 @@ class AttachmentInline(admin.TabularInline):
 class ConversationAdmin(admin.ModelAdmin):
     list_display = ('id', 'get_participants', 'created_at', 'updated_at')
     readonly_fields = ('created_at', 'updated_at')
-    inlines = [MessageInline]
+    inlines = [ConversationMembershipInline, MessageInline]
     
     def get_participants(self, obj):
         return ", ".join([user.username for user in obj.participants.all()])
     get_participants.short_description = 'Participants'
 
 class MessageAdmin(admin.ModelAdmin):
-    list_display = ('id', 'conversation', 'sender', 'content_preview', 'is_read', 'created_at')
-    list_filter = ('is_read', 'created_at')
+    list_display = ('id', 'conversation', 'sender', 'content_preview', 'created_at')
+    list_filter = ('created_at',)
     search_fields = ('content', 'sender__username')
     readonly_fields = ('created_at',)
     inlines = [AttachmentInline]
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+from rest_framework.authtoken.models import Token
+from rest_framework.utils.encoders import JSONEncoder
+from .pubsub import SubscriptionOverflow, get_pubsub, user_channel
+
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_OVERFLOW = 4008
+
+
+class ChatConsumer:
+    """
+    ASGI WebSocket endpoint that pushes chat events to a connected user.
+
+    Clients authenticate with their DRF token, either as an
+    ``Authorization: Token <key>`` header or a ``?token=<key>`` query
+    parameter, and then receive ``message.created`` and
+    ``read_cursor.updated`` events for every conversation they take part
+    in. A client that falls behind is closed with code 4008 and should
+    catch up through the messages endpoint's ``after`` cursor.
+    """
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+
+        user = await self.authenticate(scope)
+        if user is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+            return
+
+        await send({'type': 'websocket.accept'})
+        subscription = get_pubsub().subscribe(user_channel(user.pk))
+        forwarder = asyncio.ensure_future(self.forward_events(subscription, send))
+        try:
+            await self.receive_until_disconnect(receive, send)
+        finally:
+            forwarder.cancel()
+            subscription.close()
+
+    async def authenticate(self, scope):
+        key = self.get_token_key(scope)
+        if not key:
+            return None
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        if not token.user.is_active:
+            return None
+        return token.user
+
+    def get_token_key(self, scope):
+        for name, value in scope.get('headers', []):
+            if name.lower() == b'authorization':
+                keyword, _, key = value.decode('latin1').partition(' ')
+                if keyword.lower() == 'token':
+                    return key.strip()
+        query = parse_qs(scope.get('query_string', b'').decode('latin1'))
+        return query.get('token', [None])[0]
+
+    async def forward_events(self, subscription, send):
+        try:
+            while True:
+                event = await subscription.get()
+                await send({'type': 'websocket.send', 'text': json.dumps(event, cls=JSONEncoder)})
+        except SubscriptionOverflow:
+            await send({'type': 'websocket.close', 'code': CLOSE_OVERFLOW})
+
+    async def receive_until_disconnect(self, receive, send):
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                return
+            if event['type'] == 'websocket.receive' and self.is_ping(event.get('text')):
+                await send({'type': 'websocket.send', 'text': json.dumps({'type': 'pong'})})
+
+    def is_ping(self, text):
+        try:
+            return json.loads(text or '').get('type') == 'ping'
+        except (ValueError, AttributeError):
+            return False
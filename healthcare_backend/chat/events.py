@@ -0,0 +1,30 @@
+from .models import ConversationMembership
+from .pubsub import get_pubsub, user_channel
+
+
+def publish_to_participants(conversation_id, event):
+    pubsub = get_pubsub()
+    participant_ids = ConversationMembership.objects.filter(
+        conversation_id=conversation_id
+    ).values_list('user_id', flat=True)
+    for user_id in participant_ids:
+        pubsub.publish(user_channel(user_id), event)
+
+
+def publish_message_created(message):
+    from .serializers import MessageSerializer
+
+    publish_to_participants(message.conversation_id, {
+        'type': 'message.created',
+        'conversation': message.conversation_id,
+        'message': MessageSerializer(message).data,
+    })
+
+
+def publish_read_cursor(conversation_id, user_id, last_read_message_id):
+    publish_to_participants(conversation_id, {
+        'type': 'read_cursor.updated',
+        'conversation': conversation_id,
+        'user': user_id,
+        'last_read_message_id': last_read_message_id,
+    })
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_participants_to_memberships(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    ConversationMembership = apps.get_model('chat', 'ConversationMembership')
+    Message = apps.get_model('chat', 'Message')
+    Participant = Conversation.participants.through
+
+    memberships = []
+    for row in Participant.objects.select_related('conversation').iterator():
+        last_message = (
+            Message.objects.filter(conversation_id=row.conversation_id)
+            .order_by('-created_at', '-id').first()
+        )
+        memberships.append(ConversationMembership(
+            conversation_id=row.conversation_id,
+            user_id=row.user_id,
+            last_message=last_message,
+            last_activity_at=last_message.created_at if last_message else row.conversation.created_at,
+            unread_count=Message.objects.filter(
+                conversation_id=row.conversation_id, is_read=False
+            ).exclude(sender_id=row.user_id).count(),
+        ))
+    ConversationMembership.objects.bulk_create(memberships, batch_size=1000)
+
+
+def copy_memberships_to_participants(apps, schema_editor):
+    Conversation = apps.get_model('chat', 'Conversation')
+    ConversationMembership = apps.get_model('chat', 'ConversationMembership')
+    Participant = Conversation.participants.through
+
+    Participant.objects.bulk_create([
+        Participant(conversation_id=membership.conversation_id, user_id=membership.user_id)
+        for membership in ConversationMembership.objects.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='chat.conversation')),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chat.message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversation_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-last_activity_at'],
+                'indexes': [models.Index(fields=['user', '-last_activity_at'], name='chat_membership_inbox_idx')],
+                'unique_together': {('conversation', 'user')},
+            },
+        ),
+        migrations.RunPython(copy_participants_to_memberships, copy_memberships_to_participants),
+        # The participants M2M now goes through ConversationMembership, so the
+        # auto-created join table is dropped once its rows have been copied
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RemoveField(
+                    model_name='conversation',
+                    name='participants',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='chat.ConversationMembership', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:58
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def derive_read_cursors(apps, schema_editor):
+    ConversationMembership = apps.get_model('chat', 'ConversationMembership')
+    Message = apps.get_model('chat', 'Message')
+
+    for membership in ConversationMembership.objects.iterator():
+        messages = Message.objects.filter(conversation_id=membership.conversation_id)
+        others = messages.exclude(sender_id=membership.user_id)
+        # Everything before the first unread message from someone else was read
+        first_unread = others.filter(is_read=False).aggregate(id=Min('id'))['id']
+        if first_unread is None:
+            cursor = messages.aggregate(id=Max('id'))['id'] or 0
+        else:
+            cursor = first_unread - 1
+        membership.last_read_message_id = cursor
+        membership.unread_count = others.filter(id__gt=cursor).count()
+        membership.save(update_fields=['last_read_message_id', 'unread_count'])
+
+
+def derive_is_read_flags(apps, schema_editor):
+    ConversationMembership = apps.get_model('chat', 'ConversationMembership')
+    Message = apps.get_model('chat', 'Message')
+
+    for membership in ConversationMembership.objects.iterator():
+        Message.objects.filter(
+            conversation_id=membership.conversation_id,
+            id__lte=membership.last_read_message_id,
+        ).exclude(sender_id=membership.user_id).update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_conversationmembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationmembership',
+            name='last_read_message_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(derive_read_cursors, derive_is_read_flags),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+    ]
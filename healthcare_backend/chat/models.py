@@ -1,8 +1,15 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
+from django.utils import timezone
 
 class Conversation(models.Model):
-    participants = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='conversations')
+    participants = models.ManyToManyField(
+        settings.AUTH_USER_MODEL,
+        through='ConversationMembership',
+        related_name='conversations'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -16,14 +23,103 @@ class Message(models.Model):
     conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_messages')
     content = models.TextField()
-    is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
         return f"Message from {self.sender.username} at {self.created_at}"
     
+    def save(self, *args, **kwargs):
+        # Keep the message and the participants' inbox rows in one transaction
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+    
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='chat_message_history_idx'),
+        ]
+
+class ConversationMembership(models.Model):
+    """
+    A user's participation in a conversation and the inbox read model
+    for it: the latest message, when it arrived and how many are unread.
+    Messages with an id above last_read_message_id are unread.
+    """
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='conversation_memberships')
+    last_message = models.ForeignKey(Message, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_activity_at = models.DateTimeField(default=timezone.now)
+    unread_count = models.PositiveIntegerField(default=0)
+    last_read_message_id = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.user.username} in conversation {self.conversation_id}"
+    
+    @classmethod
+    def record_message(cls, message):
+        """
+        Move the conversation to the top of every participant's inbox and
+        count the message as unread for everyone except its sender.
+        """
+        cls.objects.filter(conversation_id=message.conversation_id).update(
+            last_message=message,
+            last_activity_at=message.created_at,
+            unread_count=Case(
+                When(user_id=message.sender_id, then=F('unread_count')),
+                default=F('unread_count') + 1,
+            ),
+        )
+    
+    @classmethod
+    def record_join(cls, conversation_id, user_ids):
+        """
+        Fill in the inbox rows of users who joined a conversation that
+        already has messages, as the migration did for existing members:
+        their cursor stays at 0, so every message from others is unread.
+        """
+        last_message = Message.objects.filter(conversation_id=conversation_id).order_by('-id').first()
+        if last_message is None:
+            return
+        unread = Message.objects.filter(
+            conversation_id=conversation_id,
+        ).exclude(sender_id=OuterRef('user_id')).order_by().values('conversation_id').annotate(
+            count=Count('id')
+        ).values('count')
+        cls.objects.filter(conversation_id=conversation_id, user_id__in=user_ids).update(
+            last_message=last_message,
+            last_activity_at=last_message.created_at,
+            unread_count=Coalesce(Subquery(unread), 0),
+        )
+    
+    @classmethod
+    def mark_read(cls, conversation_id, user_id):
+        """
+        Move the user's read cursor to the latest message of the conversation.
+        This is a single UPDATE that matches no rows when nothing is unread.
+        When the latest message was deleted, the newest remaining one is
+        used instead.
+        """
+        newest = Message.objects.filter(conversation_id=conversation_id).order_by('-id').values('id')[:1]
+        latest = Coalesce(F('last_message_id'), Subquery(newest), F('last_read_message_id'))
+        return cls.objects.filter(
+            Q(last_read_message_id__lt=latest) | Q(unread_count__gt=0),
+            conversation_id=conversation_id,
+            user_id=user_id,
+        ).update(last_read_message_id=Greatest(latest, F('last_read_message_id')), unread_count=0)
+    
+    def count_unread(self):
+        """Count the unread messages by ranging over ids above the read cursor"""
+        return Message.objects.filter(
+            conversation_id=self.conversation_id,
+            id__gt=self.last_read_message_id,
+        ).exclude(sender_id=self.user_id).count()
+    
+    class Meta:
+        unique_together = ['conversation', 'user']
+        ordering = ['-last_activity_at']
+        indexes = [
+            models.Index(fields=['user', '-last_activity_at'], name='chat_membership_inbox_idx'),
+        ]
 
 class Attachment(models.Model):
     message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='attachments')
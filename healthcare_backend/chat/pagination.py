@@ -0,0 +1,107 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    Keyset pagination over (created_at, id) for a conversation's messages.
+
+    Without a cursor the latest page is returned. ``before=<cursor>`` walks
+    back through older messages and ``after=<cursor>`` polls for newer ones.
+    Every page is a bounded index range scan, so its cost does not depend
+    on how long the thread is. Results are always in chronological order.
+    """
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    before_query_param = 'before'
+    after_query_param = 'after'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+
+        before = self.decode_cursor(request.query_params.get(self.before_query_param))
+        after = self.decode_cursor(request.query_params.get(self.after_query_param))
+
+        if after is not None:
+            created_at, pk = after
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk),
+                created_at__gte=created_at,
+            ).order_by('created_at', 'id')
+            page = list(queryset[:page_size])
+            self.has_older = True
+        else:
+            if before is not None:
+                created_at, pk = before
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk),
+                    created_at__lte=created_at,
+                )
+            queryset = queryset.order_by('-created_at', '-id')
+            page = list(queryset[:page_size + 1])
+            self.has_older = len(page) > page_size
+            page = page[:page_size][::-1]
+
+        self.page = page
+        # Polling with an empty page keeps the cursor it was given
+        self.newest = (page[-1].created_at, page[-1].id) if page else after or before
+        self.oldest = (page[0].created_at, page[0].id) if page else None
+        return page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, position):
+        created_at, pk = position
+        return urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        if encoded is None:
+            return None
+        try:
+            created_at, pk = urlsafe_b64decode(encoded.encode()).decode().split('|')
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def get_link(self, param, position):
+        url = remove_query_param(self.base_url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, self.encode_cursor(position))
+
+    def get_previous_link(self):
+        if not self.has_older or self.oldest is None:
+            return None
+        return self.get_link(self.before_query_param, self.oldest)
+
+    def get_next_link(self):
+        # Always present once a position is known so clients can poll it
+        if self.newest is None:
+            return None
+        return self.get_link(self.after_query_param, self.newest)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class SubscriptionOverflow(Exception):
+    """Raised to a subscriber that fell too far behind and lost events"""
+
+
+class Subscription:
+    """
+    An asyncio queue of events published to one channel. It must be created
+    and consumed on the event loop that owns the WebSocket connection.
+    """
+
+    def __init__(self, pubsub, channel, max_pending):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Dropping events silently would desync the client, so the
+            # subscriber is told to reconnect and catch up over HTTP instead
+            self.overflowed = True
+
+    async def get(self):
+        if self.overflowed:
+            raise SubscriptionOverflow(self.channel)
+        event = await self.queue.get()
+        if self.overflowed:
+            raise SubscriptionOverflow(self.channel)
+        return event
+
+    def close(self):
+        self.pubsub.unsubscribe(self)
+
+
+class BasePubSub:
+    """
+    Broker interface used to push chat events to connected clients.
+    ``publish`` is synchronous and safe to call from any thread (views,
+    signals); ``subscribe`` is called from the event loop of the connection.
+    """
+    max_pending = 100
+
+    def publish(self, channel, event):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class InProcessPubSub(BasePubSub):
+    """
+    Delivers events to subscribers in the same process. Suitable for
+    single-node deployments and tests; a multi-node deployment needs a
+    broker-backed implementation set through CHAT_PUBSUB_BACKEND.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, channel, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+        return len(subscriptions)
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_pending)
+        with self.lock:
+            self.subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel_subscriptions = self.subscriptions.get(subscription.channel, set())
+            channel_subscriptions.discard(subscription)
+            if not channel_subscriptions:
+                self.subscriptions.pop(subscription.channel, None)
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(subscriptions) for subscriptions in self.subscriptions.values())
+
+
+_pubsub = None
+_pubsub_lock = threading.Lock()
+
+
+def get_pubsub():
+    """Return the process-wide broker configured by CHAT_PUBSUB_BACKEND"""
+    global _pubsub
+    if _pubsub is None:
+        with _pubsub_lock:
+            if _pubsub is None:
+                backend = getattr(settings, 'CHAT_PUBSUB_BACKEND', 'chat.pubsub.InProcessPubSub')
+                _pubsub = import_string(backend)()
+    return _pubsub
+
+
+def user_channel(user_id):
+    return f'chat.user.{user_id}'
@@ -0,0 +1,5 @@
+from .consumers import ChatConsumer
+
+websocket_urlpatterns = {
+    '/ws/chat/': ChatConsumer(),
+}
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from .models import Conversation, Message, Attachment
+from django.db.models import Count, F, OuterRef, Subquery
+from .models import Conversation, ConversationMembership, Message, Attachment
 from authentication.serializers import UserSerializer
+from healthcare_backend.batching import BatchListSerializer, BatchMethodField
+from healthcare_backend.prefetch import apply_prefetch_plan
 
 User = get_user_model()
 
@@ -18,7 +21,7 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'conversation', 'sender', 'content', 
-                  'is_read', 'created_at', 'attachments']
+                  'created_at', 'attachments']
         read_only_fields = ['created_at']
 
 class MessageCreateSerializer(serializers.ModelSerializer):
@@ -33,24 +36,58 @@ class MessageCreateSerializer(serializers.ModelSerializer):
 
 class ConversationSerializer(serializers.ModelSerializer):
     participants = UserSerializer(many=True, read_only=True)
-    last_message = serializers.SerializerMethodField()
-    unread_count = serializers.SerializerMethodField()
+    last_message = BatchMethodField()
+    unread_count = BatchMethodField()
+    last_read_message_id = BatchMethodField()
     
     class Meta:
         model = Conversation
         fields = ['id', 'participants', 'created_at', 
-                  'updated_at', 'last_message', 'unread_count']
+                  'updated_at', 'last_message', 'unread_count', 'last_read_message_id']
         read_only_fields = ['created_at', 'updated_at']
+        list_serializer_class = BatchListSerializer
     
-    def get_last_message(self, obj):
-        last_message = obj.messages.order_by('-created_at').first()
-        if last_message:
-            return MessageSerializer(last_message).data
-        return None
+    def load_last_message(self, keys):
+        latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-created_at', '-id')
+        last_ids = Conversation.objects.filter(pk__in=keys).annotate(
+            last_id=Subquery(latest.values('pk')[:1])
+        ).values_list('last_id', flat=True)
+        messages = apply_prefetch_plan(Message.objects.filter(pk__in=list(last_ids)), MessageSerializer)
+        return {message['conversation']: message for message in MessageSerializer(messages, many=True).data}
     
-    def get_unread_count(self, obj):
+    def load_unread_count(self, keys):
+        # Messages past the user's read cursor, as in ConversationMembership.count_unread
         user = self.context.get('request').user
-        return obj.messages.filter(is_read=False).exclude(sender=user).count()
+        counts = dict(
+            Message.objects.filter(
+                conversation_id__in=keys,
+                conversation__memberships__user=user,
+                id__gt=F('conversation__memberships__last_read_message_id'),
+            ).exclude(sender=user)
+            .values_list('conversation').annotate(Count('id')).order_by()
+        )
+        return {key: counts.get(key, 0) for key in keys}
+    
+    def load_last_read_message_id(self, keys):
+        user = self.context.get('request').user
+        cursors = dict(
+            ConversationMembership.objects.filter(user=user, conversation_id__in=keys)
+            .values_list('conversation_id', 'last_read_message_id')
+        )
+        return {key: cursors.get(key, 0) for key in keys}
+
+class ConversationInboxSerializer(serializers.ModelSerializer):
+    """Inbox entry read from a user's ConversationMembership row"""
+    id = serializers.IntegerField(source='conversation_id', read_only=True)
+    participants = UserSerializer(source='conversation.participants', many=True, read_only=True)
+    created_at = serializers.DateTimeField(source='conversation.created_at', read_only=True)
+    updated_at = serializers.DateTimeField(source='conversation.updated_at', read_only=True)
+    last_message = MessageSerializer(read_only=True)
+    
+    class Meta:
+        model = ConversationMembership
+        fields = ['id', 'participants', 'created_at', 'updated_at',
+                  'last_message', 'unread_count', 'last_read_message_id', 'last_activity_at']
 
 class ConversationCreateSerializer(serializers.ModelSerializer):
     participants = serializers.PrimaryKeyRelatedField(
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from notifications.fanout import notify_new_message
+from .events import publish_message_created
+from .models import Conversation, Message, ConversationMembership
+
+
+@receiver(post_save, sender=Message)
+def update_inbox_on_message(sender, instance, created, **kwargs):
+    if created:
+        ConversationMembership.record_message(instance)
+        transaction.on_commit(lambda: publish_message_created(instance))
+        transaction.on_commit(lambda: notify_new_message(instance))
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def update_inbox_on_join(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != 'post_add' or not pk_set:
+        return
+    if reverse:
+        # user.conversations.add(...)
+        for conversation_id in pk_set:
+            ConversationMembership.record_join(conversation_id, [instance.pk])
+    else:
+        ConversationMembership.record_join(instance.pk, pk_set)
+
+
+@receiver(post_save, sender=ConversationMembership)
+def update_inbox_on_membership(sender, instance, created, **kwargs):
+    if created and instance.last_message_id is None:
+        ConversationMembership.record_join(instance.conversation_id, [instance.user_id])
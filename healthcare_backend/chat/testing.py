@@ -0,0 +1,35 @@
+import asyncio
+from urllib.parse import urlencode
+
+
+class WebSocketTestClient:
+    """
+    Drives an ASGI application over an in-memory WebSocket connection,
+    for tests and the WebSocket load test.
+    """
+
+    def __init__(self, application, path, token=None):
+        self.inbound = asyncio.Queue()
+        self.outbound = asyncio.Queue()
+        scope = {
+            'type': 'websocket',
+            'path': path,
+            'query_string': urlencode({'token': token}).encode() if token else b'',
+            'headers': [],
+        }
+        self.task = asyncio.ensure_future(application(scope, self.inbound.get, self.outbound.put))
+
+    async def connect(self, timeout=1):
+        await self.inbound.put({'type': 'websocket.connect'})
+        event = await self.receive(timeout)
+        return event['type'] == 'websocket.accept', event
+
+    async def send_text(self, text):
+        await self.inbound.put({'type': 'websocket.receive', 'text': text})
+
+    async def receive(self, timeout=1):
+        return await asyncio.wait_for(self.outbound.get(), timeout)
+
+    async def disconnect(self, timeout=1):
+        await self.inbound.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout)
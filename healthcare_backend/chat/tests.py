@@ -1,3 +1,275 @@
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from .consumers import CLOSE_UNAUTHORIZED
+from .models import Conversation, ConversationMembership, Message
+from .pubsub import get_pubsub
+from .testing import WebSocketTestClient
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ChatTestCase(TestCase):
+    def setUp(self):
+        self.therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist)
+
+    def create_conversation(self, *users):
+        conversation = Conversation.objects.create()
+        conversation.participants.set([self.therapist, *users])
+        return conversation
+
+    def create_patient(self):
+        count = User.objects.filter(user_type='patient').count()
+        return User.objects.create_user(username=f'patient{count}', password='password123')
+
+
+class InboxTests(ChatTestCase):
+    def test_posting_a_message_updates_every_participant_inbox(self):
+        patient = self.create_patient()
+        conversation = self.create_conversation(patient)
+
+        response = self.client.post(
+            f'/api/chat/conversations/{conversation.pk}/messages/', {'content': 'Hello'}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get()
+
+        sender_row = ConversationMembership.objects.get(user=self.therapist)
+        patient_row = ConversationMembership.objects.get(user=patient)
+        self.assertEqual(sender_row.unread_count, 0)
+        self.assertEqual(patient_row.unread_count, 1)
+        self.assertEqual(patient_row.last_message, message)
+        self.assertEqual(patient_row.last_activity_at, message.created_at)
+
+    def test_inbox_is_sorted_by_activity(self):
+        first = self.create_conversation(self.create_patient())
+        second = self.create_conversation(self.create_patient())
+        Message.objects.create(conversation=first, sender=self.therapist, content='Newest')
+
+        response = self.client.get('/api/chat/conversations/')
+        self.assertEqual([row['id'] for row in response.data], [first.pk, second.pk])
+        self.assertEqual(response.data[0]['last_message']['content'], 'Newest')
+        self.assertIsNone(response.data[1]['last_message'])
+
+    def test_inbox_query_count_does_not_grow_with_conversations(self):
+        def count_inbox_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get('/api/chat/conversations/')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        for _ in range(2):
+            patient = self.create_patient()
+            conversation = self.create_conversation(patient)
+            Message.objects.create(conversation=conversation, sender=patient, content='Hi')
+        small_inbox_queries = count_inbox_queries()
+
+        for _ in range(10):
+            patient = self.create_patient()
+            conversation = self.create_conversation(patient)
+            Message.objects.create(conversation=conversation, sender=patient, content='Hi')
+        self.assertEqual(count_inbox_queries(), small_inbox_queries)
+
+    def test_opening_a_conversation_clears_unread_count(self):
+        patient = self.create_patient()
+        conversation = self.create_conversation(patient)
+        Message.objects.create(conversation=conversation, sender=patient, content='Hi')
+
+        response = self.client.get('/api/chat/conversations/')
+        self.assertEqual(response.data[0]['unread_count'], 1)
+        self.client.get(f'/api/chat/conversations/{conversation.pk}/messages/')
+        response = self.client.get('/api/chat/conversations/')
+        self.assertEqual(response.data[0]['unread_count'], 0)
+
+
+class ReadCursorTests(ChatTestCase):
+    def test_opening_a_conversation_is_a_single_update(self):
+        patient = self.create_patient()
+        conversation = self.create_conversation(patient)
+        for i in range(20):
+            Message.objects.create(conversation=conversation, sender=patient, content=f'Message {i}')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/chat/conversations/{conversation.pk}/messages/')
+        self.assertEqual(response.status_code, 200)
+        writes = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+
+        membership = ConversationMembership.objects.get(conversation=conversation, user=self.therapist)
+        self.assertEqual(membership.last_read_message_id, Message.objects.latest('id').id)
+        self.assertEqual(membership.count_unread(), 0)
+
+    def test_group_participants_have_independent_cursors(self):
+        first, second = self.create_patient(), self.create_patient()
+        conversation = self.create_conversation(first, second)
+        Message.objects.create(conversation=conversation, sender=first, content='One')
+        Message.objects.create(conversation=conversation, sender=self.therapist, content='Two')
+
+        self.client.get(f'/api/chat/conversations/{conversation.pk}/messages/')
+        Message.objects.create(conversation=conversation, sender=first, content='Three')
+
+        memberships = {
+            m.user_id: m for m in ConversationMembership.objects.filter(conversation=conversation)
+        }
+        self.assertEqual(memberships[self.therapist.pk].count_unread(), 1)
+        self.assertEqual(memberships[self.therapist.pk].unread_count, 1)
+        self.assertEqual(memberships[second.pk].count_unread(), 3)
+        self.assertEqual(memberships[second.pk].unread_count, 3)
+        self.assertEqual(memberships[first.pk].count_unread(), 1)
+
+    def test_deleting_the_latest_message_still_lets_the_reader_catch_up(self):
+        patient = self.create_patient()
+        conversation = self.create_conversation(patient)
+        Message.objects.create(conversation=conversation, sender=patient, content='One')
+        Message.objects.create(conversation=conversation, sender=patient, content='Two').delete()
+
+        self.client.get(f'/api/chat/conversations/{conversation.pk}/messages/')
+        membership = ConversationMembership.objects.get(conversation=conversation, user=self.therapist)
+        self.assertIsNone(membership.last_message)
+        self.assertEqual(membership.unread_count, 0)
+        self.assertEqual(membership.last_read_message_id, Message.objects.get().id)
+
+    def test_participants_joining_later_count_the_existing_messages(self):
+        first, second, third = self.create_patient(), self.create_patient(), self.create_patient()
+        conversation = self.create_conversation(first)
+        Message.objects.create(conversation=conversation, sender=first, content='One')
+        message = Message.objects.create(conversation=conversation, sender=second, content='Two')
+
+        conversation.participants.add(second)
+        third.conversations.add(conversation)
+        for user in (second, third):
+            membership = ConversationMembership.objects.get(conversation=conversation, user=user)
+            self.assertEqual(membership.last_message, message)
+            self.assertEqual(membership.last_activity_at, message.created_at)
+            self.assertEqual(membership.unread_count, membership.count_unread())
+        self.assertEqual(ConversationMembership.objects.get(conversation=conversation, user=third).unread_count, 2)
+
+
+class MessageHistoryPaginationTests(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = self.create_patient()
+        self.conversation = self.create_conversation(self.patient)
+        self.url = f'/api/chat/conversations/{self.conversation.pk}/messages/'
+
+    def create_messages(self, count):
+        start = self.conversation.messages.count()
+        return [
+            Message.objects.create(
+                conversation=self.conversation, sender=self.patient, content=f'Message {start + i}'
+            )
+            for i in range(count)
+        ]
+
+    def contents(self, response):
+        return [message['content'] for message in response.data['results']]
+
+    def test_latest_page_and_walking_back(self):
+        self.create_messages(7)
+
+        response = self.client.get(self.url, {'page_size': 3})
+        self.assertEqual(self.contents(response), ['Message 4', 'Message 5', 'Message 6'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.contents(response), ['Message 1', 'Message 2', 'Message 3'])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.contents(response), ['Message 0'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_polling_for_new_messages(self):
+        self.create_messages(2)
+        response = self.client.get(self.url)
+        poll_url = response.data['next']
+
+        response = self.client.get(poll_url)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(response.data['next'], poll_url)
+
+        self.create_messages(2)
+        response = self.client.get(poll_url)
+        self.assertEqual(self.contents(response), ['Message 2', 'Message 3'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'before': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_cost_does_not_depend_on_thread_length(self):
+        def count_page_queries(url):
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries), response
+
+        self.create_messages(5)
+        short_latest, response = count_page_queries(f'{self.url}?page_size=5')
+        short_poll, _ = count_page_queries(response.data['next'])
+
+        self.create_messages(200)
+        long_latest, response = count_page_queries(f'{self.url}?page_size=5')
+        self.assertEqual(len(response.data['results']), 5)
+        long_poll, _ = count_page_queries(response.data['next'])
+
+        self.assertEqual(short_latest, long_latest)
+        self.assertEqual(short_poll, long_poll)
+
+
+class WebSocketTests(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = self.create_patient()
+        self.conversation = self.create_conversation(self.patient)
+        self.patient_token = Token.objects.create(user=self.patient).key
+
+    async def connect(self, token):
+        from healthcare_backend.asgi import application
+
+        client = WebSocketTestClient(application, '/ws/chat/', token=token)
+        accepted, event = await client.connect()
+        return client, accepted, event
+
+    async def test_rejects_missing_or_unknown_token(self):
+        for token in (None, 'unknown'):
+            _, accepted, event = await self.connect(token)
+            self.assertFalse(accepted)
+            self.assertEqual(event['code'], CLOSE_UNAUTHORIZED)
+
+    async def test_pushes_new_messages_and_read_cursors_to_participants(self):
+        client, accepted, _ = await self.connect(self.patient_token)
+        self.assertTrue(accepted)
+
+        def post_message():
+            # Events are published once the message is committed
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    f'/api/chat/conversations/{self.conversation.pk}/messages/',
+                    {'content': 'How is the knee?'}, format='json',
+                )
+
+        await sync_to_async(post_message)()
+        event = json.loads((await client.receive())['text'])
+        self.assertEqual(event['type'], 'message.created')
+        self.assertEqual(event['conversation'], self.conversation.pk)
+        self.assertEqual(event['message']['content'], 'How is the knee?')
+        message_id = event['message']['id']
+
+        self.client.force_authenticate(user=self.patient)
+        await sync_to_async(self.client.get)(f'/api/chat/conversations/{self.conversation.pk}/messages/')
+        event = json.loads((await client.receive())['text'])
+        self.assertEqual(event['type'], 'read_cursor.updated')
+        self.assertEqual(event['user'], self.patient.pk)
+        self.assertEqual(event['last_read_message_id'], message_id)
+
+        await client.send_text(json.dumps({'type': 'ping'}))
+        self.assertEqual(json.loads((await client.receive())['text']), {'type': 'pong'})
+        await client.disconnect()
+        self.assertEqual(get_pubsub().subscriber_count(), 0)
@@ -3,21 +3,32 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from .models import Conversation, Message, Attachment
+from healthcare_backend.projections import project, render_rows
+from .models import Conversation, ConversationMembership, Message, Attachment
 from .serializers import (
-    ConversationSerializer, ConversationCreateSerializer,
+    ConversationSerializer, ConversationInboxSerializer, ConversationCreateSerializer,
     MessageSerializer, MessageCreateSerializer,
     AttachmentSerializer
 )
+from dashboard.sections import invalidate as invalidate_dashboard
+from .events import publish_read_cursor
+from .pagination import MessageKeysetPagination
 
 class ConversationListCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = {'get': 6}
     
     def get(self, request):
-        # Get all conversations where the current user is a participant
-        conversations = Conversation.objects.filter(participants=request.user)
-        serializer = ConversationSerializer(
-            conversations, 
+        # The inbox is read from the user's membership rows, newest activity first
+        memberships = (
+            ConversationMembership.objects
+            .filter(user=request.user)
+            .select_related('conversation', 'last_message__sender')
+            .prefetch_related('conversation__participants', 'last_message__attachments')
+            .order_by('-last_activity_at', '-id')
+        )
+        serializer = ConversationInboxSerializer(
+            memberships, 
             many=True, 
             context={'request': request}
         )
@@ -66,6 +77,7 @@ class ConversationDetailView(APIView):
 
 class MessageListCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    query_budget = {'get': 8}
     
     def get(self, request, conversation_id):
         # Ensure the conversation exists and user is a participant
@@ -75,17 +87,21 @@ class MessageListCreateView(APIView):
             participants=request.user
         )
         
-        # Get all messages in the conversation
-        messages = conversation.messages.all()
+        # Move the user's read cursor past every message in the conversation
+        if ConversationMembership.mark_read(conversation.id, request.user.id):
+            last_read_message_id = ConversationMembership.objects.filter(
+                conversation=conversation, user=request.user
+            ).values_list('last_read_message_id', flat=True).get()
+            publish_read_cursor(conversation.id, request.user.id, last_read_message_id)
+            # Unread counts show on the dashboard too
+            invalidate_dashboard([request.user.id], 'recent_messages')
         
-        # Mark messages as read if they were sent by other users
-        unread_messages = messages.filter(is_read=False).exclude(sender=request.user)
-        for message in unread_messages:
-            message.is_read = True
-            message.save()
-        
-        serializer = MessageSerializer(messages, many=True)
-        return Response(serializer.data)
+        # Return one keyset page of the history instead of the whole thread,
+        # rendered from values rows as MessageSerializer would
+        messages = project(conversation.messages.all(), MessageSerializer)
+        paginator = MessageKeysetPagination()
+        page = paginator.paginate_queryset(messages, request, view=self)
+        return paginator.get_paginated_response(render_rows(page, MessageSerializer))
     
     def post(self, request, conversation_id):
         # Ensure the conversation exists and user is a participant
@@ -0,0 +1,395 @@
+import io
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta, time as dt_time
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+from django.utils import timezone
+from healthcare_backend.response_cache import bump_version
+
+SYNTHETIC_PASSWORD = 'password123'
+
+SPECIALIZATIONS = [
+    'Sports Injuries', 'Orthopedics', 'Neurology', 'Pediatrics', 'Geriatrics',
+    'Cardiopulmonary', 'Post-Surgical Rehabilitation', 'Chronic Pain',
+]
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Johnson', 'Lee', 'Brown', 'Garcia', 'Martin', 'Clark', 'Lewis', 'Walker', 'Young']
+REASONS = ['Lower back pain', 'Knee rehabilitation', 'Shoulder mobility', 'Neck stiffness', 'Ankle sprain']
+PAST_STATUSES = ['completed'] * 8 + ['cancelled', 'no_show']
+FUTURE_STATUSES = ['scheduled', 'confirmed']
+NOTIFICATION_TYPES = ['appointment', 'message', 'exercise', 'system']
+
+# Appointment slots per therapist per day, from 9:00
+SLOTS_PER_DAY = 8
+ITEMS_PER_PLAN = 5
+
+
+def models():
+    """Models are imported lazily so worker processes can set Django up first"""
+    from appointments.models import Appointment, AppointmentFeedback, WorkingHours
+    from authentication.models import PatientProfile, PhysiotherapistProfile, User
+    from books.models import Book, BookBookmark, BookCategory, BookReview
+    from chat.models import Conversation, ConversationMembership, Message
+    from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem, ExerciseProgress
+    from notifications.models import Notification
+    return {model.__name__: model for model in [
+        User, PatientProfile, PhysiotherapistProfile, WorkingHours, Appointment, AppointmentFeedback,
+        ExerciseCategory, Exercise, ExercisePlan, ExercisePlanItem, ExerciseProgress,
+        BookCategory, Book, BookReview, BookBookmark,
+        Conversation, Message, ConversationMembership, Notification,
+    ]}
+
+
+class ChunkedWriter:
+    """
+    Buffers model instances and writes them with bulk_create in chunks.
+    Models are flushed in the order they were first added, so parents
+    added before their children are always written first.
+    """
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {}
+        self.written = Counter()
+
+    def add(self, instance):
+        rows = self.pending.setdefault(type(instance), [])
+        rows.append(instance)
+        if len(rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.pending.items():
+            if rows:
+                model.objects.bulk_create(rows, batch_size=self.chunk_size)
+                self.written[model.__name__] += len(rows)
+                rows.clear()
+
+
+def init_worker():
+    import django
+    django.setup()
+    if connection.vendor == 'sqlite':
+        # Workers take turns on SQLite's single write lock
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout = 600000')
+            cursor.execute('PRAGMA synchronous = OFF')
+
+
+def generate_staff(plan, start, stop):
+    """Therapist users with their profiles and weekly working hours"""
+    m = models()
+    writer = ChunkedWriter(plan['chunk_size'])
+    for index in range(start, stop):
+        rng = random.Random(f'{plan["seed"]}:therapist:{index}')
+        user_id = plan['therapist_user_base'] + index
+        writer.add(m['User'](
+            id=user_id, username=f'synth_therapist{user_id}', email=f'synth_therapist{user_id}@example.com',
+            password=plan['password'], user_type='physiotherapist', is_verified=True,
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+        ))
+    writer.flush()
+    for index in range(start, stop):
+        rng = random.Random(f'{plan["seed"]}:therapist-profile:{index}')
+        profile_id = plan['therapist_profile_base'] + index
+        writer.add(m['PhysiotherapistProfile'](
+            id=profile_id, user_id=plan['therapist_user_base'] + index,
+            license_number=f'SYN-{profile_id}', years_of_experience=rng.randrange(1, 30),
+            specializations=', '.join(rng.sample(SPECIALIZATIONS, rng.randint(1, 3))),
+        ))
+    writer.flush()
+    for index in range(start, stop):
+        for day_of_week in range(5):
+            for start_hour, end_hour in ((9, 13), (14, 18)):
+                writer.add(m['WorkingHours'](
+                    physiotherapist_id=plan['therapist_profile_base'] + index, day_of_week=day_of_week,
+                    start_time=dt_time(start_hour), end_time=dt_time(end_hour),
+                ))
+    writer.flush()
+    return writer.written
+
+
+def generate_patients(plan, start, stop):
+    """Patient users with their profiles"""
+    m = models()
+    writer = ChunkedWriter(plan['chunk_size'])
+    today = date.fromordinal(plan['today'])
+    for index in range(start, stop):
+        rng = random.Random(f'{plan["seed"]}:patient:{index}')
+        user_id = plan['patient_user_base'] + index
+        writer.add(m['User'](
+            id=user_id, username=f'synth_patient{user_id}', email=f'synth_patient{user_id}@example.com',
+            password=plan['password'], user_type='patient',
+            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+            date_of_birth=today - timedelta(days=rng.randrange(18 * 365, 85 * 365)),
+        ))
+    writer.flush()
+    for index in range(start, stop):
+        writer.add(m['PatientProfile'](
+            user_id=plan['patient_user_base'] + index, medical_history=REASONS[index % len(REASONS)],
+        ))
+    writer.flush()
+    return writer.written
+
+
+def generate_activity(plan, start, stop):
+    """Appointments, exercise plans and progress, chat, notifications and reviews for patients"""
+    m = models()
+    writer = ChunkedWriter(plan['chunk_size'])
+    today = date.fromordinal(plan['today'])
+    now = timezone.now()
+    therapists = plan['therapists']
+    appointments = plan['appointments_per_patient']
+    messages = plan['messages_per_conversation']
+    first_day = today - timedelta(days=plan['history_days'])
+
+    for index in range(start, stop):
+        # Seeding per patient keeps the data independent of sharding
+        rng = random.Random(f'{plan["seed"]}:activity:{index}')
+        patient_id = plan['patient_user_base'] + index
+        therapist_id = plan['therapist_user_base'] + index % therapists
+
+        # Each patient sees one therapist, whose day is cut into slots that
+        # are handed out in patient order, so nobody is double-booked
+        for number in range(appointments):
+            slot = (index // therapists) * appointments + number
+            day = first_day + timedelta(days=slot // SLOTS_PER_DAY)
+            hour = 9 + slot % SLOTS_PER_DAY
+            status = rng.choice(PAST_STATUSES if day < today else FUTURE_STATUSES)
+            appointment_id = plan['appointment_base'] + index * appointments + number
+            writer.add(m['Appointment'](
+                id=appointment_id, patient_id=patient_id, physiotherapist_id=therapist_id, date=day,
+                start_time=dt_time(hour), end_time=dt_time(hour, 45), status=status,
+                reason=rng.choice(REASONS),
+            ))
+            if status == 'completed' and rng.random() < 0.5:
+                writer.add(m['AppointmentFeedback'](
+                    appointment_id=appointment_id, rating=rng.randint(3, 5), comments='Helpful session',
+                ))
+
+        plan_id = plan['plan_base'] + index
+        writer.add(m['ExercisePlan'](
+            id=plan_id, name='Rehabilitation plan', description='Home exercise programme',
+            patient_id=patient_id, physiotherapist_id=therapist_id,
+            start_date=today - timedelta(days=60), end_date=today + timedelta(days=30),
+        ))
+        item_ids = []
+        for number, exercise_id in enumerate(rng.sample(plan['exercise_ids'], ITEMS_PER_PLAN)):
+            item_id = plan['item_base'] + index * ITEMS_PER_PLAN + number
+            item_ids.append(item_id)
+            writer.add(m['ExercisePlanItem'](
+                id=item_id, exercise_plan_id=plan_id, exercise_id=exercise_id, day_of_week=rng.randrange(7),
+            ))
+        for _ in range(plan['progress_per_patient']):
+            writer.add(m['ExerciseProgress'](
+                patient_id=patient_id, exercise_plan_item_id=rng.choice(item_ids),
+                date_completed=today - timedelta(days=rng.randrange(60)),
+                completed_repetitions=rng.randint(5, 15), completed_sets=rng.randint(1, 4),
+                difficulty_rating=rng.randint(1, 5), pain_level=rng.randint(0, 4),
+            ))
+
+        if messages:
+            conversation_id = plan['conversation_base'] + index
+            writer.add(m['Conversation'](id=conversation_id))
+            senders = [rng.choice((patient_id, therapist_id)) for _ in range(messages)]
+            message_base = plan['message_base'] + index * messages
+            for number, sender_id in enumerate(senders):
+                writer.add(m['Message'](
+                    id=message_base + number, conversation_id=conversation_id, sender_id=sender_id,
+                    content=f'Message {number + 1} about {rng.choice(REASONS).lower()}',
+                ))
+            for user_id in (patient_id, therapist_id):
+                read_up_to = messages if rng.random() < 0.7 else rng.randrange(messages)
+                unread = sum(1 for sender_id in senders[read_up_to:] if sender_id != user_id)
+                writer.add(m['ConversationMembership'](
+                    conversation_id=conversation_id, user_id=user_id, last_message_id=message_base + messages - 1,
+                    last_activity_at=now, unread_count=unread,
+                    last_read_message_id=message_base + read_up_to - 1 if read_up_to else 0,
+                ))
+
+        for _ in range(plan['notifications_per_patient']):
+            writer.add(m['Notification'](
+                recipient_id=patient_id, notification_type=rng.choice(NOTIFICATION_TYPES),
+                title='Clinic update', message='You have a new update from the clinic.',
+                is_read=rng.random() < 0.6,
+            ))
+
+        reviewed = rng.sample(plan['book_ids'], min(plan['reviews_per_patient'], len(plan['book_ids'])))
+        for book_id in reviewed:
+            writer.add(m['BookReview'](book_id=book_id, user_id=patient_id, rating=rng.randint(1, 5)))
+        if reviewed and rng.random() < 0.3:
+            writer.add(m['BookBookmark'](book_id=reviewed[0], user_id=patient_id))
+
+    writer.flush()
+    return writer.written
+
+
+def shards(count, size):
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic clinic for load testing. '
+        f'Every generated user has the password "{SYNTHETIC_PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=1000)
+        parser.add_argument('--therapists', type=int, default=20)
+        parser.add_argument('--appointments-per-patient', type=int, default=10)
+        parser.add_argument('--messages-per-conversation', type=int, default=20)
+        parser.add_argument('--progress-per-patient', type=int, default=30)
+        parser.add_argument('--notifications-per-patient', type=int, default=10)
+        parser.add_argument('--reviews-per-patient', type=int, default=2)
+        parser.add_argument('--exercises', type=int, default=100)
+        parser.add_argument('--books', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=42, help='The same seed and sizes give the same data')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Worker processes; 1 generates in this process')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--shard-size', type=int,
+                            help='Patients per worker task; by default about four tasks per worker')
+
+    def handle(self, *args, **options):
+        if options['therapists'] < 1 or options['patients'] < 1:
+            raise CommandError('Generate at least one therapist and one patient')
+        started = time.perf_counter()
+        plan = self.make_plan(options)
+        written = self.create_catalog(plan, options)
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            workers = 1
+        shard_size = options['shard_size'] or min(max(options['patients'] // (workers * 4), 100), 5000)
+        staff = shards(options['therapists'], shard_size)
+        patients = shards(options['patients'], shard_size)
+        phases = [
+            ('users', [(generate_staff, shard) for shard in staff] +
+                      [(generate_patients, shard) for shard in patients]),
+            ('activity', [(generate_activity, shard) for shard in patients]),
+        ]
+
+        if workers > 1:
+            # Children must open their own database connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                for name, tasks in phases:
+                    futures = [pool.submit(task, plan, start, stop) for task, (start, stop) in tasks]
+                    for future in futures:
+                        written.update(future.result())
+                    self.report_phase(name, written, started)
+        else:
+            for name, tasks in phases:
+                for task, (start, stop) in tasks:
+                    written.update(task(plan, start, stop))
+                self.report_phase(name, written, started)
+
+        self.finish()
+        elapsed = time.perf_counter() - started
+        total = sum(written.values())
+        for model, count in sorted(written.items()):
+            self.stdout.write(f'  {model}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+
+    def make_plan(self, options):
+        """Fixed id ranges and sizes shared with every worker"""
+        m = models()
+
+        def next_id(model):
+            return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+        therapists, patients = options['therapists'], options['patients']
+        slots = -(-patients // therapists) * options['appointments_per_patient']
+        user_base = next_id(m['User'])
+        return {
+            'seed': options['seed'],
+            'chunk_size': options['chunk_size'],
+            'today': timezone.localdate().toordinal(),
+            # Two thirds of each therapist's slots are in the past
+            'history_days': (slots // SLOTS_PER_DAY) * 2 // 3,
+            'password': make_password(SYNTHETIC_PASSWORD),
+            'therapists': therapists,
+            'appointments_per_patient': options['appointments_per_patient'],
+            'messages_per_conversation': options['messages_per_conversation'],
+            'progress_per_patient': options['progress_per_patient'],
+            'notifications_per_patient': options['notifications_per_patient'],
+            'reviews_per_patient': options['reviews_per_patient'],
+            'therapist_user_base': user_base,
+            'patient_user_base': user_base + therapists,
+            'therapist_profile_base': next_id(m['PhysiotherapistProfile']),
+            'appointment_base': next_id(m['Appointment']),
+            'plan_base': next_id(m['ExercisePlan']),
+            'item_base': next_id(m['ExercisePlanItem']),
+            'conversation_base': next_id(m['Conversation']),
+            'message_base': next_id(m['Message']),
+        }
+
+    def create_catalog(self, plan, options):
+        """Exercises and books, small enough to create before sharding"""
+        m = models()
+        rng = random.Random(f'{plan["seed"]}:catalog')
+        writer = ChunkedWriter(plan['chunk_size'])
+        exercise_categories = m['ExerciseCategory'].objects.bulk_create([
+            m['ExerciseCategory'](name=name) for name in ('Strength', 'Mobility', 'Balance', 'Stretching')
+        ])
+        exercises = m['Exercise'].objects.bulk_create([
+            m['Exercise'](
+                name=f'Synthetic exercise {number}', description='Slow and controlled movement',
+                category=rng.choice(exercise_categories), duration=rng.choice((5, 10, 15, 20)),
+                repetitions=rng.randint(5, 15), sets=rng.randint(1, 4),
+                difficulty=rng.choice(('beginner', 'intermediate', 'advanced')),
+            )
+            for number in range(max(options['exercises'], ITEMS_PER_PLAN))
+        ], batch_size=plan['chunk_size'])
+        book_categories = m['BookCategory'].objects.bulk_create([
+            m['BookCategory'](name=name) for name in ('Rehabilitation', 'Anatomy', 'Sports Medicine')
+        ])
+        books = m['Book'].objects.bulk_create([
+            m['Book'](
+                title=f'Synthetic book {number}', author=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                description='A practical guide', category=rng.choice(book_categories),
+                pages=rng.randint(80, 600),
+            )
+            for number in range(options['books'])
+        ], batch_size=plan['chunk_size'])
+        plan['exercise_ids'] = [exercise.pk for exercise in exercises]
+        plan['book_ids'] = [book.pk for book in books]
+        writer.written.update({
+            'ExerciseCategory': len(exercise_categories), 'Exercise': len(exercises),
+            'BookCategory': len(book_categories), 'Book': len(books),
+        })
+        return writer.written
+
+    def finish(self):
+        """
+        Rebuild denormalised book ratings, adherence rollups, specialization
+        tags and search indexes, realign primary key sequences and
+        invalidate cached responses, since bulk_create sends no signals
+        """
+        call_command('rebuild_book_ratings', stdout=io.StringIO())
+        call_command('rebuild_exercise_adherence', stdout=io.StringIO())
+        call_command('rebuild_specialization_tags', stdout=io.StringIO())
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        for model in models().values():
+            bump_version(model)
+        statements = connection.ops.sequence_reset_sql(no_style(), list(models().values()))
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+    def report_phase(self, name, written, started):
+        self.stdout.write(
+            f'Finished {name}: {sum(written.values())} rows after {time.perf_counter() - started:.1f}s'
+        )
@@ -0,0 +1,67 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from appointments.models import Appointment
+from authentication.models import PatientProfile, PhysiotherapistProfile, User
+from chat.models import ConversationMembership, Message
+from exercises.models import ExerciseProgress
+from notifications.models import Notification
+
+
+class GenerateSyntheticDataTests(TestCase):
+    options = {
+        'patients': 30, 'therapists': 3, 'appointments_per_patient': 4,
+        'messages_per_conversation': 5, 'progress_per_patient': 6,
+        'notifications_per_patient': 2, 'books': 10, 'workers': 1,
+        'chunk_size': 7, 'stdout': StringIO(),
+    }
+
+    def generate(self, **options):
+        call_command('generate_synthetic_data', **{**self.options, **options})
+
+    def snapshot(self):
+        return {
+            'users': list(User.objects.order_by('pk').values_list('pk', 'username', 'first_name', 'user_type')),
+            'appointments': list(Appointment.objects.order_by('pk').values_list(
+                'pk', 'patient_id', 'physiotherapist_id', 'date', 'start_time', 'status'
+            )),
+            'progress': list(ExerciseProgress.objects.order_by('pk').values_list(
+                'patient_id', 'exercise_plan_item_id', 'date_completed', 'pain_level'
+            )),
+            'messages': list(Message.objects.order_by('pk').values_list('pk', 'sender_id', 'content')),
+        }
+
+    def test_generates_requested_volume(self):
+        self.generate()
+        self.assertEqual(User.objects.filter(user_type='patient').count(), 30)
+        self.assertEqual(PatientProfile.objects.count(), 30)
+        self.assertEqual(PhysiotherapistProfile.objects.count(), 3)
+        self.assertEqual(Appointment.objects.count(), 120)
+        self.assertEqual(ExerciseProgress.objects.count(), 180)
+        self.assertEqual(Message.objects.count(), 150)
+        self.assertEqual(Notification.objects.count(), 60)
+        self.assertTrue(User.objects.first().check_password('password123'))
+
+    def test_therapists_are_never_double_booked(self):
+        self.generate()
+        clashes = Appointment.objects.values('physiotherapist', 'date', 'start_time').annotate(
+            count=Count('id')
+        ).filter(count__gt=1)
+        self.assertFalse(clashes.exists())
+
+    def test_chat_memberships_match_messages(self):
+        self.generate()
+        for membership in ConversationMembership.objects.all():
+            messages = Message.objects.filter(conversation_id=membership.conversation_id)
+            self.assertEqual(membership.last_message_id, messages.order_by('-id').first().pk)
+            self.assertEqual(membership.unread_count, membership.count_unread())
+
+    def test_same_seed_gives_same_data_regardless_of_sharding(self):
+        self.generate(shard_size=7)
+        first = self.snapshot()
+        for model in (User, Appointment, ExerciseProgress, Message):
+            model.objects.all().delete()
+        self.generate(shard_size=30)
+        self.assertEqual(self.snapshot(), first)
+        call_command('rebuild_book_ratings', '--check', stdout=StringIO())
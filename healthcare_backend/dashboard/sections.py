@@ -0,0 +1,157 @@
+"""
+Sections of the physiotherapist dashboard.
+
+The dashboard page used to be put together from /appointments/upcoming/,
+/chat/conversations/, /exercise-progress/ and /users/, each with its own
+authentication and nested serializers. PhysioDashboard builds every
+section for one response instead. The patients and their adherence are
+fetched once and shared by the sections that show them, so a cold
+dashboard costs a fixed number of queries however many patients,
+appointments or messages there are.
+
+Each section is cached per user for DASHBOARD_CACHE_SECONDS in the shared
+cache (see healthcare_backend.caches). Writes that change a section delete
+it for the users who see it, see dashboard.signals. Without a shared
+cache, other processes would keep serving sections a write had dropped,
+so every request builds them.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.functional import cached_property
+from appointments.models import Appointment
+from appointments.serializers import AppointmentSerializer
+from authentication.models import User
+from chat.models import ConversationMembership
+from chat.serializers import ConversationInboxSerializer
+from exercises.adherence import adherence_rates
+from exercises.models import ExerciseAdherenceSummary
+from healthcare_backend.caches import get_shared_cache
+
+SECTIONS = ['stats', 'upcoming_sessions', 'recent_messages', 'patients']
+
+UPCOMING_STATUSES = ['scheduled', 'confirmed']
+UPCOMING_SESSIONS = 5
+RECENT_CONVERSATIONS = 5
+ADHERENCE_WEEKS = 4
+
+
+def get_cache_seconds():
+    return getattr(settings, 'DASHBOARD_CACHE_SECONDS', 30)
+
+
+def section_key(user_id, section):
+    return f'dashboard:{user_id}:{section}'
+
+
+def invalidate(user_ids, *sections):
+    """Drop cached ``sections`` (default all) of the users' dashboards"""
+    cache = get_shared_cache()
+    keys = [section_key(user_id, section) for user_id in user_ids for section in sections or SECTIONS]
+    if cache is None or not keys:
+        return
+    cache.delete_many(keys)
+    # Again once the write is visible to other connections, so a section
+    # built from the old rows in the meantime is not kept
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class PhysioDashboard:
+    def __init__(self, request, today):
+        self.request = request
+        self.user = request.user
+        self.today = today
+
+    def get_sections(self):
+        cache = get_shared_cache()
+        if cache is None:
+            return {section: getattr(self, f'build_{section}')() for section in SECTIONS}
+        keys = {section: section_key(self.user.pk, section) for section in SECTIONS}
+        cached = cache.get_many(keys.values())
+        sections = {}
+        missing = {}
+        for section, key in keys.items():
+            if key in cached:
+                sections[section] = cached[key]
+            else:
+                sections[section] = missing[key] = getattr(self, f'build_{section}')()
+        if missing:
+            cache.set_many(missing, get_cache_seconds())
+        return sections
+
+    @cached_property
+    def upcoming(self):
+        return Appointment.objects.filter(
+            physiotherapist=self.user, date__gte=self.today, status__in=UPCOMING_STATUSES,
+        ).order_by('date', 'start_time')
+
+    @cached_property
+    def patients(self):
+        """
+        Patients with an active plan from this physiotherapist, with their
+        streaks and recent adherence rate, shared by stats and patients
+        """
+        patients = list(
+            User.objects.filter(exercise_plans__physiotherapist=self.user, exercise_plans__is_active=True)
+            .distinct().order_by('first_name', 'last_name', 'pk')
+            .only('pk', 'username', 'first_name', 'last_name')
+        )
+        ids = [patient.pk for patient in patients]
+        summaries = ExerciseAdherenceSummary.objects.in_bulk(ids)
+        rates = adherence_rates(ids, self.today, weeks=ADHERENCE_WEEKS)
+        rows = []
+        for patient in patients:
+            summary = summaries.get(patient.pk) or ExerciseAdherenceSummary()
+            rows.append({
+                'id': patient.pk,
+                'username': patient.username,
+                'name': patient.get_full_name() or patient.username,
+                'adherence_rate': rates[patient.pk],
+                'current_streak': summary.current_streak,
+                'longest_streak': summary.longest_streak,
+                'last_active_date': summary.last_active_date,
+            })
+        return rows
+
+    def build_stats(self):
+        counts = Appointment.objects.filter(physiotherapist=self.user, date__gte=self.today).aggregate(
+            upcoming_sessions=Count('id', filter=Q(status__in=UPCOMING_STATUSES)),
+            sessions_today=Count('id', filter=Q(date=self.today, status__in=[*UPCOMING_STATUSES, 'completed'])),
+            completed_today=Count('id', filter=Q(date=self.today, status='completed')),
+        )
+        rates = [row['adherence_rate'] for row in self.patients if row['adherence_rate'] is not None]
+        next_appointment = self.upcoming.values(
+            'id', 'date', 'start_time', 'patient__first_name', 'patient__last_name', 'patient__username'
+        ).first()
+        return {
+            'active_patients': len(self.patients),
+            **counts,
+            'average_adherence': round(sum(rates) / len(rates), 1) if rates else None,
+            'next_appointment': next_appointment and {
+                'id': next_appointment['id'],
+                'date': next_appointment['date'],
+                'start_time': next_appointment['start_time'],
+                'patient_name': (
+                    f"{next_appointment['patient__first_name']} {next_appointment['patient__last_name']}".strip()
+                    or next_appointment['patient__username']
+                ),
+            },
+        }
+
+    def build_upcoming_sessions(self):
+        appointments = self.upcoming.select_related('patient', 'physiotherapist')[:UPCOMING_SESSIONS]
+        return AppointmentSerializer(appointments, many=True, context={'request': self.request}).data
+
+    def build_recent_messages(self):
+        # The same read model and prefetches as the chat inbox
+        memberships = (
+            ConversationMembership.objects
+            .filter(user=self.user, last_message__isnull=False)
+            .select_related('conversation', 'last_message__sender')
+            .prefetch_related('conversation__participants', 'last_message__attachments')
+            .order_by('-last_activity_at', '-id')[:RECENT_CONVERSATIONS]
+        )
+        return ConversationInboxSerializer(memberships, many=True, context={'request': self.request}).data
+
+    def build_patients(self):
+        return self.patients
@@ -0,0 +1,65 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+from appointments.models import Appointment
+from chat.models import Conversation, ConversationMembership, Message
+from exercises.models import ExercisePlan, ExerciseProgress
+from .sections import invalidate
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointments(sender, instance, **kwargs):
+    invalidate([instance.physiotherapist_id], 'stats', 'upcoming_sessions')
+
+
+@receiver(post_save, sender=Message)
+def invalidate_messages(sender, instance, created, **kwargs):
+    if created:
+        participant_ids = ConversationMembership.objects.filter(
+            conversation_id=instance.conversation_id
+        ).values_list('user_id', flat=True)
+        invalidate(participant_ids, 'recent_messages')
+
+
+@receiver(post_save, sender=ConversationMembership)
+@receiver(post_delete, sender=ConversationMembership)
+def invalidate_memberships(sender, instance, **kwargs):
+    invalidate([instance.user_id], 'recent_messages')
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def invalidate_participants(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove'):
+        invalidate([instance.pk] if reverse else pk_set, 'recent_messages')
+    elif action == 'pre_clear':
+        # clear() does not say whom it removes, so look before it does
+        invalidate([instance.pk] if reverse else list(instance.participants.values_list('pk', flat=True)),
+                   'recent_messages')
+
+
+@receiver(post_save, sender=ExercisePlan)
+@receiver(post_delete, sender=ExercisePlan)
+def invalidate_plans(sender, instance, **kwargs):
+    invalidate([instance.physiotherapist_id], 'stats', 'patients')
+
+
+def invalidate_patient_progress(patient_id):
+    # Adherence shows on the dashboards of everyone with a plan for the patient
+    physiotherapist_ids = ExercisePlan.objects.filter(
+        patient_id=patient_id, is_active=True
+    ).values_list('physiotherapist_id', flat=True).distinct()
+    invalidate(physiotherapist_ids, 'stats', 'patients')
+
+
+@receiver(post_save, sender=ExerciseProgress)
+def invalidate_progress(sender, instance, **kwargs):
+    invalidate_patient_progress(instance.patient_id)
+
+
+@receiver(post_delete, sender=ExerciseProgress)
+def invalidate_deleted_progress(sender, instance, **kwargs):
+    # A deferred patient cannot be loaded once the row is gone, so use the
+    # stored day exercises.signals records before the delete
+    patient_id, _ = getattr(instance, '_stored_day', (None, None))
+    if patient_id is not None:
+        invalidate_patient_progress(patient_id)
@@ -0,0 +1,128 @@
+from datetime import time, timedelta
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from appointments.models import Appointment
+from authentication.models import User
+from chat.models import Conversation, Message
+from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem, ExerciseProgress
+
+URL = '/api/dashboard/physio/'
+
+
+# LocMemCache is shared by everything in the test process
+@override_settings(SHARED_CACHE_ALIAS='default')
+class PhysioDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.therapist = User.objects.create_user(
+            username='therapist', password='pw', user_type='physiotherapist'
+        )
+        category = ExerciseCategory.objects.create(name='Knee')
+        self.exercise = Exercise.objects.create(name='Squat', description='Squat', category=category, duration=5)
+        self.patients = [self.create_patient() for _ in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.therapist)
+
+    def create_patient(self):
+        count = User.objects.filter(user_type='patient').count()
+        patient = User.objects.create_user(
+            username=f'patient{count}', password='pw', first_name='Pat', last_name=f'Number{count}'
+        )
+        plan = ExercisePlan.objects.create(
+            name='Rehab', description='Rehab', patient=patient, physiotherapist=self.therapist,
+            start_date=self.today - timedelta(days=30), end_date=self.today + timedelta(days=30),
+        )
+        item = ExercisePlanItem.objects.create(
+            exercise_plan=plan, exercise=self.exercise, day_of_week=self.today.weekday()
+        )
+        ExerciseProgress.objects.create(
+            patient=patient, exercise_plan_item=item, date_completed=self.today,
+            completed_repetitions=10, completed_sets=3, difficulty_rating=3, pain_level=1,
+        )
+        Appointment.objects.create(
+            patient=patient, physiotherapist=self.therapist, date=self.today + timedelta(days=count + 1),
+            start_time=time(9), end_time=time(10), reason='Follow-up',
+        )
+        conversation = Conversation.objects.create()
+        conversation.participants.set([self.therapist, patient])
+        Message.objects.create(conversation=conversation, sender=patient, content=f'Hello from {count}')
+        return patient
+
+    def get(self):
+        response = self.client.get(URL)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_returns_every_section(self):
+        data = self.get()
+        self.assertEqual(data['stats']['active_patients'], 2)
+        self.assertEqual(data['stats']['upcoming_sessions'], 2)
+        self.assertEqual(data['stats']['next_appointment']['patient_name'], 'Pat Number0')
+        self.assertEqual([session['patient']['username'] for session in data['upcoming_sessions']],
+                         ['patient0', 'patient1'])
+        self.assertEqual(len(data['recent_messages']), 2)
+        self.assertEqual(data['recent_messages'][0]['unread_count'], 1)
+        self.assertEqual([patient['current_streak'] for patient in data['patients']], [1, 1])
+
+    def test_query_count_does_not_grow_with_the_caseload(self):
+        with CaptureQueriesContext(connection) as small:
+            self.get()
+        for _ in range(4):
+            self.create_patient()
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            data = self.get()
+        self.assertEqual(len(data['patients']), 6)
+        self.assertEqual(len(large), len(small))
+
+    def test_cached_sections_need_no_queries(self):
+        self.get()
+        with self.assertNumQueries(0):
+            self.get()
+
+    @override_settings(SHARED_CACHE_ALIAS=None)
+    def test_sections_are_not_cached_without_a_shared_cache(self):
+        self.get()
+        with CaptureQueriesContext(connection) as queries:
+            self.get()
+        self.assertTrue(queries)
+        # Renaming through update() sends no signal, and is still seen
+        User.objects.filter(pk=self.patients[1].pk).update(first_name='Renamed')
+        self.assertEqual(self.get()['patients'][1]['name'], 'Renamed Number1')
+
+    def test_writes_refresh_only_the_sections_they_change(self):
+        self.get()
+        Appointment.objects.create(
+            patient=self.patients[0], physiotherapist=self.therapist, date=self.today,
+            start_time=time(15), end_time=time(16), reason='Today',
+        )
+        # Renaming through update() sends no signal, so cached sections keep the old name
+        User.objects.filter(pk=self.patients[1].pk).update(first_name='Renamed')
+        data = self.get()
+        self.assertEqual(data['stats']['sessions_today'], 1)
+        self.assertEqual(data['upcoming_sessions'][0]['reason'], 'Today')
+        self.assertEqual(data['patients'][1]['name'], 'Pat Number1')
+
+        message = Message.objects.create(
+            conversation=Conversation.objects.filter(participants=self.patients[1]).get(),
+            sender=self.patients[1], content='Another one',
+        )
+        self.assertEqual(self.get()['recent_messages'][0]['last_message']['id'], message.id)
+
+        # Reading the conversation clears its unread count on the dashboard
+        self.client.get(f'/api/chat/conversations/{message.conversation_id}/messages/')
+        self.assertEqual(self.get()['recent_messages'][0]['unread_count'], 0)
+
+        ExerciseProgress.objects.filter(patient=self.patients[0]).get().delete()
+        data = self.get()
+        self.assertEqual(data['patients'][0]['current_streak'], 0)
+        self.assertEqual(data['patients'][1]['name'], 'Renamed Number1')
+
+    def test_only_physiotherapists_have_a_dashboard(self):
+        self.client.force_authenticate(user=self.patients[0])
+        self.assertEqual(self.client.get(URL).status_code, 403)
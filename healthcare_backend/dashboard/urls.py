@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import PhysioDashboardView
+
+urlpatterns = [
+    path('physio/', PhysioDashboardView.as_view(), name='physio-dashboard'),
+]
@@ -0,0 +1,25 @@
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .sections import PhysioDashboard
+
+
+class PhysioDashboardView(APIView):
+    """
+    Everything the physiotherapist dashboard shows, in one response:
+    stat cards, upcoming sessions, recent conversations and the adherence
+    of the physiotherapist's patients.
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = {'get': 10}
+    
+    def get(self, request):
+        if request.user.user_type != 'physiotherapist':
+            return Response(
+                {'error': 'Only physiotherapists have a dashboard'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        dashboard = PhysioDashboard(request, timezone.localdate())
+        return Response(dashboard.get_sections())
@@ -0,0 +1,227 @@
+"""
+Exercise adherence and streaks from per-day rollups.
+
+Recording progress used to leave nothing to read adherence from except
+ExerciseProgress joined to plan items and plans over a patient's whole
+history. Signal handlers instead keep two rollups current as progress is
+created, moved or deleted (see exercises.signals):
+
+* ExerciseAdherenceDay, the number of exercises a patient recorded per day
+* ExerciseAdherenceSummary, running totals and the current and longest
+  streak of consecutive days with at least one recorded exercise
+
+adherence_report() reads the summary and the day rows of the weeks asked
+for, so its cost does not grow with the patient's history. Writes that
+bypass signals, such as bulk_create(), need
+``manage.py rebuild_exercise_adherence`` afterwards.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F
+from .models import ExerciseAdherenceDay, ExerciseAdherenceSummary, ExercisePlanItem, ExerciseProgress
+
+SUMMARY_FIELDS = ['total_completed', 'active_days', 'current_streak', 'longest_streak', 'last_active_date']
+
+
+def record_progress(patient_id, day, delta):
+    """Count ``delta`` more (or fewer) exercises for a patient on ``day``"""
+    # Progress created with a string or datetime date_completed keeps it
+    # until it is reloaded
+    day = ExerciseProgress._meta.get_field('date_completed').to_python(day)
+    with transaction.atomic():
+        summaries = ExerciseAdherenceSummary.objects.select_for_update()
+        if delta < 0:
+            # Progress deleted along with its patient must not recreate the
+            # summary the same cascade deletes
+            summary = summaries.filter(patient_id=patient_id).first()
+            if summary is None:
+                return
+        else:
+            summary, _ = summaries.get_or_create(patient_id=patient_id)
+        rows = ExerciseAdherenceDay.objects.filter(patient_id=patient_id, date=day)
+        row = rows.first()
+
+        if row is None:
+            if delta <= 0:
+                return
+            ExerciseAdherenceDay.objects.create(patient_id=patient_id, date=day, completed=delta)
+            summary.total_completed += delta
+            if summary.last_active_date is None or day > summary.last_active_date:
+                extend_streak(summary, day)
+                summary.save()
+                return
+            # A day filled in behind the latest one can join two runs
+            summary.save()
+            recompute_summary(patient_id)
+            return
+
+        completed = row.completed + delta
+        summary.total_completed = max(summary.total_completed + delta, 0)
+        summary.save(update_fields=['total_completed', 'updated_at'])
+        if completed > 0:
+            rows.update(completed=F('completed') + delta)
+            return
+        # The day is no longer active, which can split a run
+        rows.delete()
+        recompute_summary(patient_id)
+
+
+def extend_streak(summary, day):
+    """Add an active day after the summary's last one"""
+    if summary.last_active_date is not None and day == summary.last_active_date + timedelta(days=1):
+        summary.current_streak += 1
+    else:
+        summary.current_streak = 1
+    summary.longest_streak = max(summary.longest_streak, summary.current_streak)
+    summary.last_active_date = day
+    summary.active_days += 1
+
+
+def summarize_days(days):
+    """Streaks and totals from (date, completed) pairs in date order"""
+    summary = ExerciseAdherenceSummary()
+    for day, completed in days:
+        extend_streak(summary, day)
+        summary.total_completed += completed
+    return summary
+
+
+def recompute_summary(patient_id):
+    """Rebuild a patient's summary from their day rows"""
+    days = ExerciseAdherenceDay.objects.filter(patient_id=patient_id).order_by('date')
+    computed = summarize_days(days.values_list('date', 'completed'))
+    ExerciseAdherenceSummary.objects.update_or_create(patient_id=patient_id, defaults={
+        field: getattr(computed, field) for field in SUMMARY_FIELDS
+    })
+
+
+def rebuild(patient_ids=None, batch_size=1000):
+    """
+    Recount the rollups of ``patient_ids``, or of every patient, from
+    ExerciseProgress; return the number of patients rebuilt.
+    """
+    progress = ExerciseProgress.objects.order_by()
+    days = ExerciseAdherenceDay.objects.all()
+    summaries = ExerciseAdherenceSummary.objects.all()
+    if patient_ids is not None:
+        progress = progress.filter(patient_id__in=patient_ids)
+        days = days.filter(patient_id__in=patient_ids)
+        summaries = summaries.filter(patient_id__in=patient_ids)
+
+    counts = progress.values_list('patient_id', 'date_completed').annotate(completed=Count('id'))
+    by_patient = {}
+    for patient_id, day, completed in counts.order_by('patient_id', 'date_completed').iterator():
+        by_patient.setdefault(patient_id, []).append((day, completed))
+
+    with transaction.atomic():
+        days.delete()
+        summaries.delete()
+        ExerciseAdherenceDay.objects.bulk_create([
+            ExerciseAdherenceDay(patient_id=patient_id, date=day, completed=completed)
+            for patient_id, patient_days in by_patient.items()
+            for day, completed in patient_days
+        ], batch_size=batch_size)
+        new_summaries = []
+        for patient_id, patient_days in by_patient.items():
+            summary = summarize_days(patient_days)
+            summary.patient_id = patient_id
+            new_summaries.append(summary)
+        ExerciseAdherenceSummary.objects.bulk_create(new_summaries, batch_size=batch_size)
+    return len(by_patient)
+
+
+def scheduled_per_day(patient_ids, start, end):
+    """
+    Number of exercises scheduled on each day from start to end by active
+    plans, as a Counter of days per patient id
+    """
+    items = ExercisePlanItem.objects.filter(
+        exercise_plan__patient_id__in=patient_ids, exercise_plan__is_active=True,
+        exercise_plan__start_date__lte=end, exercise_plan__end_date__gte=start,
+    ).values_list(
+        'exercise_plan__patient_id', 'day_of_week', 'exercise_plan__start_date', 'exercise_plan__end_date'
+    )
+    scheduled = defaultdict(Counter)
+    for patient_id, day_of_week, plan_start, plan_end in items:
+        day = max(start, plan_start)
+        day += timedelta(days=(day_of_week - day.weekday()) % 7)
+        while day <= min(end, plan_end):
+            scheduled[patient_id][day] += 1
+            day += timedelta(days=7)
+    return scheduled
+
+
+def completion_rate(completed, scheduled):
+    return round(100 * completed / scheduled, 1) if scheduled else None
+
+
+def window_start(today, weeks):
+    """The Monday ``weeks`` weeks back, counting the week of ``today``"""
+    return today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+
+
+def adherence_rates(patient_ids, today, weeks=4):
+    """
+    Adherence rates of several patients over the last ``weeks`` weeks, in
+    two queries, as counted by adherence_report()
+    """
+    start = window_start(today, weeks)
+    scheduled = scheduled_per_day(patient_ids, start, today)
+    completed = {
+        (patient_id, day): count for patient_id, day, count in ExerciseAdherenceDay.objects.filter(
+            patient_id__in=patient_ids, date__gte=start, date__lte=today,
+        ).values_list('patient_id', 'date', 'completed')
+    }
+    return {
+        patient_id: completion_rate(
+            sum(min(completed.get((patient_id, day), 0), count) for day, count in scheduled[patient_id].items()),
+            sum(scheduled[patient_id].values()),
+        )
+        for patient_id in patient_ids
+    }
+
+
+def adherence_report(patient, today, weeks=4):
+    """
+    Adherence over the last ``weeks`` weeks up to ``today``, week by week,
+    with the patient's streaks. A day counts at most the exercises that
+    were scheduled on it, so extra sessions do not lift the rate above 100%.
+    """
+    start = window_start(today, weeks)
+    scheduled = scheduled_per_day([patient.pk], start, today)[patient.pk]
+    completed = dict(
+        ExerciseAdherenceDay.objects.filter(patient=patient, date__gte=start, date__lte=today)
+        .values_list('date', 'completed')
+    )
+    summary = ExerciseAdherenceSummary.objects.filter(patient=patient).first() or ExerciseAdherenceSummary()
+
+    weekly = []
+    total_scheduled = total_on_schedule = 0
+    for week in range(weeks):
+        week_start = start + timedelta(days=7 * week)
+        week_days = [week_start + timedelta(days=offset) for offset in range(7)]
+        week_days = [day for day in week_days if day <= today]
+        week_scheduled = sum(scheduled[day] for day in week_days)
+        on_schedule = sum(min(completed.get(day, 0), scheduled[day]) for day in week_days)
+        weekly.append({
+            'week_start': week_start,
+            'scheduled': week_scheduled,
+            'completed': sum(completed.get(day, 0) for day in week_days),
+            'completion_rate': completion_rate(on_schedule, week_scheduled),
+        })
+        total_scheduled += week_scheduled
+        total_on_schedule += on_schedule
+
+    # A streak is still current until a whole day passes without exercise
+    last_active = summary.last_active_date
+    current_streak = summary.current_streak if last_active and last_active >= today - timedelta(days=1) else 0
+    return {
+        'patient': patient.pk,
+        'adherence_rate': completion_rate(total_on_schedule, total_scheduled),
+        'current_streak': current_streak,
+        'longest_streak': summary.longest_streak,
+        'last_active_date': last_active,
+        'total_completed': summary.total_completed,
+        'weekly': weekly,
+    }
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from exercises.adherence import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the exercise adherence and streak rollups from ExerciseProgress, e.g. after '
+        'progress was written with bulk_create() or QuerySet.update()'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--patient', type=int, action='append', dest='patients', metavar='USER_ID',
+            help='Only rebuild the rollups of this patient; may be repeated',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rollup rows written per bulk insert',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        patients = rebuild(options['patients'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt adherence rollups for {patients} patient(s) in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exercises', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='exerciseplan',
+            index=models.Index(fields=['patient', 'is_active'], name='exercises_plan_patient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseplan',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['start_date', 'end_date'], name='exercises_plan_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseprogress',
+            index=models.Index(fields=['patient', '-date_completed'], name='exercises_progress_patient_idx'),
+        ),
+    ]
@@ -47,6 +47,15 @@ class ExercisePlan(models.Model):
     
     def __str__(self):
         return f"{self.name} for {self.patient.username}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'is_active'], name='exercises_plan_patient_idx'),
+            models.Index(
+                fields=['start_date', 'end_date'], name='exercises_plan_active_idx',
+                condition=models.Q(is_active=True),
+            ),
+        ]
 
 class ExercisePlanItem(models.Model):
     exercise_plan = models.ForeignKey(ExercisePlan, on_delete=models.CASCADE, related_name='plan_items')
@@ -96,6 +105,54 @@ class ExerciseProgress(models.Model):
     def __str__(self):
         return f"Progress for {self.exercise_plan_item.exercise.name} on {self.date_completed}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored day so moves can adjust the adherence rollups.
+        # With either deferred, exercises.signals reads them before the write.
+        if not instance.get_deferred_fields() & {'patient', 'date_completed'}:
+            instance._stored_day = (instance.patient_id, instance.date_completed)
+        return instance
+    
     class Meta:
         ordering = ['-date_completed']
         verbose_name_plural = "Exercise Progress"
+        indexes = [
+            models.Index(fields=['patient', '-date_completed'], name='exercises_progress_patient_idx'),
+        ]
+
+class ExerciseAdherenceDay(models.Model):
+    """Exercises a patient recorded on one day, kept up to date by signals"""
+    patient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='adherence_days')
+    date = models.DateField()
+    completed = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.completed} exercises by {self.patient.username} on {self.date}"
+    
+    class Meta:
+        ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'date'], name='exercises_adherence_day_uniq'),
+        ]
+
+class ExerciseAdherenceSummary(models.Model):
+    """
+    Running totals and streaks of a patient's adherence days. The current
+    streak is the run of consecutive active days ending on last_active_date.
+    """
+    patient = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='adherence_summary'
+    )
+    total_completed = models.PositiveIntegerField(default=0)
+    active_days = models.PositiveIntegerField(default=0)
+    current_streak = models.PositiveIntegerField(default=0)
+    longest_streak = models.PositiveIntegerField(default=0)
+    last_active_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Adherence of {self.patient.username}"
+    
+    class Meta:
+        verbose_name_plural = "Exercise Adherence Summaries"
@@ -1,4 +1,7 @@
+from datetime import timedelta
 from rest_framework import serializers
+from django.contrib.auth import get_user_model
+from django.utils import timezone
 from .models import (
     ExerciseCategory, Exercise, ExercisePlan, 
     ExercisePlanItem, ExerciseProgress
@@ -87,4 +90,34 @@ class ExerciseProgressCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Set the patient to the current user
         validated_data['patient'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        return super().create(validated_data)
+
+class AdherenceQuerySerializer(serializers.Serializer):
+    """Query parameters of the adherence report"""
+    MAX_WEEKS = 12
+    
+    patient = serializers.PrimaryKeyRelatedField(
+        queryset=get_user_model().objects.filter(user_type='patient'), required=False
+    )
+    weeks = serializers.IntegerField(min_value=1, max_value=MAX_WEEKS, default=4)
+
+class TrendQuerySerializer(serializers.Serializer):
+    """Query parameters of the pain and difficulty trends"""
+    MAX_RANGE_DAYS = 2 * 366
+    
+    patient = serializers.PrimaryKeyRelatedField(
+        queryset=get_user_model().objects.filter(user_type='patient'), required=False
+    )
+    plan = serializers.PrimaryKeyRelatedField(queryset=ExercisePlan.objects.all(), required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='week')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    
+    def validate(self, data):
+        data.setdefault('end_date', timezone.localdate())
+        data.setdefault('start_date', data['end_date'] - timedelta(days=365))
+        if data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must not be before start date")
+        if (data['end_date'] - data['start_date']).days >= self.MAX_RANGE_DAYS:
+            raise serializers.ValidationError(f"Ask for at most {self.MAX_RANGE_DAYS} days at a time")
+        return data
@@ -0,0 +1,39 @@
+from django.db.models.signals import pre_delete, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from healthcare_backend import search
+from healthcare_backend.response_cache import connect_version_signals
+from .adherence import record_progress
+from .models import Exercise, ExerciseCategory, ExerciseProgress
+
+connect_version_signals(ExerciseCategory, Exercise)
+search.register(Exercise, ['name', 'description'], weights=[10, 1])
+
+
+@receiver(pre_save, sender=ExerciseProgress)
+@receiver(pre_delete, sender=ExerciseProgress)
+def remember_stored_day(sender, instance, **kwargs):
+    # Instances not loaded through the ORM, or loaded with the patient or
+    # date deferred, do not know their stored day
+    if instance.pk and not hasattr(instance, '_stored_day'):
+        stored = ExerciseProgress.objects.filter(pk=instance.pk).values_list('patient_id', 'date_completed').first()
+        instance._stored_day = stored or (None, None)
+
+
+@receiver(post_save, sender=ExerciseProgress)
+def update_adherence_on_save(sender, instance, created, **kwargs):
+    day = (instance.patient_id, instance.date_completed)
+    stored = None if created else getattr(instance, '_stored_day', (None, None))
+    if stored != day:
+        if stored and stored[0] is not None:
+            record_progress(*stored, -1)
+        record_progress(*day, 1)
+    instance._stored_day = day
+
+
+@receiver(post_delete, sender=ExerciseProgress)
+def update_adherence_on_delete(sender, instance, **kwargs):
+    # Set by remember_stored_day, as deferred fields cannot be read once
+    # the row is gone
+    patient_id, day = getattr(instance, '_stored_day', (None, None))
+    if patient_id is not None:
+        record_progress(patient_id, day, -1)
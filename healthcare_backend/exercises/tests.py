@@ -1,3 +1,252 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from authentication.models import User
+from .adherence import adherence_report
+from .models import (
+    Exercise, ExerciseAdherenceDay, ExerciseAdherenceSummary, ExerciseCategory,
+    ExercisePlan, ExercisePlanItem, ExerciseProgress,
+)
 
-# Create your tests here.
+# A Wednesday
+TODAY = date(2030, 1, 16)
+
+
+class AdherenceTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='pw')
+        self.therapist = User.objects.create_user(
+            username='therapist', password='pw', user_type='physiotherapist'
+        )
+        category = ExerciseCategory.objects.create(name='Knee')
+        self.exercise = Exercise.objects.create(name='Squat', description='Squat', category=category, duration=5)
+        self.plan = ExercisePlan.objects.create(
+            name='Rehab', description='Knee rehab', patient=self.patient, physiotherapist=self.therapist,
+            start_date=date(2029, 12, 1), end_date=date(2030, 12, 31),
+        )
+        # Monday, Wednesday and Friday
+        self.items = [
+            ExercisePlanItem.objects.create(exercise_plan=self.plan, exercise=self.exercise, day_of_week=day)
+            for day in (0, 2, 4)
+        ]
+        self.client = APIClient()
+
+    def record(self, day, item=None):
+        return ExerciseProgress.objects.create(
+            patient=self.patient, exercise_plan_item=item or self.items[0], date_completed=day,
+            completed_repetitions=10, completed_sets=3, difficulty_rating=3, pain_level=1,
+        )
+
+    def summary(self):
+        return ExerciseAdherenceSummary.objects.values(
+            'total_completed', 'active_days', 'current_streak', 'longest_streak', 'last_active_date'
+        ).get(patient=self.patient)
+
+    def test_progress_recorded_through_the_api_updates_the_rollups(self):
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.post('/api/exercise-progress/', {
+            'exercise_plan_item': self.items[0].pk, 'date_completed': TODAY,
+            'completed_repetitions': 10, 'completed_sets': 3, 'difficulty_rating': 3, 'pain_level': 1,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ExerciseAdherenceDay.objects.get(patient=self.patient).date, TODAY)
+        self.assertEqual(self.summary()['current_streak'], 1)
+
+    def test_streaks_follow_added_moved_and_deleted_progress(self):
+        for offset in (5, 4, 2, 1, 1):
+            self.record(TODAY - timedelta(days=offset))
+        self.assertEqual(self.summary(), {
+            'total_completed': 5, 'active_days': 4, 'current_streak': 2, 'longest_streak': 2,
+            'last_active_date': TODAY - timedelta(days=1),
+        })
+
+        # Filling the gap joins both runs
+        gap = self.record(TODAY - timedelta(days=3))
+        self.assertEqual(self.summary()['current_streak'], 5)
+
+        # Moving it away splits them again
+        gap.date_completed = TODAY - timedelta(days=10)
+        gap.save()
+        summary = self.summary()
+        self.assertEqual((summary['current_streak'], summary['longest_streak'], summary['active_days']), (2, 2, 5))
+
+        gap.delete()
+        self.assertEqual(self.summary()['total_completed'], 5)
+        self.assertFalse(ExerciseAdherenceDay.objects.filter(date=TODAY - timedelta(days=10)).exists())
+
+    def test_progress_created_with_string_dates(self):
+        self.record('2030-01-14')
+        progress = self.record('2030-01-15')
+        self.assertEqual(self.summary(), {
+            'total_completed': 2, 'active_days': 2, 'current_streak': 2, 'longest_streak': 2,
+            'last_active_date': date(2030, 1, 15),
+        })
+        progress.delete()
+        self.assertEqual(self.summary()['last_active_date'], date(2030, 1, 14))
+
+    def test_progress_loaded_with_deferred_fields(self):
+        self.record(TODAY - timedelta(days=1))
+        progress = self.record(TODAY)
+
+        deferred = ExerciseProgress.objects.only('id').get(pk=progress.pk)
+        deferred.date_completed = TODAY + timedelta(days=1)
+        deferred.save()
+        self.assertEqual(self.summary()['last_active_date'], TODAY + timedelta(days=1))
+
+        ExerciseProgress.objects.only('id').get(pk=progress.pk).delete()
+        self.assertEqual(self.summary(), {
+            'total_completed': 1, 'active_days': 1, 'current_streak': 1, 'longest_streak': 1,
+            'last_active_date': TODAY - timedelta(days=1),
+        })
+
+    def test_deleting_a_patient_with_progress(self):
+        self.record(TODAY - timedelta(days=1))
+        self.record(TODAY)
+        self.patient.delete()
+        self.assertFalse(ExerciseProgress.objects.exists())
+        self.assertFalse(ExerciseAdherenceSummary.objects.exists())
+        self.assertFalse(ExerciseAdherenceDay.objects.exists())
+
+    def test_report_caps_days_at_their_schedule(self):
+        monday = TODAY - timedelta(days=2)
+        # A second exercise on Monday and one on Sunday were not scheduled
+        self.record(monday)
+        self.record(monday, self.items[1])
+        self.record(monday - timedelta(days=1))
+        last_friday = monday - timedelta(days=3)
+        self.record(last_friday)
+
+        report = adherence_report(self.patient, TODAY, weeks=2)
+        self.assertEqual(report['weekly'], [
+            {'week_start': monday - timedelta(days=7), 'scheduled': 3, 'completed': 2, 'completion_rate': 33.3},
+            {'week_start': monday, 'scheduled': 2, 'completed': 2, 'completion_rate': 50.0},
+        ])
+        self.assertEqual(report['adherence_rate'], 40.0)
+        self.assertEqual(report['total_completed'], 4)
+        # Nothing recorded yesterday or today, so the streak is over
+        self.assertEqual((report['current_streak'], report['longest_streak']), (0, 2))
+
+    def test_report_does_not_read_the_progress_history(self):
+        for offset in range(60):
+            self.record(TODAY - timedelta(days=offset))
+        # Plan items, day rows and the summary
+        with self.assertNumQueries(3):
+            report = adherence_report(self.patient, TODAY, weeks=12)
+        self.assertEqual(report['current_streak'], 60)
+
+    def test_rebuild_command_matches_the_incremental_rollups(self):
+        for offset in (9, 8, 6, 3, 3, 2):
+            self.record(TODAY - timedelta(days=offset))
+        incremental = self.summary()
+        ExerciseProgress.objects.bulk_create([
+            ExerciseProgress(
+                patient=self.patient, exercise_plan_item=self.items[0], date_completed=TODAY - timedelta(days=7),
+                completed_repetitions=10, completed_sets=3, difficulty_rating=3, pain_level=1,
+            )
+        ])
+        ExerciseAdherenceSummary.objects.all().delete()
+
+        call_command('rebuild_exercise_adherence', stdout=StringIO())
+        self.assertEqual(self.summary(), {
+            **incremental, 'total_completed': 7, 'active_days': 6, 'longest_streak': 4,
+        })
+        self.assertEqual(ExerciseAdherenceDay.objects.get(date=TODAY - timedelta(days=3)).completed, 2)
+
+    def test_adherence_endpoint_permissions(self):
+        today = timezone.localdate()
+        self.record(today)
+        url = '/api/exercise-progress/adherence/'
+
+        self.client.force_authenticate(user=self.patient)
+        response = self.client.get(url, {'weeks': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_streak'], 1)
+        self.assertEqual(len(response.data['weekly']), 2)
+        other = User.objects.create_user(username='other', password='pw')
+        self.assertEqual(self.client.get(url, {'patient': other.pk}).status_code, 403)
+
+        self.client.force_authenticate(user=self.therapist)
+        self.assertEqual(self.client.get(url).status_code, 400)
+        self.assertEqual(self.client.get(url, {'patient': self.patient.pk}).data['total_completed'], 1)
+        self.assertEqual(self.client.get(url, {'patient': other.pk}).status_code, 403)
+
+
+class TrendTests(TestCase):
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='pw')
+        self.therapist = User.objects.create_user(
+            username='therapist', password='pw', user_type='physiotherapist'
+        )
+        category = ExerciseCategory.objects.create(name='Knee')
+        exercise = Exercise.objects.create(name='Squat', description='Squat', category=category, duration=5)
+        self.plans = [
+            ExercisePlan.objects.create(
+                name=name, description=name, patient=self.patient, physiotherapist=self.therapist,
+                start_date=date(2029, 12, 1), end_date=date(2030, 12, 31),
+            )
+            for name in ('Knee', 'Hip')
+        ]
+        self.items = [
+            ExercisePlanItem.objects.create(exercise_plan=plan, exercise=exercise, day_of_week=0)
+            for plan in self.plans
+        ]
+        # (day, plan item, pain, difficulty); TODAY is a Wednesday
+        for offset, item, pain, difficulty in [
+            (0, 0, 1, 2), (0, 1, 3, 4), (2, 0, 2, 3), (9, 0, 4, 5), (40, 1, 0, 1),
+        ]:
+            ExerciseProgress.objects.create(
+                patient=self.patient, exercise_plan_item=self.items[item],
+                date_completed=TODAY - timedelta(days=offset), completed_repetitions=10,
+                completed_sets=3, difficulty_rating=difficulty, pain_level=pain,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.patient)
+
+    def trends(self, **params):
+        params = {'start_date': TODAY - timedelta(days=60), 'end_date': TODAY, **params}
+        response = self.client.get('/api/exercise-progress/trends/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_weekly_buckets_start_on_monday(self):
+        series = self.trends()['series']
+        self.assertEqual([point['period'] for point in series], [
+            date(2029, 12, 3), date(2030, 1, 7), date(2030, 1, 14),
+        ])
+        self.assertEqual(series[-1], {
+            'period': date(2030, 1, 14), 'entries': 3, 'pain_mean': 2.0, 'pain_max': 3,
+            'difficulty_mean': 3.0, 'difficulty_max': 4,
+        })
+
+    def test_day_and_month_buckets_and_plan_filter(self):
+        days = self.trends(bucket='day', plan=self.plans[0].pk)['series']
+        self.assertEqual(
+            [(point['period'], point['entries'], point['pain_max']) for point in days],
+            [(TODAY - timedelta(days=9), 1, 4), (TODAY - timedelta(days=2), 1, 2), (TODAY, 1, 1)],
+        )
+        months = self.trends(bucket='month')['series']
+        self.assertEqual([(point['period'], point['entries']) for point in months], [
+            (date(2029, 12, 1), 1), (date(2030, 1, 1), 4),
+        ])
+
+    def test_trends_are_one_grouped_query(self):
+        # Patients skip the plan check, so only the grouped query runs
+        with self.assertNumQueries(1):
+            self.trends(bucket='day')
+
+    def test_rejects_bad_parameters_and_other_patients_plans(self):
+        url = '/api/exercise-progress/trends/'
+        self.assertEqual(self.client.get(url, {'bucket': 'hour'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start_date': date(2020, 1, 1)}).status_code, 400)
+
+        other = User.objects.create_user(username='other', password='pw')
+        plan = ExercisePlan.objects.create(
+            name='Other', description='Other', patient=other, physiotherapist=self.therapist,
+            start_date=TODAY, end_date=TODAY,
+        )
+        self.assertEqual(self.client.get(url, {'plan': plan.pk}).status_code, 400)
+        self.client.force_authenticate(user=self.therapist)
+        self.assertEqual(self.client.get(url, {'patient': self.patient.pk}).status_code, 200)
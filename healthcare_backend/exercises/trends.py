@@ -0,0 +1,39 @@
+"""
+Pain and difficulty trends of recorded exercise progress.
+
+Charting them from the progress list means paging through every row with
+its nested exercise. progress_trends() groups the rows in the database
+instead, one row per day, week (starting on Monday) or month that has
+progress, so a year of weekly points is at most 53 small rows however
+much history the patient has. The filter runs on the (patient,
+date_completed) index.
+"""
+from django.db.models import Avg, Count, Max
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from .models import ExerciseProgress
+
+TRUNCATE = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def progress_trends(patient, start, end, bucket='week', plan=None):
+    """
+    Entries and the mean and max pain level and difficulty rating of a
+    patient's progress from start to end, per bucket. Buckets without
+    progress are left out.
+    """
+    progress = ExerciseProgress.objects.filter(patient=patient, date_completed__range=(start, end))
+    if plan is not None:
+        progress = progress.filter(exercise_plan_item__exercise_plan=plan)
+    rows = progress.order_by().annotate(
+        period=TRUNCATE[bucket]('date_completed'),
+    ).values('period').annotate(
+        entries=Count('id'),
+        pain_mean=Avg('pain_level'),
+        pain_max=Max('pain_level'),
+        difficulty_mean=Avg('difficulty_rating'),
+        difficulty_max=Max('difficulty_rating'),
+    ).order_by('period')
+    return [
+        {**row, 'pain_mean': round(row['pain_mean'], 2), 'difficulty_mean': round(row['difficulty_mean'], 2)}
+        for row in rows
+    ]
@@ -3,6 +3,7 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from healthcare_backend.prefetch import PrefetchPlanMixin, apply_prefetch_plan
 from .models import (
     ExerciseCategory, Exercise, ExercisePlan, 
     ExercisePlanItem, ExerciseProgress
@@ -19,7 +20,7 @@ class ExerciseCategoryListView(generics.ListAPIView):
     serializer_class = ExerciseCategorySerializer
     permission_classes = [IsAuthenticated]
 
-class ExerciseListView(generics.ListAPIView):
+class ExerciseListView(PrefetchPlanMixin, generics.ListAPIView):
     serializer_class = ExerciseSerializer
     permission_classes = [IsAuthenticated]
     
@@ -38,7 +39,7 @@ class ExerciseListView(generics.ListAPIView):
             
         return queryset
 
-class ExerciseDetailView(generics.RetrieveAPIView):
+class ExerciseDetailView(PrefetchPlanMixin, generics.RetrieveAPIView):
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
     permission_classes = [IsAuthenticated]
@@ -62,6 +63,7 @@ class ExercisePlanListCreateView(APIView):
             is_active = is_active.lower() == 'true'
             plans = plans.filter(is_active=is_active)
             
+        plans = apply_prefetch_plan(plans, ExercisePlanSerializer)
         serializer = ExercisePlanSerializer(plans, many=True)
         return Response(serializer.data)
     
@@ -188,6 +190,7 @@ class ExerciseProgressListCreateView(APIView):
         else:
             progress = ExerciseProgress.objects.all()
             
+        progress = apply_prefetch_plan(progress, ExerciseProgressSerializer)
         serializer = ExerciseProgressSerializer(progress, many=True)
         return Response(serializer.data)
     
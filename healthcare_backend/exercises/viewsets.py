@@ -4,6 +4,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db import models
+from django.utils import timezone
+from healthcare_backend.prefetch import PrefetchPlanMixin
+from healthcare_backend.response_cache import CachedResponseMixin
+from healthcare_backend.search import FullTextSearchFilter
+from .adherence import adherence_report
+from .trends import progress_trends
 from .models import (
     ExerciseCategory, Exercise, ExercisePlan, 
     ExercisePlanItem, ExerciseProgress
@@ -12,13 +18,15 @@ from .serializers import (
     ExerciseCategorySerializer, ExerciseSerializer, 
     ExercisePlanSerializer, ExercisePlanCreateSerializer,
     ExercisePlanItemSerializer, ExerciseProgressSerializer,
-    ExerciseProgressCreateSerializer
+    ExerciseProgressCreateSerializer, AdherenceQuerySerializer,
+    TrendQuerySerializer
 )
 
-class ExerciseCategoryViewSet(viewsets.ModelViewSet):
+class ExerciseCategoryViewSet(CachedResponseMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing exercise categories.
     """
+    cache_models = (ExerciseCategory,)
     queryset = ExerciseCategory.objects.all()
     serializer_class = ExerciseCategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
@@ -27,14 +35,15 @@ class ExerciseCategoryViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name']
     ordering = ['name']
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+class ExerciseViewSet(CachedResponseMixin, PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing exercises.
     """
+    cache_models = (Exercise, ExerciseCategory)
     queryset = Exercise.objects.all()
     serializer_class = ExerciseSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['category', 'difficulty', 'duration']
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'difficulty', 'duration', 'created_at']
@@ -84,7 +93,7 @@ class ExerciseViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
-class ExercisePlanViewSet(viewsets.ModelViewSet):
+class ExercisePlanViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing exercise plans.
     """
@@ -177,7 +186,7 @@ class ExercisePlanViewSet(viewsets.ModelViewSet):
         serializer = ExercisePlanItemSerializer(items, many=True)
         return Response(serializer.data)
 
-class ExercisePlanItemViewSet(viewsets.ModelViewSet):
+class ExercisePlanItemViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing exercise plan items.
     """
@@ -227,7 +236,7 @@ class ExercisePlanItemViewSet(viewsets.ModelViewSet):
             )
         return super().destroy(request, *args, **kwargs)
 
-class ExerciseProgressViewSet(viewsets.ModelViewSet):
+class ExerciseProgressViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing exercise progress.
     """
@@ -236,6 +245,7 @@ class ExerciseProgressViewSet(viewsets.ModelViewSet):
     filterset_fields = ['patient', 'exercise_plan_item', 'difficulty_rating', 'pain_level']
     ordering_fields = ['date_completed', 'created_at']
     ordering = ['-date_completed']
+    query_budget = {'list': 4, 'retrieve': 4, 'adherence': 5, 'trends': 4}
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -247,13 +257,14 @@ class ExerciseProgressViewSet(viewsets.ModelViewSet):
         Filter queryset based on user permissions.
         """
         user = self.request.user
+        queryset = ExerciseProgress.objects.select_related('exercise_plan_item__exercise')
         
         if user.is_superuser or user.user_type == 'admin':
-            return ExerciseProgress.objects.all()
+            return queryset
         elif user.user_type == 'patient':
-            return ExerciseProgress.objects.filter(patient=user)
+            return queryset.filter(patient=user)
         elif user.user_type == 'physiotherapist':
-            return ExerciseProgress.objects.filter(
+            return queryset.filter(
                 exercise_plan_item__exercise_plan__physiotherapist=user
             )
         else:
@@ -290,4 +301,78 @@ class ExerciseProgressViewSet(viewsets.ModelViewSet):
                 {'error': 'You can only delete your own progress'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-        return super().destroy(request, *args, **kwargs)
\ No newline at end of file
+        return super().destroy(request, *args, **kwargs)
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def adherence(self, request):
+        """
+        Adherence rate, streaks and weekly completion of a patient, read
+        from the adherence rollups. Query params: weeks (1-12, default 4)
+        and, for physiotherapists and admins, patient.
+        """
+        params = AdherenceQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = params.validated_data
+        
+        patient, error = self.get_report_patient(data.get('patient'))
+        if error:
+            return error
+        return Response(adherence_report(patient, timezone.localdate(), weeks=data['weeks']))
+    
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def trends(self, request):
+        """
+        Mean and max pain level and difficulty rating of a patient's
+        progress per day, week or month. Query params: bucket, start_date
+        and end_date (default the last year), optionally plan and, for
+        physiotherapists and admins, patient.
+        """
+        params = TrendQuerySerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = params.validated_data
+        
+        patient, error = self.get_report_patient(data.get('patient'))
+        if error:
+            return error
+        plan = data.get('plan')
+        if plan is not None and plan.patient_id != patient.pk:
+            return Response(
+                {'error': 'The plan belongs to another patient'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        series = progress_trends(patient, data['start_date'], data['end_date'], data['bucket'], plan=plan)
+        return Response({
+            'patient': patient.pk,
+            'plan': plan.pk if plan else None,
+            'bucket': data['bucket'],
+            'start_date': data['start_date'],
+            'end_date': data['end_date'],
+            'series': series,
+        })
+    
+    def get_report_patient(self, patient):
+        """
+        Resolve whose report is asked for: patients only get their own,
+        physiotherapists those of patients they made plans for and admins
+        anyone's. Returns (patient, None) or (None, error response).
+        """
+        user = self.request.user
+        if user.user_type == 'patient':
+            if patient is not None and patient != user:
+                return None, Response(
+                    {'error': 'You can only view your own progress'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            return user, None
+        if patient is None:
+            return None, Response({'error': 'patient is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not (user.is_superuser or user.user_type == 'admin'):
+            if not ExercisePlan.objects.filter(patient=patient, physiotherapist=user).exists():
+                return None, Response(
+                    {'error': 'You can only view the progress of your own patients'}, 
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        return patient, None
@@ -2,6 +2,8 @@
 ASGI config for healthcare_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections are routed to the
+consumers listed in ``chat.routing.websocket_urlpatterns``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +15,18 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthcare_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after the app registry is ready
+from chat.routing import websocket_urlpatterns  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        consumer = websocket_urlpatterns.get(scope['path'])
+        if consumer is None:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await consumer(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,45 @@
+"""
+DRF views with async handlers.
+
+APIView.dispatch() calls its handler synchronously, so an ``async def
+post()`` would return an unawaited coroutine. AsyncAPIView awaits it.
+Authentication, permission and throttle checks can query the database,
+so they still run in the request's thread through sync_to_async, and a
+handler must do the same for ORM calls, or use Django's async ORM
+methods:
+
+    class LoginView(AsyncAPIView):
+        async def post(self, request):
+            user = await aauthenticate(...)
+
+Handlers of one view must be all async or all sync, as in Django's View.
+"""
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
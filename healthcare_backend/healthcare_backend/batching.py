@@ -0,0 +1,116 @@
+"""
+Batch loading for serializer method fields.
+
+A SerializerMethodField is computed one row at a time, so a method that
+queries costs a query per row of a list. Prefetch plans cannot help,
+because the planner cannot see into methods, and annotations cannot
+express every such value. A BatchMethodField gets its values from a
+load method on the serializer instead, which takes the keys of many rows
+and returns their values by key:
+
+    class BookCategorySerializer(serializers.ModelSerializer):
+        books_count = BatchMethodField()
+
+        class Meta:
+            model = BookCategory
+            fields = ['id', 'name', 'books_count']
+            list_serializer_class = BatchListSerializer
+
+        def load_books_count(self, keys):
+            counts = dict(
+                Book.objects.filter(category_id__in=keys)
+                .values_list('category').annotate(Count('id'))
+            )
+            return {key: counts.get(key, 0) for key in keys}
+
+BatchListSerializer collects the keys of all its rows before rendering
+them and calls each load method once for the lot. A serializer rendering
+a single object loads just its own key. Loaded values are kept by the
+BatchLoader in the serializer context for the rest of the request, so
+serializers sharing a context never load a key twice.
+
+Where a view can annotate the value onto its queryset, the field can
+name the ``annotation``. Rows that carry it are rendered from it and
+are not loaded.
+"""
+from django.db import models
+from rest_framework import serializers
+
+LOADER_CONTEXT_KEY = 'batch_loader'
+
+
+class BatchLoader:
+    """Values loaded so far, by field and key"""
+
+    def __init__(self):
+        self.values = {}
+
+    def prime(self, field, keys):
+        """Load the values of keys not loaded yet, with one call to field.load()"""
+        loaded = self.values.setdefault(field.loader_key, {})
+        missing = [key for key in dict.fromkeys(keys) if key not in loaded]
+        if missing:
+            values = field.load(missing)
+            for key in missing:
+                loaded[key] = values.get(key)
+        return loaded
+
+    def get(self, field, key):
+        return self.prime(field, [key])[key]
+
+
+def get_loader(context):
+    """The BatchLoader kept in a serializer context, created on first use"""
+    loader = context.get(LOADER_CONTEXT_KEY)
+    if loader is None:
+        loader = context[LOADER_CONTEXT_KEY] = BatchLoader()
+    return loader
+
+
+class BatchMethodField(serializers.SerializerMethodField):
+    """
+    Read-only field whose values come from the serializer's
+    load_<field_name>(keys) method, which returns a dict of values by key.
+    ``key`` is the attribute of each row that is passed to the method, and
+    ``annotation`` the attribute that already holds the value, if any.
+    """
+
+    def __init__(self, method_name=None, key='pk', annotation=None, **kwargs):
+        self.key = key
+        self.annotation = annotation
+        super().__init__(method_name, **kwargs)
+
+    def bind(self, field_name, parent):
+        if self.method_name is None:
+            self.method_name = f'load_{field_name}'
+        super().bind(field_name, parent)
+
+    @property
+    def loader_key(self):
+        return (type(self.parent), self.method_name)
+
+    def get_key(self, obj):
+        return getattr(obj, self.key)
+
+    def is_annotated(self, obj):
+        return self.annotation is not None and hasattr(obj, self.annotation)
+
+    def load(self, keys):
+        return getattr(self.parent, self.method_name)(keys)
+
+    def to_representation(self, value):
+        if self.is_annotated(value):
+            return getattr(value, self.annotation)
+        return get_loader(self.context).get(self, self.get_key(value))
+
+
+class BatchListSerializer(serializers.ListSerializer):
+    """ListSerializer that loads its child's BatchMethodFields for all rows at once"""
+
+    def to_representation(self, data):
+        rows = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        loader = get_loader(self.context)
+        for field in self.child._readable_fields:
+            if isinstance(field, BatchMethodField):
+                loader.prime(field, [field.get_key(row) for row in rows if not field.is_annotated(row)])
+        return super().to_representation(rows)
@@ -0,0 +1,27 @@
+"""
+The cache that every worker process shares.
+
+Without CACHES, Django's default cache is a LocMemCache in each process's
+own memory. That is fine for caches that only save work, but token
+lookups and response cache versions must see what other processes wrote
+to them, or a worker keeps serving a revoked token or a stale response.
+get_shared_cache() returns the cache they use, or None when there is
+none, and they then fall back to what one process can do safely.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def get_shared_cache():
+    """
+    The SHARED_CACHE_ALIAS cache, or the default cache unless it is local
+    to this process, in which case None
+    """
+    alias = getattr(settings, 'SHARED_CACHE_ALIAS', None)
+    if alias is not None:
+        return caches[alias]
+    cache = caches['default']
+    if isinstance(cache, LocMemCache):
+        return None
+    return cache
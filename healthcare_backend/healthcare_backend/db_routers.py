@@ -0,0 +1,125 @@
+"""
+Primary/replica database routing.
+
+Writes always go to ``default``, the primary. Reads go to a replica from
+DATABASE_REPLICAS only while ReplicaRoutingMiddleware is handling a
+safe-method request to a DRF view. Everything else reads from the
+primary: management commands, signal handlers outside a request, and
+views with ``replica_reads = False``.
+
+Replicas lag behind the primary, so reads are pinned to the primary:
+
+* for the rest of a request once it has written anything;
+* for REPLICA_PIN_SECONDS after a user's write. The pin is held in the
+  cache for authenticated users and in a cookie for the client, so it
+  holds before authentication has run;
+* always for tokens and sessions, which are read to authenticate and
+  may have just been created.
+
+User pins only reach other worker processes through a shared cache
+backend in CACHES.
+"""
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+
+PRIMARY = 'default'
+PIN_COOKIE = 'primary_pin'
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'sessions.session'}
+
+_current_state = ContextVar('replica_routing', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_user(user_id):
+    """Keep this user's reads on the primary for the pin window"""
+    cache.set(pin_key(user_id), time.time() + get_pin_seconds(), get_pin_seconds())
+
+
+def is_user_pinned(user_id):
+    pinned_until = cache.get(pin_key(user_id))
+    return pinned_until is not None and pinned_until > time.time()
+
+
+def resolved_user(request):
+    """The request's user if authentication has already run, without triggering it"""
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return user if user is not None and user.is_authenticated else None
+
+
+class RoutingState:
+    def __init__(self, request, replicas):
+        self.request = request
+        self.replica = random.choice(replicas) if replicas else None
+        self.use_replica = False
+        self.wrote = False
+        self.cookie_pinned = PIN_COOKIE in request.COOKIES
+        self.user_pinned = None
+
+    def read_alias(self):
+        if self.replica is None or not self.use_replica or self.wrote or self.cookie_pinned:
+            return PRIMARY
+        if self.user_pinned is None:
+            user = resolved_user(self.request)
+            if user is None:
+                return self.replica
+            # Looked up once, as soon as the user is known
+            self.user_pinned = is_user_pinned(user.pk)
+        return PRIMARY if self.user_pinned else self.replica
+
+
+def begin_request(request):
+    return _current_state.set(RoutingState(request, get_replicas()))
+
+
+def end_request(token):
+    _current_state.reset(token)
+
+
+def get_current_state():
+    return _current_state.get()
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current_state.get()
+        if state is None or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return PRIMARY
+        alias = state.read_alias()
+        instance = hints.get('instance')
+        if alias != PRIMARY and instance is not None and instance._state.db:
+            # Follow relations from the database the instance came from
+            return instance._state.db
+        return alias
+
+    def db_for_write(self, model, **hints):
+        state = _current_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {PRIMARY, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary
+        return db not in get_replicas()
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from healthcare_backend import search
+from healthcare_backend.response_cache import bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild the full-text search indexes from their models, e.g. after rows were '
+        'written with bulk_create() or QuerySet.update()'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*', metavar='app_label.ModelName',
+            help='Only rebuild the indexes of these models',
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options['database']
+        backend = search.get_backend(using)
+        if backend is None:
+            self.stdout.write(f'No search backend for the {using!r} database, searches use LIKE')
+            return
+
+        indexes = search.get_indexes()
+        if options['models']:
+            labels = {label.lower() for label in options['models']}
+            indexes = [index for index in indexes if index.model._meta.label_lower in labels]
+            unknown = labels - {index.model._meta.label_lower for index in indexes}
+            if unknown:
+                raise CommandError(f'Not registered for search: {", ".join(sorted(unknown))}')
+
+        for index in indexes:
+            started = time.perf_counter()
+            backend.rebuild(index, using)
+            # Cached search results were served from the old index
+            bump_version(index.model)
+            self.stdout.write(
+                f'Indexed {index.rows(using).count()} {index.model._meta.verbose_name_plural} '
+                f'in {time.perf_counter() - started:.1f}s'
+            )
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+from contextlib import closing
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database over every SQLite replica in DATABASE_REPLICAS, '
+        'once or every --interval seconds to stand in for replication locally'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep copying with this many seconds between copies, simulating replication lag',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        replicas = [connections[alias].settings_dict for alias in getattr(settings, 'DATABASE_REPLICAS', [])]
+        if not replicas:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_PATH or DATABASE_REPLICAS')
+        for database in [primary, *replicas]:
+            if database['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{database["NAME"]} is not a SQLite database')
+
+        while True:
+            started = time.perf_counter()
+            # The backup API takes a consistent snapshot even while the primary is being written
+            with closing(sqlite3.connect(primary['NAME'])) as source:
+                for replica in replicas:
+                    with closing(sqlite3.connect(replica['NAME'])) as target:
+                        source.backup(target)
+            self.stdout.write(
+                f'Copied {primary["NAME"]} to {len(replicas)} replica(s) '
+                f'in {(time.perf_counter() - started) * 1000:.0f}ms'
+            )
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,204 @@
+"""
+Per-request performance instrumentation.
+
+RequestMetricsMiddleware counts the SQL queries a request runs and times
+the database, serializer and view work. It reports them in a
+``Server-Timing`` header and can log them. Views can declare a
+``query_budget``, either one number or a dict keyed by viewset action or
+HTTP method:
+
+    class BookViewSet(viewsets.ModelViewSet):
+        query_budget = {'list': 4, 'retrieve': 4}
+
+Going over the budget logs a warning. With ``STRICT_BUDGETS`` on, which is
+the default under ``manage.py test``, it raises QueryBudgetExceeded so the
+test fails instead.
+
+ReplicaRoutingMiddleware lets safe-method DRF views read from replicas,
+see db_routers.
+"""
+import contextlib
+import logging
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.serializers import BaseSerializer
+from . import db_routers
+
+logger = logging.getLogger('healthcare_backend.request_metrics')
+
+DEFAULTS = {
+    'SERVER_TIMING': True,
+    'LOG': False,
+    'STRICT_BUDGETS': False,
+}
+
+_current_metrics = ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a view runs more queries than its budget"""
+
+
+def get_setting(name):
+    return getattr(settings, 'REQUEST_METRICS', {}).get(name, DEFAULTS[name])
+
+
+class RequestMetrics:
+    def __init__(self, keep_sql=False):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.view_time = 0.0
+        self.queries = [] if keep_sql else None
+        self.serializer_depth = 0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.query_count += 1
+            if self.queries is not None:
+                self.queries.append(sql)
+
+    @contextlib.contextmanager
+    def time_serializer(self):
+        # Serializers nest, so only the outermost one is timed
+        self.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.serializer_depth -= 1
+            if not self.serializer_depth:
+                self.serializer_time += time.perf_counter() - start
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'serializer;dur={self.serializer_time * 1000:.1f}',
+            f'view;dur={self.view_time * 1000:.1f}',
+        ])
+
+
+def get_current_metrics():
+    """Metrics of the request being handled in this context, if any"""
+    return _current_metrics.get()
+
+
+def install_serializer_timing():
+    """Time ``serializer.data`` for every DRF serializer and list serializer"""
+    original = BaseSerializer.data.fget
+    if getattr(original, 'timed', False):
+        return
+
+    def data(self):
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return original(self)
+        with metrics.time_serializer():
+            return original(self)
+
+    data.timed = True
+    BaseSerializer.data = property(data)
+
+
+def get_query_budget(view_func, request):
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if isinstance(budget, dict):
+        method = request.method.lower()
+        actions = getattr(view_func, 'actions', None) or {}
+        budget = budget.get(actions.get(method, method))
+    return budget
+
+
+class RequestMetricsMiddleware:
+    """
+    Place this last in MIDDLEWARE so that the view time covers the view
+    and response rendering only.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        metrics = RequestMetrics(keep_sql=get_setting('STRICT_BUDGETS'))
+        request.query_budget = None
+        token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.record_query))
+                response = self.get_response(request)
+        finally:
+            metrics.view_time = time.perf_counter() - start
+            _current_metrics.reset(token)
+
+        if get_setting('SERVER_TIMING'):
+            response['Server-Timing'] = metrics.server_timing()
+        if get_setting('LOG'):
+            logger.info(
+                '%s %s %s queries=%d db=%.1fms serializer=%.1fms view=%.1fms',
+                request.method, request.path, response.status_code, metrics.query_count,
+                metrics.db_time * 1000, metrics.serializer_time * 1000, metrics.view_time * 1000,
+            )
+        self.check_budget(request, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request)
+
+    def check_budget(self, request, metrics):
+        budget = request.query_budget
+        if budget is None or metrics.query_count <= budget:
+            return
+        message = (
+            f'{request.method} {request.path} ran {metrics.query_count} queries, '
+            f'over its budget of {budget}'
+        )
+        if get_setting('STRICT_BUDGETS'):
+            raise QueryBudgetExceeded(message + ':\n' + '\n'.join(metrics.queries))
+        logger.warning(message)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Place this after AuthenticationMiddleware. Safe-method requests to DRF
+    views may read from a replica; a request that writes pins its user and
+    client to the primary for REPLICA_PIN_SECONDS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = db_routers.begin_request(request)
+        try:
+            response = self.get_response(request)
+            state = db_routers.get_current_state()
+        finally:
+            db_routers.end_request(token)
+
+        if state.wrote:
+            user = db_routers.resolved_user(request)
+            if user is not None:
+                db_routers.pin_user(user.pk)
+            response.set_cookie(
+                db_routers.PIN_COOKIE, '1', max_age=db_routers.get_pin_seconds(), httponly=True, samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None)
+        db_routers.get_current_state().use_replica = (
+            request.method in SAFE_METHODS
+            and view_class is not None
+            and getattr(view_class, 'replica_reads', True)
+        )
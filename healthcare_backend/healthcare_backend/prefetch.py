@@ -0,0 +1,174 @@
+"""
+select_related/prefetch_related plans derived from serializers.
+
+Most serializers nest UserSerializer or follow ``source='a.b'`` paths
+through relations. Serializing a list from a bare queryset then costs a
+query per row and relation. prefetch_plan() walks a serializer's readable
+fields once per serializer class, and turns each relation they reach
+into one of two lookups:
+
+* to-one relations, select_related(), so they join into the row query
+* to-many relations, a Prefetch, whose queryset carries the plan of the
+  nested serializer, so each of them is one more query however many rows
+  there are
+
+For ExercisePlanSerializer that is select_related('patient',
+'physiotherapist') and a prefetch of plan_items with
+select_related('exercise__category').
+
+Viewsets and generic views get the plan applied by PrefetchPlanMixin.
+Views that build their own querysets call apply_prefetch_plan(). Fields
+whose values are computed in Python, such as SerializerMethodFields and
+model properties, are opaque to the planner. Their relations have to be
+loaded by the view.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+from rest_framework.relations import RelatedField
+
+_plans = {}
+
+
+class Plan:
+    """Relations to load with the rows of ``model``"""
+
+    def __init__(self, model):
+        self.model = model
+        self.select = set()
+        # Path from model to the related rows, and their own plan
+        self.prefetch = {}
+
+    def select_related(self):
+        # Paths that a longer one already joins add nothing
+        return sorted(
+            path for path in self.select
+            if not any(other.startswith(path + '__') for other in self.select)
+        )
+
+    def prefetch_related(self):
+        lookups = []
+        for path, plan in sorted(self.prefetch.items()):
+            if plan.select or plan.prefetch:
+                lookups.append(Prefetch(path, queryset=plan.apply(plan.model._default_manager.all())))
+            else:
+                lookups.append(path)
+        return lookups
+
+    def apply(self, queryset):
+        select = self.select_related()
+        if select:
+            queryset = queryset.select_related(*select)
+        # A lookup the view already prefetches keeps the view's queryset
+        seen = {
+            lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+            for lookup in queryset._prefetch_related_lookups
+        }
+        prefetch = [
+            lookup for lookup in self.prefetch_related()
+            if (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup) not in seen
+        ]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+def get_relation(model, name):
+    """The relation called ``name`` on model, by attribute name, or None"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Reverse relations without a related_name are reached as foo_set
+        field = next((
+            relation for relation in model._meta.related_objects
+            if relation.get_accessor_name() == name
+        ), None)
+    if field is None or not field.is_relation or field.related_model is None:
+        return None
+    if field.concrete and field.attname == name != field.name:
+        # The foreign key column, such as conversation_id
+        return None
+    if field.auto_created and not field.concrete and field.get_accessor_name() != name:
+        return None
+    return field
+
+
+def follow(position, attrs):
+    """
+    Add the relations along ``attrs`` to the plan. ``position`` is where
+    the walk stands: the plan, the select_related path into it and the
+    model at the end of that path. Return the position after the last
+    relation, or None when attrs stop at a plain attribute first.
+    """
+    plan, prefix, model = position
+    for name in attrs:
+        field = get_relation(model, name)
+        if field is None:
+            return None
+        path = prefix + [name]
+        if field.many_to_one or field.one_to_one:
+            plan.select.add('__'.join(path))
+            prefix = path
+        else:
+            plan = plan.prefetch.setdefault('__'.join(path), Plan(field.related_model))
+            prefix = []
+        model = field.related_model
+    return plan, prefix, model
+
+
+def walk(serializer, position):
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            if isinstance(field, serializers.BaseSerializer):
+                walk(field, position)
+            continue
+        if isinstance(field, RelatedField) and field.use_pk_only_optimization() and len(field.source_attrs) == 1:
+            # Read from the foreign key column, without loading the row
+            continue
+        target = follow(position, field.source_attrs)
+        if target is None:
+            continue
+        if isinstance(field, serializers.ListSerializer):
+            walk(field.child, target)
+        elif isinstance(field, serializers.BaseSerializer):
+            walk(field, target)
+
+
+def prefetch_plan(serializer_class):
+    """The Plan of serializer_class's model, worked out once per class"""
+    plan = _plans.get(serializer_class)
+    if plan is None:
+        model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+        plan = Plan(model)
+        if model is not None:
+            walk(serializer_class(), (plan, [], model))
+        _plans[serializer_class] = plan
+    return plan
+
+
+def apply_prefetch_plan(queryset, serializer_class):
+    """queryset with the relations serializer_class reads loaded up front"""
+    if not isinstance(queryset, QuerySet) or queryset._fields is not None:
+        # Rows from values() have no relations to load
+        return queryset
+    plan = prefetch_plan(serializer_class)
+    if plan.model is None or not issubclass(queryset.model, plan.model):
+        return queryset
+    return plan.apply(queryset)
+
+
+class PrefetchPlanMixin:
+    """
+    Load what the view's serializer reads along with the queryset.
+
+    Applied in filter_queryset(), which list and retrieve (through
+    get_object()) run after get_queryset(), so views can keep overriding
+    get_queryset(). Custom actions that skip filter_queryset() can call
+    apply_prefetch_plan() themselves.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return apply_prefetch_plan(queryset, self.get_serializer_class())
@@ -0,0 +1,233 @@
+"""
+Fast read path for hot list endpoints.
+
+Rendering a large page through a ModelSerializer builds a serializer per
+nested object and takes every field through get_attribute() and
+to_representation(), which costs more CPU than the query itself.
+get_projection() compiles a serializer's readable fields, once per
+serializer class, into a projection: the values_list() lookups they read
+and how each column turns into output. project() fetches the rows as
+lightweight named tuples, which paginators can slice and read cursors
+from, and render_rows() turns them into the dicts serializer.data would
+have given, key for key.
+
+Projections cover the fields the hot list serializers use:
+
+* model fields, rendered by the serializer field's to_representation(),
+  or taken as they are where it would return the column unchanged
+* file fields, rendered as their URL
+* primary key related fields
+* nested serializers of forward foreign keys and one-to-ones
+* nested ``many=True`` serializers of reverse foreign keys, loaded with
+  one more query per relation, in the related model's ordering
+
+Anything else, such as method fields, properties and dotted sources,
+raises ImproperlyConfigured when the projection is compiled, rather than
+rendering differently. Views opt in with FastListMixin, or call project()
+and render_rows() themselves.
+"""
+import operator
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .prefetch import get_relation
+
+_projections = {}
+
+# Fields whose to_representation() returns a column's value unchanged
+PASSTHROUGH = {
+    serializers.BooleanField.to_representation,
+    serializers.CharField.to_representation,
+    serializers.ChoiceField.to_representation,
+    serializers.IntegerField.to_representation,
+    serializers.ReadOnlyField.to_representation,
+}
+
+COLUMN, FILE, NESTED, MANY = range(4)
+
+
+def get_model_field(model, name):
+    try:
+        return get_relation(model, name) or model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def column_getter(index, convert):
+    if convert is None:
+        return operator.itemgetter(index)
+
+    def get(row):
+        value = row[index]
+        return None if value is None else convert(value)
+    return get
+
+
+def file_getter(index, storage, use_url, request):
+    def get(row):
+        name = row[index]
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return get
+
+
+def nested_getter(index, getters):
+    def get(row):
+        if row[index] is None:
+            return None
+        return {key: get_value(row) for key, get_value in getters}
+    return get
+
+
+def many_getter(pk_index, groups):
+    def get(row):
+        return groups.get(row[pk_index], [])
+    return get
+
+
+class Projection:
+    """The values_list() lookups of a serializer and the rendering of their rows"""
+
+    def __init__(self, serializer, model, group_by=None):
+        self.serializer_name = type(serializer).__name__
+        self.model = model
+        self.lookups = []
+        # Nested many=True serializers: output key, their projection and the
+        # name of the foreign key that points back at this model
+        self.many = []
+        self.entries = self.compile(serializer, model, '')
+        self.pk_index = self.column(model._meta.pk.attname) if self.many else None
+        self.group_index = self.column(group_by) if group_by else None
+
+    def column(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+        return self.lookups.index(lookup)
+
+    def uncompilable(self, field, reason):
+        return ImproperlyConfigured(
+            f'{self.serializer_name}.{field.field_name} cannot be projected: {reason}'
+        )
+
+    def compile(self, serializer, model, prefix):
+        entries = []
+        for field in serializer._readable_fields:
+            if len(field.source_attrs) != 1:
+                raise self.uncompilable(field, 'its source is not a single attribute')
+            name = field.source_attrs[0]
+            model_field = get_model_field(model, name)
+            if model_field is None:
+                raise self.uncompilable(field, f'{model.__name__}.{name} is not a model field')
+            lookup = prefix + name
+            forward = model_field.concrete and (model_field.many_to_one or model_field.one_to_one)
+
+            if isinstance(field, serializers.ListSerializer):
+                if prefix or not model_field.one_to_many:
+                    raise self.uncompilable(field, 'only reverse foreign keys of the top level model can be nested')
+                if not isinstance(field.child, serializers.ModelSerializer):
+                    raise self.uncompilable(field, 'its child is not a ModelSerializer')
+                remote = model_field.field
+                projection = Projection(field.child, model_field.related_model, group_by=remote.attname)
+                self.many.append((field.field_name, projection, remote.name))
+                entries.append((MANY, field.field_name, None, projection))
+            elif isinstance(field, serializers.BaseSerializer):
+                if not forward:
+                    raise self.uncompilable(field, 'only forward foreign keys and one-to-ones can be nested')
+                nested = self.compile(field, model_field.related_model, lookup + '__')
+                entries.append((NESTED, field.field_name, self.column(lookup), nested))
+            elif isinstance(field, PrimaryKeyRelatedField):
+                if not forward or field.pk_field is not None:
+                    raise self.uncompilable(field, 'only plain foreign key columns are supported')
+                entries.append((COLUMN, field.field_name, self.column(lookup), None))
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                raise self.uncompilable(field, 'only primary key related fields are supported')
+            elif not model_field.concrete:
+                raise self.uncompilable(field, f'{model.__name__}.{name} is not a column')
+            elif isinstance(field, serializers.FileField):
+                use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+                entries.append((FILE, field.field_name, self.column(lookup), (model_field.storage, use_url)))
+            elif type(field).to_representation in PASSTHROUGH:
+                entries.append((COLUMN, field.field_name, self.column(lookup), None))
+            else:
+                entries.append((COLUMN, field.field_name, self.column(lookup), field.to_representation))
+        return entries
+
+    def bind(self, entries, request, related):
+        """(key, getter) pairs that render one row of entries"""
+        getters = []
+        for kind, key, index, extra in entries:
+            if kind == COLUMN:
+                getter = column_getter(index, extra)
+            elif kind == FILE:
+                getter = file_getter(index, *extra, request)
+            elif kind == NESTED:
+                getter = nested_getter(index, self.bind(extra, request, related))
+            else:
+                getter = many_getter(self.pk_index, related[key])
+            getters.append((key, getter))
+        return getters
+
+    def render(self, rows, context=None):
+        rows = list(rows)
+        context = context or {}
+        related = {}
+        for key, projection, remote_name in self.many:
+            keys = {row[self.pk_index] for row in rows}
+            related[key] = projection.load(remote_name, keys, context) if keys else {}
+        getters = self.bind(self.entries, context.get('request'), related)
+        return [{key: get(row) for key, get in getters} for row in rows]
+
+    def load(self, remote_name, keys, context):
+        """Rendered related rows, grouped by the key of the row they belong to"""
+        rows = list(
+            self.model._default_manager.filter(**{f'{remote_name}__in': keys}).values_list(*self.lookups)
+        )
+        groups = {}
+        for row, data in zip(rows, self.render(rows, context)):
+            groups.setdefault(row[self.group_index], []).append(data)
+        return groups
+
+
+def get_projection(serializer_class):
+    """The Projection of a ModelSerializer, compiled once per class"""
+    projection = _projections.get(serializer_class)
+    if projection is None:
+        projection = Projection(serializer_class(), serializer_class.Meta.model)
+        _projections[serializer_class] = projection
+    return projection
+
+
+def project(queryset, serializer_class):
+    """queryset as named tuple rows of the columns serializer_class renders"""
+    return queryset.prefetch_related(None).values_list(*get_projection(serializer_class).lookups, named=True)
+
+
+def render_rows(rows, serializer_class, context=None):
+    """Rows from project() rendered as serializer_class(many=True).data would be"""
+    return get_projection(serializer_class).render(rows, context)
+
+
+class FastListMixin:
+    """
+    Render list() through the serializer's projection. Custom list actions
+    can return Response(self.render_list(project(queryset, ...))) too.
+    """
+
+    def list(self, request, *args, **kwargs):
+        rows = project(self.filter_queryset(self.get_queryset()), self.get_serializer_class())
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.render_list(page))
+        return Response(self.render_list(rows))
+
+    def render_list(self, rows):
+        """self.get_serializer(rows, many=True).data, for rows from project()"""
+        return render_rows(rows, self.get_serializer_class(), self.get_serializer_context())
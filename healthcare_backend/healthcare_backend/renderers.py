@@ -0,0 +1,127 @@
+"""
+JSON rendering with orjson.
+
+ORJSONRenderer renders what DRF's JSONRenderer does with the project's
+settings (compact, UTF-8, U+2028 and U+2029 escaped), only faster.
+Values orjson cannot encode itself go through DRF's JSONEncoder, so
+Decimals, lazy strings and querysets come out as before. Datetimes,
+dates and times go through it too, which keeps UTC as ``Z``. File
+fields render as their URL, where JSONEncoder would have read the file.
+Requests asking for ``indent``, and data holding integers beyond 64
+bits, which orjson cannot encode, are rendered by JSONRenderer.
+
+The bytes can still differ for floats: orjson writes exponents without a
+sign or padding (``1e16`` and ``2.5e-5`` where the json module writes
+``1e+16`` and ``2.5e-05``). They parse to the same numbers.
+
+StreamingJSONMixin sends long lists as a StreamingHttpResponse instead,
+encoded JSON_STREAM_CHUNK_ITEMS items at a time, so the whole body never
+sits in memory at once. It is only worth it on views whose lists can
+reach JSON_STREAM_MIN_ITEMS items; paginated pages are far shorter.
+Lists are lists, or paginated dicts whose ``results`` is a list.
+"""
+import orjson
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.utils import encoders
+
+OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+_encoder = encoders.JSONEncoder()
+
+
+def get_stream_min_items():
+    return getattr(settings, 'JSON_STREAM_MIN_ITEMS', 500)
+
+
+def get_stream_chunk_items():
+    return getattr(settings, 'JSON_STREAM_CHUNK_ITEMS', 100)
+
+
+def default(obj):
+    if isinstance(obj, FieldFile):
+        return obj.url if obj else None
+    return _encoder.default(obj)
+
+
+def dumps(data):
+    try:
+        content = orjson.dumps(data, default=default, option=OPTIONS)
+    except orjson.JSONEncodeError:
+        # Integers beyond 64 bits; anything JSONEncoder cannot encode either
+        # raises from here as it would have
+        return JSONRenderer().render(data)
+    # JSONRenderer escapes these for JavaScript, which reads them as line breaks
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+def get_items(data):
+    """The list a page streams, or None when data is not a page"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict) and isinstance(data.get('results'), list) and all(isinstance(key, str) for key in data):
+        return data['results']
+    return None
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+    def render_items(self, items, chunk_items):
+        yield b'['
+        for start in range(0, len(items), chunk_items):
+            yield (b',' if start else b'') + dumps(items[start:start + chunk_items])[1:-1]
+        yield b']'
+
+    def render_stream(self, data, chunk_items=None):
+        """render(data) in chunks, for a list or a paginated page"""
+        chunk_items = chunk_items or get_stream_chunk_items()
+        if isinstance(data, list):
+            yield from self.render_items(data, chunk_items)
+            return
+        yield b'{'
+        for i, (key, value) in enumerate(data.items()):
+            yield (b',' if i else b'') + dumps(key) + b':'
+            if key == 'results':
+                yield from self.render_items(value, chunk_items)
+            else:
+                yield dumps(value)
+        yield b'}'
+
+
+class StreamingJSONMixin:
+    """
+    Stream successful list responses of at least JSON_STREAM_MIN_ITEMS
+    items when ORJSONRenderer renders them. Meant for unpaginated lists;
+    views whose responses are cached need the whole body, and should not
+    use it.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not isinstance(response, Response) or response.status_code != 200:
+            return response
+        renderer = response.accepted_renderer
+        items = get_items(response.data)
+        min_items = get_stream_min_items()
+        if (
+            not isinstance(renderer, ORJSONRenderer) or items is None or not min_items
+            or len(items) < min_items
+            or renderer.get_indent(response.accepted_media_type, response.renderer_context)
+        ):
+            return response
+
+        streaming = StreamingHttpResponse(renderer.render_stream(response.data), status=response.status_code)
+        for header, value in response.items():
+            streaming[header] = value
+        streaming['Content-Type'] = renderer.media_type
+        streaming.cookies = response.cookies
+        return streaming
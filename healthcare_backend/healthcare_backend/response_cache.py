@@ -0,0 +1,152 @@
+"""
+Versioned response caching for read-mostly catalog endpoints.
+
+Every model a cached view depends on has a version token in the shared
+cache (see healthcare_backend.caches), replaced whenever an instance is
+saved or deleted (see connect_version_signals). CachedResponseMixin
+caches the rendered JSON of list and retrieve responses under a key built
+from the view, the scheme and host (bodies hold absolute URLs), its URL
+kwargs and query params, the accepted media type, the versions of the
+view's ``cache_models`` and, with ``cache_per_user``, the user. A change
+to any of those models makes the next request miss in every process, so
+nothing has to be deleted explicitly:
+
+    class ExerciseViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+        cache_models = (Exercise, ExerciseCategory)
+
+Responses carry a strong ETag, a hash of the body, and a request whose
+If-None-Match matches it gets a 304 without touching the database or a
+serializer.
+
+Writes that bypass model signals, such as QuerySet.update() and
+bulk_create(), must call bump_version() themselves.
+
+Without a shared cache, one process could not see another's bumps and
+would serve stale responses, so nothing is cached.
+"""
+import hashlib
+import uuid
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from .caches import get_shared_cache
+
+
+def get_cache_seconds():
+    return getattr(settings, 'RESPONSE_CACHE_SECONDS', 60 * 60)
+
+
+def version_key(model):
+    return f'response-cache-version:{model._meta.label_lower}'
+
+
+def bump_version(model):
+    """Invalidate every cached response that depends on ``model``"""
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.set(version_key(model), uuid.uuid4().hex, None)
+
+
+def get_versions(cache, models):
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # add() so that concurrent first requests agree on one token
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, '') for key in keys]
+
+
+def bump_on_change(sender, using=None, **kwargs):
+    bump_version(sender)
+    # Bump again once the write is visible to other connections, so a
+    # response filled from the old rows in the meantime is not served
+    transaction.on_commit(lambda: bump_version(sender), using=using)
+
+
+def connect_version_signals(*models):
+    for model in models:
+        uid = f'response-cache:{model._meta.label_lower}'
+        post_save.connect(bump_on_change, sender=model, dispatch_uid=uid)
+        post_delete.connect(bump_on_change, sender=model, dispatch_uid=uid)
+
+
+def etag_matches(request, etag):
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    # If-None-Match uses the weak comparison
+    etags = [candidate.removeprefix('W/') for candidate in parse_etags(header)]
+    return '*' in etags or etag in etags
+
+
+class CachedResponseMixin:
+    """
+    Cache the JSON list and retrieve responses of a viewset. Set
+    ``cache_models`` to every model the serialized output depends on, and
+    ``cache_per_user`` when the output differs between users.
+    """
+    cache_models = ()
+    cache_per_user = False
+    # Misses fill from the primary, otherwise a lagging replica could be
+    # cached under a version that is newer than its rows
+    replica_reads = False
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def get_response_cache_key(self, cache, request):
+        parts = [
+            type(self).__module__, type(self).__qualname__, self.action,
+            request.scheme, request.get_host(),
+            sorted(self.kwargs.items()), sorted(request.query_params.lists()),
+            request.accepted_media_type, get_versions(cache, self.cache_models),
+        ]
+        if self.cache_per_user:
+            parts.append(request.user.pk if request.user.is_authenticated else None)
+        return 'response-cache:' + hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = get_shared_cache()
+        # The browsable API embeds forms and tokens, so only JSON is cached
+        if cache is None or request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(cache, request)
+        entry = cache.get(key)
+        response = None
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            # finalize_response would set these after the handler returns
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.sha256(response.content).hexdigest()),
+            }
+            cache.set(key, entry, get_cache_seconds())
+
+        if etag_matches(request, entry['etag']):
+            response = HttpResponseNotModified()
+        elif response is None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+        response['ETag'] = entry['etag']
+        if self.cache_per_user:
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization', 'Cookie'])
+        else:
+            patch_cache_control(response, no_cache=True)
+        return response
@@ -0,0 +1,342 @@
+"""
+Full-text search for API list endpoints.
+
+DRF's SearchFilter turns ``?search=`` into OR-ed ``icontains`` lookups,
+which scan every row. A registered model instead keeps a full-text index
+in a side table next to its own, written by signal handlers, and
+FullTextSearchFilter answers searches from it, best matches first:
+
+    search.register(Book, ['title', 'author', 'description', 'publisher'], weights=[10, 5, 1, 2])
+
+Fields may follow single-valued relations (``user__first_name``); saving
+the related row re-indexes the rows that point at it. Every term has to
+match, as a word prefix, in any of the fields.
+
+The backend is picked by database vendor from SEARCH_BACKENDS: FTS5 on
+SQLite and a tsvector table with a GIN index on PostgreSQL. Databases
+without a backend, and models that are not registered, fall back to
+SearchFilter.
+
+Index tables are created, and filled, after ``migrate``. Writes that
+bypass signals, such as QuerySet.update() and bulk_create(), need
+``manage.py rebuild_search_index`` afterwards.
+"""
+import functools
+import operator
+import re
+from django.conf import settings
+from django.db import connections, router
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.utils.module_loading import import_string
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+BACKENDS = {
+    'sqlite': 'healthcare_backend.search.SQLiteFTSBackend',
+    'postgresql': 'healthcare_backend.search.PostgresSearchBackend',
+}
+
+WORD = re.compile(r'\w+')
+
+_indexes = {}
+
+
+class SearchIndex:
+    """The indexed fields of a model and their ranking weights"""
+
+    def __init__(self, model, fields, weights=None):
+        self.model = model
+        self.fields = list(fields)
+        self.weights = list(weights) if weights else [1] * len(self.fields)
+        if len(self.weights) != len(self.fields):
+            raise ValueError('Give one weight per field')
+        self.table = f'{model._meta.db_table}_search'
+        self.local_fields = {path.split('__')[0] for path in self.fields}
+        self.dependencies = self.find_dependencies()
+
+    def find_dependencies(self):
+        """
+        Map (related model, lookup from this model to it) to the fields of
+        the related model that are indexed through that lookup.
+        """
+        dependencies = {}
+        for path in self.fields:
+            parts = path.split('__')
+            model = self.model
+            for depth, name in enumerate(parts[:-1], 1):
+                field = model._meta.get_field(name)
+                if field.many_to_many or field.one_to_many:
+                    raise ValueError(f'{path} follows a multi-valued relation')
+                model = field.related_model
+                dependencies.setdefault((model, '__'.join(parts[:depth])), set()).add(parts[depth])
+        return dependencies
+
+    def rows(self, using, **filters):
+        return self.model._base_manager.using(using).filter(**filters).order_by()
+
+
+class SearchBackend:
+    """Maintains the side tables of registered indexes and searches them"""
+
+    def create_index(self, index, using):
+        """Create the index table if it is missing; return whether it was created"""
+        raise NotImplementedError
+
+    def insert(self, index, queryset, using):
+        raise NotImplementedError
+
+    def search(self, index, queryset, terms):
+        """
+        Filter to rows matching every term and select their ``search_rank``,
+        higher is better. Leave the queryset alone if no term is usable.
+        """
+        raise NotImplementedError
+
+    def drop_index(self, index, using):
+        self.execute(using, f'DROP TABLE IF EXISTS {self.quote(using, index.table)}')
+
+    def delete(self, index, pks, using):
+        pks = list(pks)
+        if pks:
+            placeholders = ', '.join(['%s'] * len(pks))
+            self.execute(
+                using,
+                f'DELETE FROM {self.quote(using, index.table)} WHERE {self.key_column} IN ({placeholders})',
+                pks,
+            )
+
+    def update(self, index, pks, using):
+        pks = list(pks)
+        if not pks:
+            return
+        self.delete(index, pks, using)
+        self.insert(index, index.rows(using, pk__in=pks), using)
+
+    def rebuild(self, index, using):
+        self.drop_index(index, using)
+        self.create_index(index, using)
+        self.insert(index, index.rows(using), using)
+
+    def execute(self, using, sql, params=()):
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def quote(self, using, name):
+        return connections[using].ops.quote_name(name)
+
+    def table_exists(self, index, using):
+        with connections[using].cursor() as cursor:
+            return index.table in connections[using].introspection.table_names(cursor)
+
+    def select_sql(self, queryset, using):
+        return queryset.query.get_compiler(using).as_sql()
+
+    def outer_pk(self, queryset):
+        opts = queryset.model._meta
+        return f'{self.quote(queryset.db, opts.db_table)}.{self.quote(queryset.db, opts.pk.column)}'
+
+    def join(self, queryset, index, key, condition, params, rank, rank_params=()):
+        # The index table is not a model, so extra() is the only way to join it
+        return queryset.extra(
+            select={'search_rank': rank}, select_params=rank_params, tables=[index.table],
+            where=[f'{key} = {self.outer_pk(queryset)}', condition], params=params,
+        )
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """
+    An FTS5 table per model, keyed by rowid = primary key. Terms are
+    matched as stemmed word prefixes and ranked with bm25.
+    """
+    key_column = 'rowid'
+    tokenizer = 'porter unicode61 remove_diacritics 2'
+    # Prefix indexes keep short prefix queries from walking the whole vocabulary
+    prefixes = '2 3'
+
+    def create_index(self, index, using):
+        if self.table_exists(index, using):
+            return False
+        table = self.quote(using, index.table)
+        columns = ', '.join(self.quote(using, field) for field in index.fields)
+        self.execute(
+            using,
+            f'CREATE VIRTUAL TABLE {table} USING fts5('
+            f"{columns}, tokenize='{self.tokenizer}', prefix='{self.prefixes}')",
+        )
+        # Make the weighted bm25 the table's rank column
+        weights = ', '.join(str(float(weight)) for weight in index.weights)
+        self.execute(using, f"INSERT INTO {table} ({table}, rank) VALUES ('rank', 'bm25({weights})')")
+        return True
+
+    def insert(self, index, queryset, using):
+        sql, params = self.select_sql(queryset.values_list('pk', *index.fields), using)
+        columns = ', '.join(['rowid', *(self.quote(using, field) for field in index.fields)])
+        self.execute(using, f'INSERT INTO {self.quote(using, index.table)} ({columns}) {sql}', params)
+
+    def rebuild(self, index, using):
+        super().rebuild(index, using)
+        # Merge the segments written by the bulk insert into one b-tree
+        table = self.quote(using, index.table)
+        self.execute(using, f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+
+    def search(self, index, queryset, terms):
+        # Quoted as FTS5 strings, so terms cannot inject query syntax
+        phrases = ['"' + term.replace('"', '""') + '"*' for term in terms if WORD.search(term)]
+        if not phrases:
+            return queryset
+        table = self.quote(queryset.db, index.table)
+        # FTS5 reruns the whole match for every rowid it is probed with, so
+        # the unary + keeps SQLite from looking the index up row by row: it
+        # has to walk the matches and find each row by primary key
+        return self.join(
+            queryset, index, f'+{table}.rowid', f'{table} MATCH %s', [' AND '.join(phrases)],
+            f'-{table}.rank',
+        )
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    A table of tsvector documents per model with a GIN index. Fields are
+    weighted A to D by their relative weight and ranked with ts_rank.
+    """
+    key_column = 'id'
+    config = 'english'
+
+    def create_index(self, index, using):
+        if self.table_exists(index, using):
+            return False
+        table = self.quote(using, index.table)
+        self.execute(using, f'CREATE TABLE {table} (id bigint PRIMARY KEY, document tsvector NOT NULL)')
+        self.execute(
+            using,
+            f'CREATE INDEX {self.quote(using, index.table + "_document")} ON {table} USING gin (document)',
+        )
+        return True
+
+    def insert(self, index, queryset, using):
+        from django.contrib.postgres.search import SearchVector
+
+        ordered = sorted(set(index.weights), reverse=True)
+        vector = functools.reduce(operator.add, [
+            SearchVector(field, weight='ABCD'[min(ordered.index(weight), 3)], config=self.config)
+            for field, weight in zip(index.fields, index.weights)
+        ])
+        sql, params = self.select_sql(
+            queryset.annotate(search_document=vector).values_list('pk', 'search_document'), using
+        )
+        self.execute(using, f'INSERT INTO {self.quote(using, index.table)} (id, document) {sql}', params)
+
+    def search(self, index, queryset, terms):
+        # Lexemes are \w runs only, so terms cannot inject tsquery syntax
+        phrases = [' <-> '.join(WORD.findall(term)) + ':*' for term in terms if WORD.search(term)]
+        if not phrases:
+            return queryset
+        params = [self.config, ' & '.join(phrases)]
+        table = self.quote(queryset.db, index.table)
+        return self.join(
+            queryset, index, f'{table}.id', f'{table}.document @@ to_tsquery(%s::regconfig, %s)', params,
+            f'ts_rank({table}.document, to_tsquery(%s::regconfig, %s))', params,
+        )
+
+
+@functools.lru_cache
+def load_backend(path):
+    return import_string(path)()
+
+
+def get_backend(using):
+    """The search backend for a database alias, or None if it has none"""
+    vendor = connections[using].vendor
+    path = {**BACKENDS, **getattr(settings, 'SEARCH_BACKENDS', {})}.get(vendor)
+    return load_backend(path) if path else None
+
+
+def get_index(model):
+    return _indexes.get(model)
+
+
+def get_indexes():
+    return list(_indexes.values())
+
+
+def index_on_save(sender, instance, using, update_fields=None, **kwargs):
+    index = _indexes[sender]
+    if update_fields is not None and not index.local_fields.intersection(update_fields):
+        return
+    backend = get_backend(using)
+    if backend is not None:
+        backend.update(index, [instance.pk], using)
+
+
+def unindex_on_delete(sender, instance, using, **kwargs):
+    backend = get_backend(using)
+    if backend is not None:
+        backend.delete(_indexes[sender], [instance.pk], using)
+
+
+class DependentIndexer:
+    """Re-indexes the rows that index fields of a saved related row"""
+
+    def __init__(self, index, lookup, fields):
+        self.index = index
+        self.lookup = lookup
+        self.fields = fields
+
+    def __call__(self, sender, instance, created, using, update_fields=None, **kwargs):
+        if created or (update_fields is not None and not self.fields.intersection(update_fields)):
+            return
+        backend = get_backend(using)
+        if backend is not None:
+            pks = self.index.rows(using, **{self.lookup: instance}).values_list('pk', flat=True)
+            backend.update(self.index, pks, using)
+
+
+def create_indexes(app_config, using, **kwargs):
+    """Create and fill missing index tables after migrate"""
+    backend = get_backend(using)
+    if backend is None:
+        return
+    for index in _indexes.values():
+        if index.model._meta.app_config is not app_config or not router.allow_migrate_model(using, index.model):
+            continue
+        if backend.create_index(index, using):
+            backend.insert(index, index.rows(using), using)
+
+
+def register(model, fields, weights=None):
+    """Index ``fields`` of ``model`` for FullTextSearchFilter; call from AppConfig.ready()"""
+    index = SearchIndex(model, fields, weights)
+    _indexes[model] = index
+    uid = f'search:{model._meta.label_lower}'
+    post_save.connect(index_on_save, sender=model, dispatch_uid=uid)
+    post_delete.connect(unindex_on_delete, sender=model, dispatch_uid=uid)
+    for (related_model, lookup), related_fields in index.dependencies.items():
+        post_save.connect(
+            DependentIndexer(index, lookup, related_fields), sender=related_model,
+            weak=False, dispatch_uid=f'{uid}:{lookup}',
+        )
+    post_migrate.connect(create_indexes, dispatch_uid='search:create_indexes')
+    return index
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter answered from the full-text index of registered models.
+    List it after OrderingFilter: unless the request asks for an ordering,
+    results come back best match first, then in the view's ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        index = get_index(queryset.model)
+        backend = get_backend(queryset.db)
+        if index is None or backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        queryset = backend.search(index, queryset, terms)
+        if 'search_rank' in queryset.query.extra_select and api_settings.ORDERING_PARAM not in request.query_params:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by('-search_rank', *ordering)
+        return queryset
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,12 +43,15 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'corsheaders',
     'django_filters',
+    'healthcare_backend',
     'authentication',
     'appointments',
     'chat',
     'exercises',
     'notifications',
     'books',
+    'dashboard',
+    'core',
 ]
 
 MIDDLEWARE = [
@@ -56,8 +61,10 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'healthcare_backend.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'healthcare_backend.middleware.RequestMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'healthcare_backend.urls'
@@ -90,6 +97,46 @@ DATABASES = {
     }
 }
 
+# Read replicas, listed by alias. Safe-method API reads go to a replica;
+# after a write, the user's reads stay on the primary for REPLICA_PIN_SECONDS.
+# Set DATABASE_REPLICA_PATH to try this locally with a second SQLite file
+# refreshed from the primary by `manage.py sync_sqlite_replicas`.
+DATABASE_REPLICAS = []
+if os.environ.get('DATABASE_REPLICA_PATH'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['DATABASE_REPLICA_PATH'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+
+DATABASE_ROUTERS = ['healthcare_backend.db_routers.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# Token lookups, response cache versions and dashboard sections need a
+# cache that every worker process shares, see healthcare_backend.caches.
+# Set REDIS_URL to use Redis (with the redis package installed); without
+# it, each process has its own LocMemCache and those features stay within
+# what one process can do.
+# SHARED_CACHE_ALIAS names a shared cache other than the default one.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+SHARED_CACHE_ALIAS = None
+
+# How long catalog responses stay cached. Entries are keyed on model
+# versions, so this only bounds how long unused entries take up space.
+RESPONSE_CACHE_SECONDS = 60 * 60
+
+# How long each section of the physiotherapist dashboard stays cached.
+# Writes that change a section drop it, so this bounds staleness from
+# writes that send no signals.
+DASHBOARD_CACHE_SECONDS = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -109,6 +156,13 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+AUTHENTICATION_BACKENDS = ['authentication.backends.PooledHashingModelBackend']
+
+# Threads that hash and verify passwords for the async login, registration
+# and password change views. Logins beyond this many wait for a thread, so
+# the remaining cores keep serving other requests.
+PASSWORD_HASHING_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -143,15 +197,51 @@ AUTH_USER_MODEL = 'authentication.User'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.TokenAuthentication',
+        'authentication.tokens.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'healthcare_backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'healthcare_backend.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
 
+# Views with StreamingJSONMixin (the unpaginated notification list) stream
+# list responses of at least JSON_STREAM_MIN_ITEMS items, encoding
+# JSON_STREAM_CHUNK_ITEMS at a time. 0 turns streaming off.
+JSON_STREAM_MIN_ITEMS = 500
+JSON_STREAM_CHUNK_ITEMS = 100
+
+# Looked-up API tokens are cached in process for TOKEN_LOCAL_CACHE_SECONDS,
+# which bounds how long a revoked token can keep working in other
+# processes, and their user ids in the shared cache, if there is one, for
+# TOKEN_CACHE_SECONDS.
+TOKEN_CACHE_SECONDS = 5 * 60
+TOKEN_LOCAL_CACHE_SECONDS = 5
+TOKEN_LOCAL_CACHE_SIZE = 1024
+
+# Per-request query count and timings, sent as a Server-Timing header.
+# Views over their query_budget log a warning, or fail under the test runner.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+REQUEST_METRICS = {
+    'SERVER_TIMING': True,
+    'LOG': False,
+    'STRICT_BUDGETS': TESTING,
+}
+
+# Broker used to push chat events to WebSocket clients. The in-process
+# broker only reaches clients connected to the same worker process.
+CHAT_PUBSUB_BACKEND = 'chat.pubsub.InProcessPubSub'
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,899 @@
+import json
+import re
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from io import BytesIO, StringIO
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from appointments.models import Appointment, AppointmentFeedback
+from appointments.serializers import AppointmentSerializer
+from authentication.models import PatientProfile, PhysiotherapistProfile
+from authentication.serializers import PhysiotherapistProfileSerializer
+from books.models import Book, BookBookmark, BookCategory, BookReview
+from books.serializers import BookCategorySerializer, BookSerializer
+from chat.models import Attachment, Conversation, ConversationMembership, Message
+from chat.serializers import ConversationInboxSerializer, ConversationSerializer, MessageSerializer
+from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem, ExerciseProgress
+from exercises.serializers import ExercisePlanSerializer, ExerciseProgressSerializer
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+from .db_routers import PIN_COOKIE, PrimaryReplicaRouter, is_user_pinned, pin_key, pin_user
+from .batching import LOADER_CONTEXT_KEY
+from .parsers import ORJSONParser
+from .middleware import QueryBudgetExceeded, ReplicaRoutingMiddleware, RequestMetricsMiddleware
+from .prefetch import prefetch_plan
+from .projections import get_projection, project, render_rows
+from .renderers import ORJSONRenderer, get_stream_min_items
+from .search import get_backend, get_index
+
+User = get_user_model()
+
+
+class BudgetedView:
+    query_budget = {'list': 1, 'get': 2}
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def run_middleware(self, view_func, queries):
+        def get_response(request):
+            middleware.process_view(request, view_func, (), {})
+            for _ in range(queries):
+                User.objects.exists()
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(get_response)
+        return middleware(RequestFactory().get('/api/example/'))
+
+    def view_func(self, actions=None):
+        def view(request):
+            pass
+        view.cls = BudgetedView
+        view.actions = actions
+        return view
+
+    def test_server_timing_reports_queries(self):
+        response = self.run_middleware(lambda request: None, queries=3)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="3 queries"', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    def test_budget_is_looked_up_by_action_then_method(self):
+        self.run_middleware(self.view_func(), queries=2)
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_middleware(self.view_func({'get': 'list'}), queries=2)
+
+    @override_settings(REQUEST_METRICS={'STRICT_BUDGETS': False})
+    def test_budget_overrun_logs_a_warning_outside_tests(self):
+        with self.assertLogs('healthcare_backend.request_metrics', 'WARNING') as logs:
+            response = self.run_middleware(self.view_func(), queries=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ran 3 queries, over its budget of 2', logs.output[0])
+
+    def test_serializer_time_is_recorded(self):
+        class SlowSerializer(serializers.Serializer):
+            count = serializers.SerializerMethodField()
+
+            def get_count(self, obj):
+                return User.objects.count()
+
+        middleware = RequestMetricsMiddleware(
+            lambda request: HttpResponse(str(SlowSerializer({}).data))
+        )
+        response = middleware(RequestFactory().get('/'))
+        serializer_ms = float(response['Server-Timing'].split('serializer;dur=')[1].split(',')[0])
+        self.assertGreater(serializer_ms, 0)
+
+
+class QueryBudgetTests(TestCase):
+    """Endpoints that declare a budget stay within it with real authentication"""
+
+    def setUp(self):
+        self.patient = User.objects.create_user(username='patient', password='password123')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.patient).key}')
+
+    def test_book_list(self):
+        category = BookCategory.objects.create(name='Rehab')
+        for i in range(5):
+            Book.objects.create(title=f'Book {i}', author='Author', description='Guide', category=category)
+        response = self.client.get('/api/books/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_exercise_progress_list(self):
+        therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+        category = ExerciseCategory.objects.create(name='Mobility')
+        plan = ExercisePlan.objects.create(
+            name='Knee', description='Knee', patient=self.patient, physiotherapist=therapist,
+            start_date=date(2030, 1, 1), end_date=date(2030, 2, 1),
+        )
+        for i in range(5):
+            exercise = Exercise.objects.create(
+                name=f'Exercise {i}', description='Stretch', category=category, duration=10
+            )
+            item = ExercisePlanItem.objects.create(exercise_plan=plan, exercise=exercise, day_of_week=i)
+            ExerciseProgress.objects.create(
+                patient=self.patient, exercise_plan_item=item, date_completed=date(2030, 1, 2),
+                completed_sets=3, completed_repetitions=10, difficulty_rating=3, pain_level=2,
+            )
+        response = self.client.get('/api/exercise-progress/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+        self.assertIn('queries"', response['Server-Timing'])
+
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot list endpoints are answered from indexes. Each SELECT a request
+    runs is explained with EXPLAIN QUERY PLAN and a plain ``SCAN <table>``,
+    a full table scan, fails the test.
+    """
+    FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = User.objects.create_user(username='patient', password='password123')
+        cls.therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+        today = date.today()
+        for i in range(5):
+            Appointment.objects.create(
+                patient=cls.patient, physiotherapist=cls.therapist, date=today + timedelta(days=i),
+                start_time=time(9), end_time=time(10), reason='Knee pain',
+            )
+            Notification.objects.create(
+                recipient=cls.patient, notification_type='system', title='Hello', message='Hello',
+                is_read=bool(i % 2),
+            )
+        plan = ExercisePlan.objects.create(
+            name='Knee', description='Knee', patient=cls.patient, physiotherapist=cls.therapist,
+            start_date=today, end_date=today + timedelta(days=30),
+        )
+        exercise = Exercise.objects.create(
+            name='Squat', description='Squat', category=ExerciseCategory.objects.create(name='Strength'),
+            duration=10,
+        )
+        item = ExercisePlanItem.objects.create(exercise_plan=plan, exercise=exercise, day_of_week=0)
+        ExerciseProgress.objects.create(
+            patient=cls.patient, exercise_plan_item=item, date_completed=today,
+            completed_sets=3, completed_repetitions=10, difficulty_rating=3, pain_level=1,
+        )
+        cls.conversation = Conversation.objects.create()
+        for user in (cls.patient, cls.therapist):
+            ConversationMembership.objects.create(conversation=cls.conversation, user=user)
+        Message.objects.create(conversation=cls.conversation, sender=cls.therapist, content='Hi')
+
+    def full_scans(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        scans = []
+        with connection.cursor() as cursor:
+            for sql, params in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                for row in cursor.fetchall():
+                    if self.FULL_SCAN.match(row[-1]):
+                        scans.append(f'{row[-1]} in: {sql}')
+        return scans
+
+    def assertNoFullScans(self, user, url):
+        scans = self.full_scans(user, url)
+        self.assertEqual(scans, [], f'GET {url} scanned whole tables:\n' + '\n'.join(scans))
+
+    def test_detects_full_scans(self):
+        # A substring match on an unindexed column can only be answered by a scan
+        self.assertTrue(self.full_scans(self.patient, '/api/books/?author=smith'))
+
+    def test_hot_filters_use_their_indexes(self):
+        today = date.today()
+        for queryset, index in [
+            (Appointment.objects.filter(physiotherapist=self.therapist, date=today), 'appointments_physio_day_idx'),
+            (Appointment.objects.filter(patient=self.patient, date__gte=today), 'appointments_patient_day_idx'),
+            (Notification.objects.filter(recipient=self.patient, is_read=False), 'notifications_unread_idx'),
+            (Notification.objects.filter(recipient=self.patient), 'notifications_inbox_idx'),
+            (ExercisePlan.objects.filter(patient=self.patient, is_active=True), 'exercises_plan_patient_idx'),
+            (
+                ExercisePlan.objects.filter(is_active=True, start_date__lte=today, end_date__gte=today),
+                'exercises_plan_active_idx',
+            ),
+            (
+                ExerciseProgress.objects.filter(patient=self.patient, date_completed__gte=today),
+                'exercises_progress_patient_idx',
+            ),
+            (Message.objects.filter(conversation=self.conversation), 'chat_message_history_idx'),
+        ]:
+            with self.subTest(index=index):
+                self.assertIn(index, queryset.explain())
+
+    def test_patient_endpoints(self):
+        for url in [
+            '/api/appointments/',
+            '/api/appointments/upcoming/',
+            '/api/notifications/',
+            '/api/notifications/?is_read=false',
+            '/api/exercise-plans/',
+            '/api/exercise-progress/',
+            '/api/chat/conversations/',
+            f'/api/chat/conversations/{self.conversation.pk}/messages/',
+        ]:
+            with self.subTest(url=url):
+                self.assertNoFullScans(self.patient, url)
+
+    def test_physiotherapist_endpoints(self):
+        for url in [
+            '/api/appointments/',
+            '/api/appointments/upcoming/',
+            '/api/exercise-plans/',
+            '/api/exercise-progress/',
+        ]:
+            with self.subTest(url=url):
+                self.assertNoFullScans(self.therapist, url)
+
+
+class PrefetchPlanTests(TestCase):
+    """
+    Serializers' relations are loaded by their prefetch plans, so list and
+    detail endpoints run as many queries for many rows as for a few
+    """
+
+    ENDPOINTS = {
+        'patient': [
+            '/api/appointments/', '/api/appointments/upcoming/', '/api/appointments/past/',
+            '/api/appointment-feedback/', '/api/exercise-plans/', '/api/exercise-plan-items/',
+            '/api/exercise-progress/', '/api/notifications/', '/api/books/', '/api/reviews/',
+            '/api/bookmarks/', '/api/categories/', '/api/chat/conversations/',
+        ],
+        'therapist': ['/api/appointments/', '/api/exercise-plans/', '/api/exercise-progress/'],
+        'admin': [
+            '/api/patient-profiles/', '/api/physiotherapist-profiles/', '/api/auth/physiotherapists/',
+            '/api/exercises/',
+        ],
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.users = {
+            'patient': User.objects.create_user(username='patient', password='password123'),
+            'therapist': User.objects.create_user(
+                username='therapist', password='password123', user_type='physiotherapist'
+            ),
+            'admin': User.objects.create_user(
+                username='admin', password='password123', user_type='admin', is_superuser=True
+            ),
+        }
+        self.patient, self.therapist = self.users['patient'], self.users['therapist']
+        self.plan = ExercisePlan.objects.create(
+            name='Knee', description='Knee', patient=self.patient, physiotherapist=self.therapist,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30),
+        )
+        self.book = Book.objects.create(
+            title='Rehab', author='Author', description='Guide', category=BookCategory.objects.create(name='Rehab')
+        )
+        self.conversation = Conversation.objects.create()
+        for user in (self.patient, self.therapist):
+            ConversationMembership.objects.create(conversation=self.conversation, user=user)
+        self.batches = 0
+        self.seed()
+
+    def seed(self):
+        """One more row of everything the endpoints list"""
+        i = self.batches = self.batches + 1
+        today = date.today()
+        other = User.objects.create_user(username=f'other{i}', password='password123')
+        PatientProfile.objects.create(user=other)
+        therapist = User.objects.create_user(
+            username=f'therapist{i}', password='password123', user_type='physiotherapist'
+        )
+        PhysiotherapistProfile.objects.create(user=therapist, license_number=f'LIC{i}')
+
+        for day in (today + timedelta(days=i), today - timedelta(days=i)):
+            appointment = Appointment.objects.create(
+                patient=self.patient, physiotherapist=self.therapist, date=day,
+                start_time=time(9), end_time=time(10), reason='Knee pain',
+            )
+        AppointmentFeedback.objects.create(appointment=appointment, rating=4)
+        Notification.objects.create(recipient=self.patient, notification_type='system', title='Hi', message='Hi')
+
+        plan = ExercisePlan.objects.create(
+            name=f'Plan {i}', description='Plan', patient=self.patient, physiotherapist=self.therapist,
+            start_date=today, end_date=today + timedelta(days=30),
+        )
+        for exercise_plan in (plan, self.plan):
+            exercise = Exercise.objects.create(
+                name=f'Exercise {i}', description='Stretch', duration=10,
+                category=ExerciseCategory.objects.create(name=f'Category {i} {exercise_plan.pk}'),
+            )
+            item = ExercisePlanItem.objects.create(exercise_plan=exercise_plan, exercise=exercise, day_of_week=0)
+        ExerciseProgress.objects.create(
+            patient=self.patient, exercise_plan_item=item, date_completed=today,
+            completed_sets=3, completed_repetitions=10, difficulty_rating=3, pain_level=1,
+        )
+
+        book = Book.objects.create(
+            title=f'Book {i}', author='Author', description='Guide',
+            category=BookCategory.objects.create(name=f'Category {i}'),
+        )
+        BookReview.objects.create(book=book, user=self.patient, rating=4)
+        BookReview.objects.create(book=self.book, user=other, rating=5)
+        BookBookmark.objects.create(book=book, user=self.patient)
+
+        conversation = Conversation.objects.create()
+        for user in (self.patient, other):
+            ConversationMembership.objects.create(conversation=conversation, user=user)
+        for in_conversation in (conversation, self.conversation):
+            message = Message.objects.create(conversation=in_conversation, sender=other, content='Hi')
+            Attachment.objects.create(
+                message=message, file='chat_attachments/x.png', file_name='x.png', file_type='image/png'
+            )
+
+    def count_queries(self):
+        endpoints = [(role, url) for role, urls in self.ENDPOINTS.items() for url in urls] + [
+            ('patient', f'/api/exercise-plans/{self.plan.pk}/'),
+            ('patient', f'/api/books/{self.book.pk}/'),
+            ('patient', f'/api/chat/conversations/{self.conversation.pk}/'),
+            ('patient', f'/api/chat/conversations/{self.conversation.pk}/messages/'),
+        ]
+        counts = {}
+        client = APIClient()
+        for role, url in endpoints:
+            client.force_authenticate(self.users[role])
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts[role, url] = len(queries)
+        return counts
+
+    def test_plans_follow_nested_serializers_and_sources(self):
+        plan = prefetch_plan(ExercisePlanSerializer)
+        self.assertEqual(plan.select_related(), ['patient', 'physiotherapist'])
+        self.assertEqual(list(plan.prefetch), ['plan_items'])
+        self.assertEqual(plan.prefetch['plan_items'].select_related(), ['exercise__category'])
+        self.assertIs(prefetch_plan(ExercisePlanSerializer), plan)
+
+        # Sources through to-many relations prefetch; key columns load nothing
+        plan = prefetch_plan(ConversationInboxSerializer)
+        self.assertEqual(plan.select_related(), ['conversation', 'last_message__sender'])
+        self.assertEqual(sorted(plan.prefetch), ['conversation__participants', 'last_message__attachments'])
+        self.assertEqual(prefetch_plan(ExerciseProgressSerializer).select_related(), ['exercise_plan_item__exercise'])
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        before = self.count_queries()
+        for _ in range(3):
+            self.seed()
+        cache.clear()
+        after = self.count_queries()
+        for endpoint, count in before.items():
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(after[endpoint], count)
+
+
+class BatchMethodFieldTests(TestCase):
+    """BatchMethodFields load their values for a whole list in one call"""
+
+    def setUp(self):
+        self.categories = [BookCategory.objects.create(name=f'Category {i}') for i in range(4)]
+        for i, category in enumerate(self.categories):
+            for j in range(i):
+                Book.objects.create(title=f'Book {i} {j}', author='Author', description='Guide', category=category)
+
+    def test_list_loads_each_field_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = BookCategorySerializer(self.categories, many=True).data
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([row['books_count'] for row in data], [0, 1, 2, 3])
+
+    def test_loaded_values_are_kept_in_the_context(self):
+        context = {}
+        BookCategorySerializer(self.categories[:2], many=True, context=context).data
+        self.assertIn(LOADER_CONTEXT_KEY, context)
+        with CaptureQueriesContext(connection) as queries:
+            data = BookCategorySerializer(self.categories, many=True, context=context).data
+            single = BookCategorySerializer(self.categories[1], context=context).data
+        # Only the keys not loaded by the first list are loaded again
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([row['books_count'] for row in data], [0, 1, 2, 3])
+        self.assertEqual(single['books_count'], 1)
+
+    def test_conversation_fields_match_their_memberships(self):
+        patient = User.objects.create_user(username='patient', password='password123')
+        request = RequestFactory().get('/')
+        request.user = patient
+
+        def serialize():
+            conversations = Conversation.objects.filter(participants=patient).prefetch_related('participants')
+            with CaptureQueriesContext(connection) as queries:
+                data = ConversationSerializer(conversations, many=True, context={'request': request}).data
+            return data, len(queries)
+
+        def add_conversation(i):
+            other = User.objects.create_user(username=f'other{i}', password='password123')
+            conversation = Conversation.objects.create()
+            conversation.participants.set([patient, other])
+            for sender in [other] * i + [patient]:
+                message = Message.objects.create(conversation=conversation, sender=sender, content='Hi')
+                ConversationMembership.record_message(message)
+
+        add_conversation(1)
+        _, few = serialize()
+        for i in range(2, 5):
+            add_conversation(i)
+        data, many = serialize()
+        self.assertEqual(many, few)
+
+        memberships = {row.conversation_id: row for row in ConversationMembership.objects.filter(user=patient)}
+        for row in data:
+            membership = memberships[row['id']]
+            self.assertEqual(row['unread_count'], membership.count_unread())
+            self.assertEqual(row['last_read_message_id'], membership.last_read_message_id)
+            self.assertEqual(row['last_message']['id'], membership.last_message_id)
+
+
+class ProjectionTests(TestCase):
+    """Serializers rendered from values rows give byte for byte the same JSON"""
+
+    def setUp(self):
+        self.patient = User.objects.create_user(
+            username='patient', password='password123', first_name='Pat', phone_number='555',
+            date_of_birth=date(1990, 5, 17), profile_picture='profile_pics/pat smith.png',
+        )
+        self.therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+        today = date.today()
+        for i, (status, notes) in enumerate([('scheduled', ''), ('confirmed', 'Bring shoes'), ('completed', '')]):
+            for day in (today + timedelta(days=i + 1), today - timedelta(days=i + 1)):
+                Appointment.objects.create(
+                    patient=self.patient, physiotherapist=self.therapist, date=day, start_time=time(9, 30),
+                    end_time=time(10, 15), status=status, reason=f'Knee pain {i}', notes=notes,
+                )
+        Notification.objects.create(recipient=self.patient, notification_type='system', title='Hi', message='Hi')
+        Notification.objects.create(
+            recipient=self.patient, notification_type='appointment', title='Booked', message='Booked',
+            related_object_id=1, related_object_type='appointment', is_read=True,
+        )
+        self.conversation = Conversation.objects.create()
+        self.conversation.participants.set([self.patient, self.therapist])
+        for i, sender in enumerate([self.patient, self.therapist, self.therapist]):
+            message = Message.objects.create(conversation=self.conversation, sender=sender, content=f'Message {i}')
+            for j in range(i):
+                Attachment.objects.create(
+                    message=message, file=f'chat_attachments/{i}-{j}.pdf', file_name=f'{j}.pdf',
+                    file_type='application/pdf',
+                )
+        self.request = RequestFactory().get('/api/')
+
+    def assertSameJSON(self, serializer_class, queryset, context):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        rows = project(queryset, serializer_class)
+        self.assertEqual(JSONRenderer().render(render_rows(rows, serializer_class, context)), expected)
+
+    def test_rendered_rows_match_the_serializers(self):
+        querysets = [
+            (AppointmentSerializer, Appointment.objects.all()),
+            (NotificationSerializer, Notification.objects.all()),
+            (MessageSerializer, Message.objects.all()),
+            (MessageSerializer, Message.objects.none()),
+        ]
+        for serializer_class, queryset in querysets:
+            # File URLs are absolute when the context has the request
+            for context in ({}, {'request': self.request}):
+                with self.subTest(serializer=serializer_class.__name__, context=context):
+                    self.assertSameJSON(serializer_class, queryset, context)
+
+    def test_rows_are_fetched_in_one_query_per_relation(self):
+        with CaptureQueriesContext(connection) as queries:
+            render_rows(project(Message.objects.all(), MessageSerializer), MessageSerializer)
+        # The messages with their senders, and their attachments
+        self.assertEqual(len(queries), 2)
+
+    def test_endpoints_render_like_the_serializers(self):
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        today = date.today()
+        appointments = Appointment.objects.filter(patient=self.patient)
+        endpoints = [
+            ('/api/appointments/', AppointmentSerializer, appointments.order_by('date', 'start_time'), True),
+            ('/api/appointments/upcoming/', AppointmentSerializer, appointments.filter(
+                date__gte=today, status__in=['scheduled', 'confirmed']
+            ).order_by('date', 'start_time'), True),
+            ('/api/appointments/past/', AppointmentSerializer, appointments.filter(
+                date__lt=today
+            ).order_by('-date', '-start_time'), True),
+            ('/api/appointments/?search=shoes', AppointmentSerializer, appointments.filter(
+                status='confirmed'
+            ), True),
+            ('/api/notifications/', NotificationSerializer, Notification.objects.all(), False),
+            (f'/api/chat/conversations/{self.conversation.pk}/messages/', MessageSerializer,
+             Message.objects.all(), False),
+        ]
+        for url, serializer_class, queryset, with_request in endpoints:
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                if isinstance(data, dict):
+                    data = data['results']
+                context = {'request': response.wsgi_request} if with_request else {}
+                expected = serializer_class(queryset, many=True, context=context).data
+                self.assertEqual(data, json.loads(JSONRenderer().render(expected)))
+
+    def test_serializers_outside_the_projection_rules_are_refused(self):
+        # Method fields, many-to-many relations and dotted sources
+        for serializer_class in (ConversationSerializer, BookSerializer):
+            with self.subTest(serializer=serializer_class.__name__):
+                with self.assertRaises(ImproperlyConfigured):
+                    get_projection(serializer_class)
+
+
+class JSONRenderingTests(TestCase):
+    """ORJSONRenderer and ORJSONParser behave as DRF's JSON renderer and parser"""
+
+    def setUp(self):
+        self.therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist',
+            profile_picture='profile_pics/therapist.png',
+        )
+        PhysiotherapistProfile.objects.create(
+            user=self.therapist, license_number='LIC1', consultation_fee=Decimal('75.50'),
+        )
+
+    def test_output_matches_json_renderer(self):
+        profiles = PhysiotherapistProfileSerializer(PhysiotherapistProfile.objects.all(), many=True).data
+        values = {
+            'profiles': profiles,
+            'decimal': Decimal('12.30'),
+            'utc': datetime(2024, 1, 2, 3, 4, 5, 6000, tzinfo=dt_timezone.utc),
+            'offset': datetime(2024, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=2))),
+            'date': date(2024, 1, 2),
+            'time': time(9, 30),
+            'duration': timedelta(minutes=90),
+            'line separators': 'a\u2028b\u2029c',
+            'unicode': 'Physiothérapie',
+            7: 'integer key',
+            'tuple': (1, 2),
+            'big integer': 2 ** 70,
+        }
+        for data in (values, profiles, [], None):
+            with self.subTest(data=data):
+                self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertIn(b'"consultation_fee":"75.50"', ORJSONRenderer().render(profiles))
+
+    def test_float_exponents_differ_only_in_format(self):
+        data = [1e16, 2.5e-05, 0.1]
+        self.assertEqual(ORJSONRenderer().render(data), b'[1e16,0.000025,0.1]')
+        self.assertEqual(json.loads(ORJSONRenderer().render(data)), data)
+
+    def test_file_fields_render_as_urls(self):
+        user = User.objects.get(pk=self.therapist.pk)
+        empty = User.objects.create_user(username='empty', password='password123')
+        data = {'picture': user.profile_picture, 'empty': empty.profile_picture}
+        self.assertEqual(ORJSONRenderer().render(data), b'{"picture":"/media/profile_pics/therapist.png","empty":null}')
+
+    def test_indent_falls_back_to_json_renderer(self):
+        data = {'a': [1, 2]}
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+    def test_streamed_chunks_join_to_the_rendered_page(self):
+        items = [{'id': i, 'text': f'Row {i}'} for i in range(7)]
+        renderer = ORJSONRenderer()
+        for data in (items, [], {'count': 7, 'next': None, 'results': items}):
+            with self.subTest(data=data):
+                chunks = list(renderer.render_stream(data, chunk_items=3))
+                self.assertEqual(b''.join(chunks), renderer.render(data))
+
+    def test_parser_reads_json_and_rejects_invalid_input(self):
+        parser = ORJSONParser()
+        self.assertEqual(parser.parse(BytesIO('{"a": [1, "é"]}'.encode())), {'a': [1, 'é']})
+        for body in (b'{"a": ', b'', b'{"a": NaN}'):
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    parser.parse(BytesIO(body))
+
+    def test_long_lists_are_streamed(self):
+        Notification.objects.bulk_create([
+            Notification(recipient=self.therapist, notification_type='system', title='Hi', message=f'{i}')
+            for i in range(get_stream_min_items())
+        ])
+        client = APIClient()
+        client.force_authenticate(self.therapist)
+        with self.settings(JSON_STREAM_MIN_ITEMS=0):
+            expected = client.get('/api/notifications/')
+        self.assertFalse(expected.streaming)
+        response = client.get('/api/notifications/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(b''.join(response.streaming_content), expected.content)
+
+    def test_json_requests_are_parsed(self):
+        response = APIClient().post(
+            '/api/auth/login/', '{"username": "therapist", "password": "password123"}',
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        response = APIClient().post('/api/auth/login/', '{"username": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
+
+
+# LocMemCache is shared by everything in the test process
+@override_settings(SHARED_CACHE_ALIAS='default')
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = User.objects.create_user(username='patient', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        self.category = ExerciseCategory.objects.create(name='Mobility')
+        self.exercise = Exercise.objects.create(
+            name='Squat', description='Squat', category=self.category, duration=10
+        )
+
+    def test_repeat_loads_skip_the_database(self):
+        first = self.client.get('/api/exercises/')
+        self.assertEqual(first.status_code, 200)
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/exercises/')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second['Cache-Control'], 'no-cache')
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get(f'/api/exercises/{self.exercise.pk}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(f'/api/exercises/{self.exercise.pk}/', HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(f'/api/exercises/{self.exercise.pk}/', HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_params_are_part_of_the_key(self):
+        Exercise.objects.create(name='Lunge', description='Lunge', category=self.category, duration=5)
+        everything = self.client.get('/api/exercises/')
+        searched = self.client.get('/api/exercises/?search=lunge')
+        self.assertEqual(everything.json()['count'], 2)
+        self.assertEqual(searched.json()['count'], 1)
+        self.assertNotEqual(everything['ETag'], searched['ETag'])
+
+    def test_host_and_scheme_are_part_of_the_key(self):
+        Exercise.objects.filter(pk=self.exercise.pk).update(image='exercise_images/squat.png')
+        with self.settings(ALLOWED_HOSTS=['testserver', 'api.example.com']):
+            plain = self.client.get(f'/api/exercises/{self.exercise.pk}/')
+            other_host = self.client.get(f'/api/exercises/{self.exercise.pk}/', HTTP_HOST='api.example.com')
+            secure = self.client.get(f'/api/exercises/{self.exercise.pk}/', secure=True)
+        self.assertEqual(plain.json()['image'], 'http://testserver/media/exercise_images/squat.png')
+        self.assertEqual(other_host.json()['image'], 'http://api.example.com/media/exercise_images/squat.png')
+        self.assertEqual(secure.json()['image'], 'https://testserver/media/exercise_images/squat.png')
+
+    @override_settings(SHARED_CACHE_ALIAS=None)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        self.client.get('/api/exercises/')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/exercises/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(queries)
+        self.assertNotIn('ETag', response)
+
+    def test_saving_a_dependency_invalidates(self):
+        etag = self.client.get('/api/exercises/')['ETag']
+        self.category.name = 'Strength'
+        self.category.save()
+        response = self.client.get('/api/exercises/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Strength')
+
+        self.exercise.delete()
+        self.assertEqual(self.client.get('/api/exercises/').json()['count'], 0)
+
+    def test_per_user_responses(self):
+        book = Book.objects.create(
+            title='Rehab', author='Author', description='Guide',
+            category=BookCategory.objects.create(name='Rehab'),
+        )
+        other = User.objects.create_user(username='other', password='password123')
+        BookBookmark.objects.create(book=book, user=other)
+        response = self.client.get('/api/books/')
+        self.assertFalse(response.json()['results'][0]['is_bookmarked'])
+        self.assertIn('private', response['Cache-Control'])
+
+        self.client.force_authenticate(other)
+        self.assertTrue(self.client.get('/api/books/').json()['results'][0]['is_bookmarked'])
+
+    def test_errors_are_not_cached(self):
+        self.assertEqual(self.client.get('/api/exercises/999/').status_code, 404)
+        exercise = Exercise.objects.create(
+            pk=999, name='Plank', description='Plank', category=self.category, duration=1
+        )
+        self.assertEqual(self.client.get(f'/api/exercises/{exercise.pk}/').status_code, 200)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='password123', user_type='admin')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.category = BookCategory.objects.create(name='Rehab')
+
+    def add_book(self, title, description='', author='Author'):
+        return Book.objects.create(title=title, author=author, description=description, category=self.category)
+
+    def search(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row.get('title') or row.get('username') or row.get('id') for row in response.json()['results']]
+
+    def test_matches_every_term_as_a_word_prefix(self):
+        self.add_book('Stretching for runners', 'Daily knee routines')
+        self.add_book('Knee surgery recovery', 'After the operation')
+        self.add_book('Shoulder care', 'Rotator cuff')
+        self.assertEqual(sorted(self.search('/api/books/?search=knee')), ['Knee surgery recovery', 'Stretching for runners'])
+        self.assertEqual(self.search('/api/books/?search=stretch+kne'), ['Stretching for runners'])
+        self.assertEqual(self.search('/api/books/?search="rotator cuff"'), ['Shoulder care'])
+        self.assertEqual(self.search('/api/books/?search=cuff+surgery'), [])
+
+    def test_best_matches_come_first_unless_ordering_is_given(self):
+        self.add_book('A guide', 'Something about balance training')
+        self.add_book('Balance', 'Training')
+        self.assertEqual(self.search('/api/books/?search=balance'), ['Balance', 'A guide'])
+        self.assertEqual(self.search('/api/books/?search=balance&ordering=title'), ['A guide', 'Balance'])
+
+    def test_index_follows_saves_and_deletes(self):
+        book = self.add_book('Posture basics')
+        book.title = 'Gait basics'
+        book.save()
+        self.assertEqual(self.search('/api/books/?search=posture'), [])
+        self.assertEqual(self.search('/api/books/?search=gait'), ['Gait basics'])
+        book.delete()
+        self.assertEqual(self.search('/api/books/?search=gait'), [])
+
+    def test_related_fields_are_reindexed(self):
+        therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist', first_name='Ada'
+        )
+        profile = PhysiotherapistProfile.objects.create(
+            user=therapist, license_number='L1', specializations='Sports'
+        )
+        self.assertEqual(self.search('/api/physiotherapist-profiles/?search=ada+sports'), [profile.pk])
+        therapist.first_name = 'Grace'
+        therapist.save()
+        self.assertEqual(self.search('/api/physiotherapist-profiles/?search=ada'), [])
+        self.assertEqual(self.search('/api/physiotherapist-profiles/?search=grace'), [profile.pk])
+
+        # Users without a profile have nothing to reindex
+        self.admin.first_name = 'Ada'
+        self.admin.save()
+
+    def test_searches_respect_the_view_queryset(self):
+        patient = User.objects.create_user(username='patient', password='password123')
+        other = User.objects.create_user(username='other', password='password123')
+        therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+        for user in (patient, other):
+            Appointment.objects.create(
+                patient=user, physiotherapist=therapist, date=date(2030, 1, 1),
+                start_time=time(9), end_time=time(10), reason='Lower back pain',
+            )
+        self.client.force_authenticate(patient)
+        self.assertEqual(len(self.search('/api/appointments/?search=back')), 1)
+
+    def test_rebuild_command_picks_up_bulk_writes(self):
+        Book.objects.bulk_create([
+            Book(title=f'Hydrotherapy {i}', author='Author', description='Pool', category=self.category)
+            for i in range(3)
+        ])
+        self.assertEqual(self.search('/api/books/?search=hydrotherapy'), [])
+        call_command('rebuild_search_index', 'books.Book', stdout=StringIO())
+        self.assertEqual(len(self.search('/api/books/?search=hydrotherapy')), 3)
+
+    def test_search_is_answered_from_the_index(self):
+        index = get_index(Book)
+        queryset = get_backend('default').search(index, Book.objects.all(), ['knee'])
+        plan = queryset.explain()
+        self.assertIn(index.table, plan)
+        self.assertNotRegex(plan, r'SCAN books_book\b(?! USING)')
+
+    def test_unregistered_models_use_search_filter(self):
+        ExerciseCategory.objects.create(name='Mobility')
+        response = self.client.get('/api/exercise-categories/?search=obil')
+        self.assertEqual(response.json()['count'], 1)
+
+class ReplicaView:
+    pass
+
+
+class NoReplicaView:
+    replica_reads = False
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_PIN_SECONDS=30)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        # Requests in other tests pin their users, whose ids get reused
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.router = PrimaryReplicaRouter()
+        self.user = User.objects.create_user(username='reader', password='password123')
+
+    def route(self, method='get', view_class=ReplicaView, write=False, cookies=None, user=None):
+        """Run a request through the middleware and return where a read would go"""
+        routes = {}
+
+        def view(request):
+            pass
+        view.cls = view_class
+
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            if user is not None:
+                # What DRF does once it has authenticated the request
+                request.user = user
+            routes['before'] = self.router.db_for_read(User)
+            routes['token'] = self.router.db_for_read(Token)
+            if write:
+                self.router.db_for_write(User)
+                routes['after'] = self.router.db_for_read(User)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        request = getattr(RequestFactory(), method)('/api/example/')
+        request.COOKIES.update(cookies or {})
+        routes['response'] = middleware(request)
+        return routes
+
+    def test_reads_outside_requests_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(User), 'default')
+
+    def test_safe_api_reads_use_a_replica(self):
+        routes = self.route()
+        self.assertEqual(routes['before'], 'replica')
+        self.assertEqual(routes['token'], 'default')
+        self.assertEqual(self.route(method='post')['before'], 'default')
+        self.assertEqual(self.route(view_class=NoReplicaView)['before'], 'default')
+
+    def test_a_write_pins_the_request_user_and_client(self):
+        routes = self.route(method='post', write=True, user=self.user)
+        self.assertEqual(routes['after'], 'default')
+        self.assertIn(PIN_COOKIE, routes['response'].cookies)
+        self.assertTrue(is_user_pinned(self.user.pk))
+
+        self.assertEqual(self.route(user=self.user)['before'], 'default')
+        self.assertEqual(self.route(cookies={PIN_COOKIE: '1'})['before'], 'default')
+        cache.delete(pin_key(self.user.pk))
+        self.assertEqual(self.route(user=self.user)['before'], 'replica')
+
+    def test_other_users_keep_reading_from_the_replica(self):
+        pin_user(self.user.pk)
+        other = User.objects.create_user(username='other', password='password123')
+        self.assertEqual(self.route(user=other)['before'], 'replica')
@@ -31,6 +31,7 @@ urlpatterns = [
     path('api/', include('appointments.api_urls')),    # Appointments
     path('api/', include('exercises.api_urls')),       # Exercises, plans, progress
     path('api/', include('books.urls')),               # Books
+    path('api/dashboard/', include('dashboard.urls')), # Physiotherapist dashboard
     
     # Legacy endpoints (for backward compatibility)
     path('api/appointments/', include('appointments.urls')),
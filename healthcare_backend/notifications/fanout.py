@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification
+
+User = get_user_model()
+
+# NotificationPreference switch consulted for each notification type
+PREFERENCE_FIELDS = {
+    'appointment': 'appointment_reminders',
+    'message': 'message_notifications',
+    'exercise': 'exercise_reminders',
+    'system': 'system_notifications',
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def filter_by_preference(recipients, notification_type):
+    """
+    Drop users who switched this notification type off. Users without a
+    NotificationPreference row keep the model defaults, which are all on,
+    so this is a single LEFT JOIN on the recipient query.
+    """
+    field = PREFERENCE_FIELDS[notification_type]
+    return recipients.filter(
+        Q(notification_preferences__isnull=True) |
+        Q(**{f'notification_preferences__{field}': True})
+    )
+
+
+def fan_out(notification_type, title, message, recipients,
+            related_object=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create one notification per recipient who accepts this type.
+
+    ``recipients`` is a User queryset. Recipient ids are streamed from a
+    single query and notifications are written with ``bulk_create`` in
+    batches, so memory stays bounded however many users are targeted.
+    Returns the number of notifications created.
+    """
+    related_object_id = related_object.pk if related_object is not None else None
+    related_object_type = related_object._meta.model_name if related_object is not None else None
+
+    recipient_ids = (
+        filter_by_preference(recipients, notification_type)
+        .order_by()
+        .values_list('id', flat=True)
+        .iterator(chunk_size=batch_size)
+    )
+
+    created = 0
+    batch = []
+    for recipient_id in recipient_ids:
+        batch.append(Notification(
+            recipient_id=recipient_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            related_object_id=related_object_id,
+            related_object_type=related_object_type,
+        ))
+        if len(batch) >= batch_size:
+            Notification.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        Notification.objects.bulk_create(batch)
+        created += len(batch)
+    return created
+
+
+def notify_appointment_change(appointment, created=False):
+    if created:
+        title = 'New appointment'
+        message = f'Appointment scheduled on {appointment.date} at {appointment.start_time}.'
+    else:
+        title = 'Appointment updated'
+        message = (
+            f'Your appointment on {appointment.date} at {appointment.start_time} '
+            f'is now {appointment.get_status_display().lower()}.'
+        )
+    recipients = User.objects.filter(pk__in=[appointment.patient_id, appointment.physiotherapist_id])
+    return fan_out('appointment', title, message, recipients, related_object=appointment)
+
+
+def notify_new_message(message):
+    recipients = User.objects.filter(
+        conversation_memberships__conversation_id=message.conversation_id
+    ).exclude(pk=message.sender_id)
+    preview = message.content if len(message.content) <= 100 else message.content[:97] + '...'
+    return fan_out(
+        'message', f'New message from {message.sender.username}', preview,
+        recipients, related_object=message,
+    )
+
+
+def notify_exercise_reminders(day=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Remind every patient with an active plan scheduling exercises on ``day``"""
+    day = day or timezone.localdate()
+    recipients = User.objects.filter(
+        pk__in=User.objects.filter(
+            exercise_plans__is_active=True,
+            exercise_plans__start_date__lte=day,
+            exercise_plans__end_date__gte=day,
+            exercise_plans__plan_items__day_of_week=day.weekday(),
+        ).values('pk')
+    )
+    return fan_out(
+        'exercise', 'Exercise reminder', 'You have exercises scheduled for today.',
+        recipients, batch_size=batch_size,
+    )
+
+
+def broadcast(title, message, user_type=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Send a system notification to every active user, or one user type"""
+    recipients = User.objects.filter(is_active=True)
+    if user_type:
+        recipients = recipients.filter(user_type=user_type)
+    return fan_out('system', title, message, recipients, batch_size=batch_size)
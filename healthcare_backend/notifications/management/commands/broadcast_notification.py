@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from authentication.models import User
+from notifications.fanout import DEFAULT_BATCH_SIZE, broadcast
+
+
+class Command(BaseCommand):
+    help = 'Send a system notification to every active user or to one user type'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title')
+        parser.add_argument('message')
+        parser.add_argument('--user-type', choices=[choice for choice, _ in User.USER_TYPES])
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        created = broadcast(
+            options['title'], options['message'],
+            user_type=options['user_type'], batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Sent {created} notification(s)'))
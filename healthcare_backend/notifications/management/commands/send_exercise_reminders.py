@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from notifications.fanout import DEFAULT_BATCH_SIZE, notify_exercise_reminders
+
+
+class Command(BaseCommand):
+    help = 'Notify patients whose active exercise plans have exercises scheduled for a day'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=parse_date, help='Day to send reminders for (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        created = notify_exercise_reminders(day=options['date'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Sent {created} exercise reminder(s)'))
@@ -23,6 +23,15 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='notifications_inbox_idx'),
+            # is_read is filtered as a bare boolean, which SQLite can only match
+            # through a partial index condition, not as an index column
+            models.Index(
+                fields=['recipient', '-created_at'], name='notifications_unread_idx',
+                condition=models.Q(is_read=False),
+            ),
+        ]
 
 class NotificationPreference(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_preferences')
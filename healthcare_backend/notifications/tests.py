@@ -1,3 +1,90 @@
+from datetime import date, time, timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from appointments.models import Appointment
+from chat.models import Conversation, Message
+from exercises.models import Exercise, ExerciseCategory, ExercisePlan, ExercisePlanItem
+from .fanout import broadcast, fan_out, notify_exercise_reminders
+from .models import Notification, NotificationPreference
 
-# Create your tests here.
+User = get_user_model()
+
+
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.patients = [
+            User.objects.create_user(username=f'patient{i}', password='password123')
+            for i in range(5)
+        ]
+        self.therapist = User.objects.create_user(
+            username='therapist', password='password123', user_type='physiotherapist'
+        )
+
+    def test_respects_preferences_and_defaults(self):
+        NotificationPreference.objects.create(user=self.patients[0], system_notifications=False)
+        NotificationPreference.objects.create(user=self.patients[1], message_notifications=False)
+
+        created = broadcast('Maintenance', 'The clinic portal is down tonight.', user_type='patient')
+
+        self.assertEqual(created, 4)
+        recipients = set(Notification.objects.values_list('recipient__username', flat=True))
+        self.assertEqual(recipients, {'patient1', 'patient2', 'patient3', 'patient4'})
+
+    def test_writes_in_batches_from_a_single_recipient_query(self):
+        with CaptureQueriesContext(connection) as context:
+            created = fan_out(
+                'system', 'Hello', 'Welcome', User.objects.all(), batch_size=2
+            )
+        self.assertEqual(created, 6)
+        statements = [query['sql'].split()[0] for query in context.captured_queries]
+        self.assertEqual(statements.count('SELECT'), 1)
+        self.assertEqual(statements.count('INSERT'), 3)
+
+    def test_new_message_notifies_other_participants(self):
+        conversation = Conversation.objects.create()
+        conversation.participants.set([self.therapist, self.patients[0]])
+        with self.captureOnCommitCallbacks(execute=True):
+            message = Message.objects.create(
+                conversation=conversation, sender=self.therapist, content='See you Monday'
+            )
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.patients[0])
+        self.assertEqual(notification.notification_type, 'message')
+        self.assertEqual(notification.related_object_id, message.pk)
+
+    def test_appointment_change_notifies_both_sides(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(
+                patient=self.patients[0], physiotherapist=self.therapist,
+                date=date(2025, 7, 1), start_time=time(9), end_time=time(10), reason='Knee',
+            )
+        self.assertEqual(
+            set(Notification.objects.values_list('recipient', flat=True)),
+            {self.patients[0].pk, self.therapist.pk},
+        )
+
+    def test_exercise_reminders_target_patients_scheduled_today(self):
+        today = date(2025, 7, 1)
+        category = ExerciseCategory.objects.create(name='Strength')
+        exercise = Exercise.objects.create(
+            name='Squat', description='Squat', category=category, duration=10
+        )
+        for patient, day_of_week in ((self.patients[0], today.weekday()), (self.patients[1], 6)):
+            plan = ExercisePlan.objects.create(
+                name='Plan', description='Plan', patient=patient, physiotherapist=self.therapist,
+                start_date=today - timedelta(days=7), end_date=today + timedelta(days=7),
+            )
+            ExercisePlanItem.objects.create(exercise_plan=plan, exercise=exercise, day_of_week=day_of_week)
+
+        self.assertEqual(notify_exercise_reminders(day=today), 1)
+        self.assertEqual(Notification.objects.get().recipient, self.patients[0])
+
+    def test_broadcast_command(self):
+        out = StringIO()
+        call_command('broadcast_notification', 'Hello', 'Welcome', '--user-type', 'physiotherapist', stdout=out)
+        self.assertIn('Sent 1 notification(s)', out.getvalue())
@@ -3,13 +3,15 @@ from rest_framework import status, permissions, generics
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from healthcare_backend.projections import project, render_rows
+from healthcare_backend.renderers import StreamingJSONMixin
 from .models import Notification, NotificationPreference
 from .serializers import (
     NotificationSerializer, NotificationPreferenceSerializer,
     NotificationPreferenceUpdateSerializer
 )
 
-class NotificationListView(APIView):
+class NotificationListView(StreamingJSONMixin, APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
@@ -27,8 +29,9 @@ class NotificationListView(APIView):
         if notification_type:
             notifications = notifications.filter(notification_type=notification_type)
             
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data)
+        # Rendered from values rows, as NotificationSerializer would
+        rows = project(notifications, NotificationSerializer)
+        return Response(render_rows(rows, NotificationSerializer))
 
 class NotificationDetailView(APIView):
     permission_classes = [IsAuthenticated]